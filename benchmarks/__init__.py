@@ -0,0 +1,2 @@
+"""Benchmarks of the pyls package. Run them from the repository root,
+e.g. python -m benchmarks.bench_build"""
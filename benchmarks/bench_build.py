@@ -0,0 +1,82 @@
+"""Benchmark of FileSystemTree.build_tree_from_dict. The time per node
+must stay constant when the number of nodes grows. With --memory the
+memory retained by the tree is reported too, with the bytes saved by
+the interning of names and permissions"""
+
+import argparse
+import gc
+import json
+import math
+import sys
+import time
+import tracemalloc
+
+from benchmarks.generators import balanced_filesystem
+from pyls.data.tree import FileSystemTree
+
+
+def measure_memory(json_text: str, node_count: int) -> None:
+    """Print the memory retained by a tree built from json_text
+    once the decoded json is released, and the memory its strings
+    would retain without interning
+
+    Parameters
+    ----------
+    json_text: str
+        the json filesystem
+    node_count: int
+        the number of nodes of the filesystem
+    """
+    tracemalloc.start()
+    json_data = json.loads(json_text)
+    root = FileSystemTree.build_tree_from_dict(json_data)
+    del json_data
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    copies = 0
+    distinct = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        for string in (node.name, node.permissions):
+            copies += sys.getsizeof(string)
+            distinct[id(string)] = sys.getsizeof(string)
+        stack.extend((node.children or {}).values())
+    print(f"{'':>10} retained {retained / 1e6:9.1f}MB "
+          f"{retained / node_count:6.0f}B/node, strings "
+          f"{copies / 1e6:.1f}MB without interning, "
+          f"{sum(distinct.values()) / 1e6:.1f}MB interned")
+
+
+def main():
+    """Time the tree build for each size and print the scaling exponent"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="the number of nodes of each run, e.g. 10000 10000000")
+    parser.add_argument("--memory", action="store_true",
+                        help="report the memory retained by the tree")
+    args = parser.parse_args()
+    results = []
+    for size in args.sizes:
+        json_data = balanced_filesystem(size)
+        start = time.perf_counter()
+        FileSystemTree.build_tree_from_dict(json_data)
+        elapsed = time.perf_counter() - start
+        results.append((size, elapsed))
+        print(f"{size:>10} nodes {elapsed:9.3f}s "
+              f"{elapsed / size * 1e9:8.0f}ns/node")
+        if args.memory:
+            measure_memory(json.dumps(json_data), size)
+    if len(results) > 1:
+        (first_size, first_time), (last_size, last_time) = \
+            results[0], results[-1]
+        exponent = (math.log(last_time / first_time)
+                    / math.log(last_size / first_size))
+        print(f"scaling exponent: {exponent:.2f} (1.00 is linear)")
+
+
+if __name__ == "__main__":
+    main()
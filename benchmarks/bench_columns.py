@@ -0,0 +1,83 @@
+"""Benchmark of the listings of a big directory with and without the
+numpy column store. Each listing is timed twice: the first run also
+builds the columns and the orders, the second one finds them cached,
+like the next requests served by the daemon"""
+
+import argparse
+import random
+import time
+from unittest import mock
+
+from pyls.data.filesystem import FileSystemNodeType
+from pyls.data.listing import ListingOptions
+from pyls.data.tree import FileSystemTree, TreeNode
+
+LISTINGS = {
+    "-S": ListingOptions(sort_by_size=True),
+    "-t -r --filter file": ListingOptions(sort_by_time=True,
+                                          reverse_sorting=True,
+                                          filter_by="file"),
+    "-S --min-size 1M": ListingOptions(sort_by_size=True,
+                                       min_size=1 << 20),
+    "-t --newer-than": ListingOptions(sort_by_time=True,
+                                      newer_than=1700000000 - (1 << 10)),
+    "-S --limit 20": ListingOptions(sort_by_size=True, limit=20),
+}
+
+
+def big_directory(count: int, seed: int = 0) -> TreeNode:
+    """Build a directory with count children with random sizes and times
+
+    Parameters
+    ----------
+    count: int
+        the number of children
+    seed: int
+        the seed of the random generator
+
+    Returns
+    ----------
+    directory: TreeNode
+        the directory
+    """
+    rng = random.Random(seed)
+    directory = TreeNode(name="big", size=4096, time_modified=1700000000,
+                         permissions="drwxr-xr-x",
+                         node_type=FileSystemNodeType.DIRECTORY)
+    for index in range(count):
+        name = f"node_{index}"
+        directory.add_child(name, TreeNode(
+            name=name, size=rng.randrange(1 << 30),
+            time_modified=1700000000 - rng.randrange(1 << 25),
+            permissions="-rw-r--r--", node_type=FileSystemNodeType.FILE))
+    return directory
+
+
+def time_listings(count: int) -> None:
+    """Time each listing of a new directory with count children"""
+    directory = big_directory(count)
+    for flags, options in LISTINGS.items():
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            rows = len(FileSystemTree.list_node(directory, options))
+            timings.append(time.perf_counter() - start)
+        print(f"{flags:>22} {rows:>9} rows "
+              f"first {timings[0]:7.3f}s cached {timings[1]:7.3f}s")
+
+
+def main():
+    """Time the listings with the columns, then without numpy"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--children", type=int, default=1_000_000,
+                        help="the number of children of the directory")
+    args = parser.parse_args()
+    print("numpy columns")
+    time_listings(args.children)
+    print("without numpy")
+    with mock.patch("pyls.data.columns.load_numpy", return_value=None):
+        time_listings(args.children)
+
+
+if __name__ == "__main__":
+    main()
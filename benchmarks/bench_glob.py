@@ -0,0 +1,46 @@
+"""Benchmark of FileSystemTree.glob on a big synthetic tree.
+Each pattern is matched twice: the first run also builds the directory
+indexes used by the matchers, the second one finds them cached, like
+the next requests served by the daemon"""
+
+import argparse
+import gc
+import time
+
+from benchmarks.generators import balanced_filesystem
+from pyls.data.tree import FileSystemTree
+
+PATTERNS = ["**/node_7", "**/dir_1/node_3", "dir_0/*/*/node_?",
+            "**/missing", "**/dir_0/"]
+
+
+def main():
+    """Build the tree and time the matching of each pattern"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=5_000_000,
+                        help="the number of nodes of the tree")
+    parser.add_argument("--fanout", type=int, default=10,
+                        help="the number of children of each directory")
+    parser.add_argument("patterns", nargs="*", default=PATTERNS,
+                        help="the patterns to match")
+    args = parser.parse_args()
+    json_data = balanced_filesystem(args.nodes, fanout=args.fanout)
+    tree = FileSystemTree.from_root(
+        FileSystemTree.build_tree_from_dict(json_data))
+    del json_data
+    gc.collect()
+    # The tree is never garbage, keep the collector from traversing it
+    gc.freeze()
+    print(f"{args.nodes} nodes")
+    for pattern in args.patterns:
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            matches = sum(1 for _ in tree.glob(pattern))
+            timings.append(time.perf_counter() - start)
+        print(f"{pattern:>20} {matches:>9} matches "
+              f"first {timings[0]:7.3f}s cached {timings[1]:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
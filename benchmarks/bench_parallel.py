@@ -0,0 +1,85 @@
+"""Benchmark of FileSystemTree.build_tree_parallel against
+build_tree_from_json on a synthetic json file. The root has --top
+balanced subtrees, so the ranges given to the workers are even.
+The rebuild of the nodes received, done by the main process, is timed
+on its own, since it bounds the speedup whatever the number of workers"""
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.generators import balanced_filesystem
+from pyls.data.tree import FileSystemTree, TreeColumns, paused_gc
+
+
+def write_filesystem(json_path: str, node_count: int, top: int) -> None:
+    """Write a json filesystem with top balanced subtrees under the root
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json file to write
+    node_count: int
+        the number of nodes, root excluded
+    top: int
+        the number of children of the root
+    """
+    root = balanced_filesystem(0)
+    for index in range(top):
+        subtree = balanced_filesystem(node_count // top - 1, seed=index)
+        subtree["name"] = f"top_{index}"
+        root["contents"].append(subtree)
+    with open(json_path, "w", encoding="UTF-8") as json_file:
+        json.dump(root, json_file)
+
+
+def time_build(json_path: str, workers: int) -> float:
+    """Return the seconds spent building the tree of json_path"""
+    gc.collect()
+    start = time.perf_counter()
+    FileSystemTree(json_path, workers=workers)
+    return time.perf_counter() - start
+
+
+def main():
+    """Write the json file and time the build for each number of workers"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=1_000_000,
+                        help="the number of nodes of the tree")
+    parser.add_argument("--top", type=int, default=256,
+                        help="the number of children of the root")
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({2, 4, os.cpu_count() or 1} - {1}),
+        help="the numbers of worker processes to time")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "structure.json")
+        write_filesystem(json_path, args.nodes, args.top)
+        print(f"{args.nodes} nodes, {os.path.getsize(json_path) / 1e6:.1f}MB,"
+              f" {os.cpu_count()} cpus")
+        with open(json_path, encoding="UTF-8") as json_file:
+            json_data = json.load(json_file)
+        columns = TreeColumns.from_tree(
+            FileSystemTree.build_tree_from_dict(json_data))
+        del json_data
+        root = FileSystemTree.build_tree_from_dict(balanced_filesystem(0))
+        gc.collect()
+        start = time.perf_counter()
+        with paused_gc():
+            columns.attach(root)
+        print(f"{'rebuild':>10} {time.perf_counter() - start:9.3f}s")
+        del columns, root
+        sequential = time_build(json_path, 1)
+        print(f"{'sequential':>10} {sequential:9.3f}s")
+        for workers in args.workers:
+            elapsed = time_build(json_path, workers)
+            print(f"{workers:>10} {elapsed:9.3f}s "
+                  f"speedup {sequential / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Module providing seeded generators of synthetic json filesystems.
+
+balanced_filesystem builds the whole json filesystem in memory. The
+other generators return a root whose contents are iterators, filled
+while the filesystem is written by write_filesystem: a filesystem of
+millions of nodes is written without keeping it in memory. Their
+contents can be iterated only once"""
+
+import itertools
+import json
+import random
+from typing import IO, Iterator
+
+# Largest number of nested directories generated. json.loads reaches
+# the default recursion limit of the interpreter around 500 levels
+MAX_DEPTH = 256
+# Number of distinct names of zipf_filesystem
+VOCABULARY_SIZE = 10_000
+# Exponent of the Zipf distributions, about 1 for real file names
+ZIPF_EXPONENT = 1.1
+BASE_TIME = 1700000000
+EXTENSIONS = ("py", "txt", "md", "json", "js", "c", "h", "png", "log", "")
+
+
+def balanced_filesystem(node_count: int, fanout: int = 10,
+                        seed: int = 0) -> dict:
+    """Generate a json filesystem with node_count nodes where each
+    directory has up to fanout children, one of them a directory.
+
+    Parameters
+    ----------
+    node_count: int
+        the number of nodes to generate, root excluded
+    fanout: int
+        the number of children of each directory
+    seed: int
+        the seed of the random generator
+
+    Returns
+    ----------
+    json_data: dict
+        the root object of the json filesystem
+    """
+    rng = random.Random(seed)
+    root = {"name": "root", "size": 4096, "time_modified": BASE_TIME,
+            "permissions": "drwxr-xr-x", "contents": []}
+    directories = [root]
+    generated = 0
+    position = 0
+    while generated < node_count:
+        directory = directories[position]
+        position += 1
+        for index in range(min(fanout, node_count - generated)):
+            # The names repeat in every directory, like in real snapshots
+            node = {"name": f"node_{index}",
+                    "size": rng.randrange(1 << 20),
+                    "time_modified": BASE_TIME - rng.randrange(1 << 25),
+                    "permissions": "-rw-r--r--"}
+            if index < 2:
+                node["name"] = f"dir_{index}"
+                node["permissions"] = "drwxr-xr-x"
+                node["contents"] = []
+                directories.append(node)
+            directory["contents"].append(node)
+            generated += 1
+    return root
+
+
+def _file(rng: random.Random, name: str) -> dict:
+    """Generate a file with a random size and time"""
+    return {"name": name, "size": rng.randrange(1 << 20),
+            "time_modified": BASE_TIME - rng.randrange(1 << 25),
+            "permissions": "-rw-r--r--"}
+
+
+def _directory(name: str, contents: Iterator[dict]) -> dict:
+    """Generate a directory with the given contents"""
+    return {"name": name, "size": 4096, "time_modified": BASE_TIME,
+            "permissions": "drwxr-xr-x", "contents": contents}
+
+
+def wide_filesystem(node_count: int, seed: int = 0) -> dict:
+    """Generate a json filesystem whose root has node_count files.
+
+    Parameters
+    ----------
+    node_count: int
+        the number of nodes to generate, root excluded
+    seed: int
+        the seed of the random generator
+
+    Returns
+    ----------
+    json_data: dict
+        the root object of the json filesystem, with lazy contents
+    """
+    rng = random.Random(seed)
+    return _directory("root", (_file(rng, f"file_{index}")
+                               for index in range(node_count)))
+
+
+def deep_filesystem(node_count: int, depth: int = MAX_DEPTH,
+                    seed: int = 0) -> dict:
+    """Generate a json filesystem made of a chain of depth nested
+    directories, with the files spread evenly along the chain.
+
+    Parameters
+    ----------
+    node_count: int
+        the number of nodes to generate, root excluded
+    depth: int
+        the number of nested directories, at most MAX_DEPTH
+    seed: int
+        the seed of the random generator
+
+    Returns
+    ----------
+    json_data: dict
+        the root object of the json filesystem, with lazy contents
+    """
+    rng = random.Random(seed)
+    depth = max(min(depth, MAX_DEPTH, node_count), 0)
+    files = node_count - depth
+
+    def contents(level: int) -> Iterator[dict]:
+        start = files * level // (depth + 1)
+        for index in range(start, files * (level + 1) // (depth + 1)):
+            yield _file(rng, f"file_{index}")
+        if level < depth:
+            yield _directory(f"dir_{level + 1}", contents(level + 1))
+
+    return _directory("root", contents(0))
+
+
+class ZipfSampler:
+    """A class used to draw the ranks 1..size of a Zipf distribution,
+    where the rank k has probability proportional to 1 / k ** exponent
+
+    Attributes
+    ----------
+    rng : random.Random
+        the random generator
+    """
+
+    def __init__(self, rng: random.Random, size: int,
+                 exponent: float = ZIPF_EXPONENT):
+        """
+        Parameters
+        ----------
+        rng: random.Random
+            the random generator
+        size: int
+            the number of ranks
+        exponent: float
+            the exponent of the distribution
+        """
+        self.rng = rng
+        self._ranks = range(1, size + 1)
+        self._weights = list(itertools.accumulate(
+            1 / rank ** exponent for rank in self._ranks))
+
+    def sample(self, count: int = 1) -> list[int]:
+        """Draw count ranks"""
+        return self.rng.choices(self._ranks, cum_weights=self._weights,
+                                k=count)
+
+
+def zipf_filesystem(node_count: int, seed: int = 0) -> dict:
+    """Generate a realistic json filesystem: the names are drawn from a
+    vocabulary with Zipf frequencies, so a few names like README.md are
+    everywhere, and the sizes and the number of children of the
+    directories have the heavy tails of real filesystems.
+
+    Parameters
+    ----------
+    node_count: int
+        the number of nodes to generate, root excluded
+    seed: int
+        the seed of the random generator
+
+    Returns
+    ----------
+    json_data: dict
+        the root object of the json filesystem, with lazy contents
+    """
+    rng = random.Random(seed)
+    names = ZipfSampler(rng, VOCABULARY_SIZE)
+
+    def node_name(rank: int, taken: set) -> str:
+        extension = EXTENSIONS[rank % len(EXTENSIONS)]
+        name = f"name_{rank}.{extension}" if extension else f"name_{rank}"
+        # The names of a directory are unique
+        copy = 1
+        unique_name = name
+        while unique_name in taken:
+            copy += 1
+            unique_name = f"{name}.{copy}"
+        taken.add(unique_name)
+        return unique_name
+
+    def contents(count: int, level: int) -> Iterator[dict]:
+        children = min(count, int(rng.paretovariate(1.2) * 8))
+        if children < count and level < MAX_DEPTH:
+            directories = max(1, int(children * rng.uniform(0, 0.3)))
+        else:
+            children, directories = count, 0
+        taken: set[str] = set()
+        for rank in names.sample(children - directories):
+            node = _file(rng, node_name(rank, taken))
+            # Pareto sizes: most files are small, a few are huge
+            node["size"] = min(int(rng.paretovariate(1.1) * 512), 1 << 40)
+            yield node
+        if not directories:
+            return
+        # The nodes left are split among the directories by Pareto
+        # weights, so a few subtrees hold most of them
+        weights = [rng.paretovariate(1.2) for _ in range(directories)]
+        left = count - children
+        total_weight = sum(weights)
+        shares = [int(left * weight / total_weight) for weight in weights]
+        shares[0] += left - sum(shares)
+        for rank, share in zip(names.sample(directories), shares):
+            yield _directory(f"dir_{node_name(rank, taken)}",
+                             contents(share, level + 1))
+
+    return _directory("root", contents(node_count, 0) if node_count
+                      else iter(()))
+
+
+def write_filesystem(json_data: dict, json_file: IO[str]) -> int:
+    """Write a json filesystem, consuming the lazy contents of the
+    generators while writing. The nesting is followed with an explicit
+    stack, so the depth is not limited by the recursion limit.
+
+    Parameters
+    ----------
+    json_data: dict
+        the root object of the json filesystem
+    json_file: IO[str]
+        the text file to write to
+
+    Returns
+    ----------
+    node_count: int
+        the number of nodes written, root excluded
+    """
+    node_count = -1
+    write = json_file.write
+    stack = [iter((json_data,))]
+    first = True
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            if stack:
+                write("]}")
+            first = False
+            continue
+        node_count += 1
+        if not first:
+            write(", ")
+        fields = {key: value for key, value in node.items()
+                  if key != "contents"}
+        if "contents" not in node:
+            write(json.dumps(fields))
+            first = False
+            continue
+        write(json.dumps(fields)[:-1] + ', "contents": [')
+        stack.append(iter(node["contents"]))
+        first = True
+    return node_count
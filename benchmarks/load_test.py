@@ -0,0 +1,147 @@
+"""Load test of the pyls listing server. Many concurrent clients send
+pipelined requests and the latency of each request is reported.
+Without --socket, a server for a synthetic filesystem is started
+in a child process"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.generators import balanced_filesystem
+from pyls.data.tree import FileSystemTree
+from pyls.server import serve
+
+
+def directory_paths(json_data: dict) -> list[str]:
+    """Return the path of each directory of a json filesystem
+
+    Parameters
+    ----------
+    json_data: dict
+        the root object of the json filesystem
+
+    Returns
+    ----------
+    paths: list[str]
+        the directory paths, the root is "."
+    """
+    paths = []
+    stack = [(json_data, ".")]
+    while stack:
+        node, path = stack.pop()
+        paths.append(path)
+        for child in node["contents"]:
+            if "contents" in child:
+                stack.append((child, f"{path}/{child['name']}"))
+    return paths
+
+
+def run_server(json_data: dict, socket_path: str) -> None:
+    """Body of the server process"""
+    tree = FileSystemTree.from_root(
+        FileSystemTree.build_tree_from_dict(json_data))
+    asyncio.run(serve(tree, socket_path))
+
+
+async def client(socket_path: str, requests: list[dict], depth: int,
+                 latencies: list[float]) -> None:
+    """Send the requests keeping up to depth of them in flight,
+    and record the latency of each one
+
+    Parameters
+    ----------
+    socket_path: str
+        the socket of the server
+    requests: list[dict]
+        the requests to send
+    depth: int
+        the number of requests sent without waiting for the responses
+    latencies: list[float]
+        the list the latencies in seconds are appended to
+    """
+    reader, writer = await asyncio.open_unix_connection(socket_path,
+                                                        limit=1 << 24)
+    sent_at = []
+    for request in requests[:depth]:
+        sent_at.append(time.perf_counter())
+        writer.write(json.dumps(request).encode() + b"\n")
+    for index in range(len(requests)):
+        await reader.readline()
+        latencies.append(time.perf_counter() - sent_at[index])
+        if index + depth < len(requests):
+            sent_at.append(time.perf_counter())
+            writer.write(json.dumps(requests[index + depth]).encode()
+                         + b"\n")
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(socket_path: str, paths: list[str], args) -> None:
+    """Run the clients and print the latency percentiles"""
+    rng = random.Random(args.seed)
+    latencies: list[float] = []
+    workloads = [[{"path": rng.choice(paths),
+                   "options": {"long_listing": args.long}}
+                  for _ in range(args.requests)]
+                 for _ in range(args.clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(socket_path, workload, args.depth,
+                                  latencies)
+                           for workload in workloads))
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{len(latencies)} requests from {args.clients} clients "
+          f"(pipeline depth {args.depth}) in {elapsed:.2f}s, "
+          f"{len(latencies) / elapsed:.0f} requests/s")
+    print(f"latency p50 {quantiles[49] * 1e3:.2f}ms "
+          f"p99 {quantiles[98] * 1e3:.2f}ms "
+          f"max {max(latencies) * 1e3:.2f}ms")
+
+
+def main():
+    """Start the server if needed and run the load test"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket",
+                        help="the socket of a running pyls server")
+    parser.add_argument("--paths-from",
+                        help="file with the paths to request, one per line. "
+                        "Required with --socket")
+    parser.add_argument("--nodes", type=int, default=100_000,
+                        help="the nodes of the synthetic filesystem")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200,
+                        help="the requests sent by each client")
+    parser.add_argument("--depth", type=int, default=8,
+                        help="the pipeline depth of each client")
+    parser.add_argument("-l", dest="long", action="store_true",
+                        help="request long listings")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.socket:
+        with open(args.paths_from, encoding="UTF-8") as paths_file:
+            paths = paths_file.read().split()
+        asyncio.run(load(args.socket, paths, args))
+        return
+    json_data = balanced_filesystem(args.nodes, seed=args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "pyls.sock")
+        server = multiprocessing.Process(target=run_server,
+                                         args=(json_data, socket_path))
+        server.start()
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.05)
+            asyncio.run(load(socket_path, directory_paths(json_data), args))
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Benchmark suite of pyls on synthetic json filesystems of each shape,
+wide, deep, balanced and zipf, and size. For each load mode a new
+process loads the filesystem, so that its peak RSS is the one of that
+load alone, and then times the listing of the root, of the largest and
+of the deepest directory for each combination of flags. The results
+are printed as tables and, with --output, written as json, that
+--compare uses as the baseline of the next run"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generators import (balanced_filesystem, deep_filesystem,
+                                   write_filesystem, wide_filesystem,
+                                   zipf_filesystem)
+from pyls.data.listing import ListingOptions, render
+from pyls.data.tree import FileSystemTree
+
+SHAPES = {
+    "wide": wide_filesystem,
+    "deep": deep_filesystem,
+    "balanced": lambda node_count, seed: balanced_filesystem(node_count,
+                                                             seed=seed),
+    "zipf": zipf_filesystem,
+}
+# The keyword arguments of FileSystemTree of each load mode
+LOAD_MODES = {
+    "json": {},
+    "streaming": {"streaming": True},
+    "lazy": {"lazy": True},
+    "snapshot": {"snapshot": True},
+}
+# The flags of each listing, as ListingOptions fields
+LISTINGS = {
+    "": {},
+    "-A": {"show_all": True},
+    "-r": {"reverse_sorting": True},
+    "-t": {"sort_by_time": True},
+    "-S": {"sort_by_size": True},
+    "-l": {"long_listing": True},
+    "-lh": {"long_listing": True, "humanize": True},
+    "-ltr": {"long_listing": True, "sort_by_time": True,
+             "reverse_sorting": True},
+    "-lS --total-size": {"long_listing": True, "sort_by_size": True,
+                         "total_size": True},
+    "--filter file": {"filter_by": "file"},
+    "--filter dir": {"filter_by": "dir"},
+    "-S --limit 20": {"sort_by_size": True, "limit": 20},
+}
+
+
+def peak_rss() -> int:
+    """Return the peak resident set size of this process in bytes.
+    On Linux ru_maxrss survives exec, so it would report the peak of
+    the suite process that started this one: VmHWM is read instead"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, the other systems kilobytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def directory_targets(root) -> dict[str, str]:
+    """Return the paths of the directories listed: the root, the one
+    with the most children and the deepest one, each path once
+
+    Parameters
+    ----------
+    root: TreeNode
+        the root of the tree
+
+    Returns
+    ----------
+    targets: dict[str, str]
+        the path of each target, "." for the root
+    """
+    largest = deepest = (0, ".")
+    stack = [(root, ".", 0)]
+    while stack:
+        node, path, depth = stack.pop()
+        children = node.children or {}
+        largest = max(largest, (len(children), path))
+        deepest = max(deepest, (depth, path))
+        for name, child in children.items():
+            if child.children is not None:
+                stack.append((child, name if path == "." else
+                              f"{path}/{name}", depth + 1))
+    targets: dict[str, str] = {}
+    for target, path in (("root", "."), ("largest", largest[1]),
+                         ("deepest", deepest[1])):
+        # Like the root of a wide filesystem, that is also the largest
+        if path not in targets.values():
+            targets[target] = path
+    return targets
+
+
+def time_listings(tree, targets: dict[str, str], repeat: int) -> dict:
+    """Time each listing of LISTINGS on each target directory. The
+    first run is reported on its own, since it also builds the
+    indexes of the directory, then the median of repeat runs.
+
+    Parameters
+    ----------
+    tree: FileSystemTree
+        the tree to list
+    targets: dict[str, str]
+        the path of each target directory, see directory_targets
+    repeat: int
+        the number of runs after the first one
+
+    Returns
+    ----------
+    listings: dict
+        for each flags and target, the seconds of the first run, the
+        median seconds of the others and the number of rows
+    """
+    listings = {}
+    for flags, fields in LISTINGS.items():
+        options = ListingOptions(**fields)
+        listings[flags] = {}
+        for target, path in targets.items():
+            timings = []
+            for _ in range(repeat + 1):
+                start = time.perf_counter()
+                result = tree.list_directory(path, options)
+                render(result)
+                timings.append(time.perf_counter() - start)
+            listings[flags][target] = {
+                "first": timings[0],
+                "median": statistics.median(timings[1:] or timings),
+                "rows": len(result)}
+    return listings
+
+
+def time_resolve(tree, path: str, repeat: int) -> dict:
+    """Time the change_directory to a path, first with an empty path
+    cache and then with the path cached"""
+    tree.path_cache.clear()
+    start = time.perf_counter()
+    tree.change_directory(path)
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tree.change_directory(path)
+        timings.append(time.perf_counter() - start)
+    return {"first": first, "median": statistics.median(timings or [first])}
+
+
+def measure(json_path: str, mode: str, repeat: int) -> dict:
+    """Body of the measuring process: load the filesystem and, in the
+    json mode, time the listings. The other modes report only the load,
+    their listings are the same once the nodes are loaded
+
+    Parameters
+    ----------
+    json_path: str
+        the json filesystem, or its snapshot in the snapshot mode
+    mode: str
+        the load mode, a key of LOAD_MODES
+    repeat: int
+        the number of timed runs of each listing after the first one
+
+    Returns
+    ----------
+    measures: dict
+        the load seconds, the peak RSS in bytes and the listings
+    """
+    start = time.perf_counter()
+    tree = FileSystemTree(json_path, **LOAD_MODES[mode])
+    measures = {"load_seconds": time.perf_counter() - start,
+                "peak_rss_bytes": peak_rss()}
+    if tree.root is None:
+        raise ValueError(f"cannot load {json_path}")
+    if mode == "json":
+        targets = directory_targets(tree.root)
+        measures["targets"] = targets
+        measures["resolve"] = time_resolve(
+            tree, targets.get("deepest", "."), repeat)
+        measures["listings"] = time_listings(tree, targets, repeat)
+    return measures
+
+
+def generate(directory: str, shape: str, node_count: int,
+             seed: int) -> str:
+    """Write the json filesystem of a shape, unless a previous run
+    already wrote it in directory
+
+    Returns
+    ----------
+    json_path: str
+        the path of the json filesystem
+    """
+    json_path = os.path.join(directory, f"{shape}-{node_count}-{seed}.json")
+    if not os.path.exists(json_path):
+        with open(json_path + ".tmp", "w", encoding="UTF-8") as json_file:
+            write_filesystem(SHAPES[shape](node_count, seed=seed), json_file)
+        os.replace(json_path + ".tmp", json_path)
+    return json_path
+
+
+def compile_snapshot(json_path: str) -> str:
+    """Compile the snapshot of a json filesystem, like pyls compile,
+    in its own process and return its path"""
+    snapshot_path = os.path.splitext(json_path)[0] + ".pyls"
+    if not os.path.exists(snapshot_path):
+        subprocess.run([sys.executable, "-m", "pyls", "compile", json_path,
+                        "-o", snapshot_path], check=True)
+    return snapshot_path
+
+
+def run_measure(path: str, mode: str, repeat: int) -> dict:
+    """Run measure in a new process and return its measures"""
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--measure", path,
+         "--mode", mode, "--repeat", str(repeat)],
+        capture_output=True, text=True, check=True)
+    return json.loads(process.stdout)
+
+
+def print_run(run: dict, baseline: dict) -> None:
+    """Print the measures of a run, with the ratio to the baseline
+    run of the same shape, size and mode when there is one"""
+    def ratio(value: float, base: float) -> str:
+        return f" ({value / base:5.2f}x)" if base else ""
+
+    print(f"{run['shape']:>8} {run['nodes']:>9} nodes "
+          f"{run['json_bytes'] / 1e6:8.1f}MB {run['mode']:>9} "
+          f"load {run['load_seconds']:8.3f}s"
+          f"{ratio(run['load_seconds'], baseline.get('load_seconds'))} "
+          f"peak RSS {run['peak_rss_bytes'] / 1e6:8.1f}MB"
+          f"{ratio(run['peak_rss_bytes'], baseline.get('peak_rss_bytes'))}")
+    if "listings" not in run:
+        return
+    resolve = run["resolve"]
+    print(f"{'':>8} resolve deepest first {resolve['first'] * 1e6:9.1f}us "
+          f"cached {resolve['median'] * 1e6:9.1f}us")
+    targets = list(run["targets"])
+    print(f"{'':>8} {'flags':>18} " + " ".join(
+        f"{target + ' ms':>20}" for target in targets))
+    base_listings = baseline.get("listings", {})
+    for flags, listing in run["listings"].items():
+        cells = []
+        for target in targets:
+            median = listing[target]["median"]
+            base = base_listings.get(flags, {}).get(target, {})
+            cells.append(f"{median * 1e3:10.3f}"
+                         f"{ratio(median, base.get('median')):>10}")
+        print(f"{'':>8} {flags:>18} " + " ".join(cells))
+
+
+def main():
+    """Generate the filesystems, measure them and report the results"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES),
+                        default=list(SHAPES))
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="the number of nodes of each filesystem, "
+                        "e.g. 1000 10000000")
+    parser.add_argument("--modes", nargs="+", choices=list(LOAD_MODES),
+                        default=list(LOAD_MODES))
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="the timed runs of each listing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory",
+                        help="where the filesystems are generated and "
+                        "kept for the next runs. Default: a temporary "
+                        "directory")
+    parser.add_argument("--output", help="write the results as json")
+    parser.add_argument("--compare",
+                        help="the json results of a previous run, "
+                        "printed as the ratio of each measure to it")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        json.dump(measure(args.measure, args.mode, args.repeat), sys.stdout)
+        return
+    baselines = {}
+    if args.compare:
+        with open(args.compare, encoding="UTF-8") as compare_file:
+            for run in json.load(compare_file)["runs"]:
+                baselines[(run["shape"], run["nodes"], run["mode"])] = run
+    report = {"python": platform.python_version(),
+              "platform": platform.platform(), "cpus": os.cpu_count(),
+              "seed": args.seed, "runs": []}
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = args.directory or temporary_directory
+        os.makedirs(directory, exist_ok=True)
+        for shape in args.shapes:
+            for node_count in args.sizes:
+                json_path = generate(directory, shape, node_count, args.seed)
+                for mode in args.modes:
+                    path = compile_snapshot(json_path) \
+                        if mode == "snapshot" else json_path
+                    run = {"shape": shape, "nodes": node_count,
+                           "mode": mode,
+                           "json_bytes": os.path.getsize(json_path)}
+                    run.update(run_measure(path, mode, args.repeat))
+                    report["runs"].append(run)
+                    print_run(run, baselines.get((shape, node_count, mode),
+                                                 {}))
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
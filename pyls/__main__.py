@@ -1,51 +1,632 @@
-"""Command line interface for the pyls package"""
+"""Command line interface for the pyls package.
+The modules are imported only by the commands that use them, and the
+common command lines are parsed without argparse, so that pyls starts
+quickly when it is called many times, like from a shell loop"""
 
-import argparse
+import contextlib
 import os
+import sys
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Optional
 
-from pyls.data.tree import FileSystemTree
-
-parser = argparse.ArgumentParser(
-    prog="pyls", description="list directory contents", add_help=False,
-    epilog="\n\nAUTHOR\n\tWritten by Sebastiano Manfredini",
-    formatter_class=argparse.RawTextHelpFormatter)
-parser.add_argument("-A", action="store_true",
-                    help="do not ignore entries starting with .")
-parser.add_argument("-l", action="store_true",
-                    help="use a long listing format")
-parser.add_argument("-r", action="store_true",
-                    help="reverse order while sorting")
-parser.add_argument("-t", action="store_true",
-                    help="sort by time, oldest first")
-parser.add_argument(
-    "--filter", choices=['file', 'dir'],
-    help="filter the output based on given option. "
-    "Use 'file' to print only files. Use 'dir' to print only directories")
-
-parser.add_argument(
-    "-h", action="store_true",
-    help="with -l, show human readable size like 1K 234M 2G etc.")
-parser.add_argument('--help', action='help',
-                    help='display this help and exit')
-parser.add_argument('directory', nargs='?')
+from pyls import client
+from pyls.utils import stats
+
+if TYPE_CHECKING:
+    import argparse
+
+    from pyls.data.listing import ListingOptions
+    from pyls.data.tree import FileSystemTree
+
+# The short options without value, parsed by parse_common_arguments
+SHORT_FLAGS = frozenset("AlrtSRh")
+FILTER_CHOICES = ("file", "dir")
+
+
+def non_negative_int(value: str) -> int:
+    """Argument type accepting the integers greater than or equal to 0
+
+    Parameters
+    ----------
+    value: str
+        the command line value
+
+    Returns
+    ----------
+    number: int
+        the parsed value
+
+    Raises
+    ----------
+    argparse.ArgumentTypeError
+        if the value is not a non negative integer
+    """
+    import argparse
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(
+            f"invalid non negative integer value: '{value}'")
+    return number
+
+
+def size_value(value: str) -> int:
+    """Argument type accepting a size in bytes, optionally followed
+    by one of the units of the human readable sizes, like 10K or 2G
+
+    Parameters
+    ----------
+    value: str
+        the command line value
+
+    Returns
+    ----------
+    size: int
+        the size in bytes
+
+    Raises
+    ----------
+    argparse.ArgumentTypeError
+        if the value is not a non negative size
+    """
+    import argparse
+    units = "KMGTPE"
+    number = value[:-1] if value and value[-1].upper() in units else value
+    try:
+        size = float(number) if "." in number else int(number)
+    except ValueError:
+        size = -1
+    if size < 0:
+        raise argparse.ArgumentTypeError(f"invalid size value: '{value}'")
+    if number is not value:
+        size *= 1024 ** (units.index(value[-1].upper()) + 1)
+    return int(size)
+
+
+def time_value(value: str) -> int:
+    """Argument type accepting a unix epoch or an ISO 8601 date
+    and time, like 2023-11-14 or 2023-11-14T10:30, in local time
+
+    Parameters
+    ----------
+    value: str
+        the command line value
+
+    Returns
+    ----------
+    epoch: int
+        the unix epoch of the time
+
+    Raises
+    ----------
+    argparse.ArgumentTypeError
+        if the value is neither an integer nor a date
+    """
+    import argparse
+    import datetime
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return int(datetime.datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid time value: '{value}'") from None
+
+
+def build_parser() -> "argparse.ArgumentParser":
+    """Build the parser of the pyls command line arguments
+
+    Returns
+    ----------
+    parser: argparse.ArgumentParser
+        the parser
+    """
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="pyls", description="list directory contents", add_help=False,
+        epilog="\n\nAUTHOR\n\tWritten by Sebastiano Manfredini",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-A", action="store_true",
+                        help="do not ignore entries starting with .")
+    parser.add_argument("-l", action="store_true",
+                        help="use a long listing format")
+    parser.add_argument("-r", action="store_true",
+                        help="reverse order while sorting")
+    parser.add_argument("-t", action="store_true",
+                        help="sort by time, oldest first")
+    parser.add_argument("-S", action="store_true",
+                        help="sort by size, smallest first")
+    parser.add_argument("-R", action="store_true",
+                        help="list subdirectories recursively")
+    parser.add_argument(
+        "--filter", choices=FILTER_CHOICES,
+        help="filter the output based on given option. "
+        "Use 'file' to print only files. Use 'dir' to print only directories")
+
+    parser.add_argument(
+        "--total-size", action="store_true",
+        help="like du, use the size of each directory with all its files "
+        "and subdirectories.\nApplies to -l and -S")
+    parser.add_argument(
+        "--min-size", type=size_value, metavar="SIZE",
+        help="list only the entries of at least SIZE bytes, like 512, 10K "
+        "or 2M.\nWith --total-size the total size of the directories is used")
+    parser.add_argument(
+        "--newer-than", type=time_value, metavar="TIME",
+        help="list only the entries modified after TIME, a unix epoch or a "
+        "date like\n2023-11-14 or 2023-11-14T10:30")
+    parser.add_argument(
+        "--limit", type=non_negative_int, metavar="N",
+        help="list at most N entries")
+    parser.add_argument(
+        "--offset", type=non_negative_int, default=0, metavar="K",
+        help="skip the first K entries")
+    parser.add_argument(
+        "--find", metavar="PATTERN",
+        help="print the path of each file and directory whose name matches\n"
+        "PATTERN, like find -name. The wildcards *, ? and [...] are allowed")
+    parser.add_argument(
+        "--paths-from", metavar="FILE",
+        type=argparse.FileType("r", encoding="UTF-8"),
+        help="list the paths in FILE too, one per line. Use - for the "
+        "standard input")
+    parser.add_argument(
+        "-h", action="store_true",
+        help="with -l, show human readable size like 1K 234M 2G etc.")
+    parser.add_argument('--help', action='help',
+                        help='display this help and exit')
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="keep the filesystem loaded and answer the next pyls commands.\n"
+        "When the daemon is running, pyls uses it instead of loading the "
+        "filesystem")
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="print to the standard error the time of each phase, the "
+        "nodes\nloaded and listed, the peak memory and the cache hit "
+        "rates.\nThe memory is traced with tracemalloc, that slows down "
+        "the run")
+    parser.add_argument(
+        "--stats-json", metavar="FILE",
+        help="write the statistics of --stats as json to FILE. Use - for "
+        "the\nstandard error")
+    parser.add_argument(
+        "--profile", metavar="FILE",
+        help="write a cProfile dump of the run to FILE, to be read with "
+        "pstats")
+    parser.add_argument('directory', nargs='*')
+    return parser
+
+
+def build_compile_parser() -> "argparse.ArgumentParser":
+    """Build the parser of the pyls compile arguments
+
+    Returns
+    ----------
+    parser: argparse.ArgumentParser
+        the parser
+    """
+    import argparse
+    compile_parser = argparse.ArgumentParser(
+        prog="pyls compile",
+        description="compile a json filesystem into a binary snapshot")
+    compile_parser.add_argument("json_path", help="the json filesystem")
+    compile_parser.add_argument(
+        "-o", dest="output",
+        help="the snapshot to write. Default: the json path with .pyls suffix")
+    compile_parser.add_argument(
+        "-j", "--workers", type=int, default=1,
+        help="the number of processes parsing the json file. Default: 1")
+    return compile_parser
+
+
+def parse_common_arguments(argv: list[str]) -> Optional[SimpleNamespace]:
+    """Parse the common command lines without argparse: the short
+    options without value, alone or grouped like -lrt, --total-size,
+    --filter and the paths. The result has the same attributes
+    returned by the parser of build_parser.
+
+    Parameters
+    ----------
+    argv: list[str]
+        the command line arguments, program name excluded
+
+    Returns
+    ----------
+    args: SimpleNamespace | None
+        the parsed arguments, None if the command line must
+        be parsed by argparse
+    """
+    args = SimpleNamespace(
+        A=False, l=False, r=False, t=False, S=False, R=False, filter=None,
+        total_size=False, min_size=None, newer_than=None, limit=None,
+        offset=0, find=None, paths_from=None, h=False, serve=False,
+        stats=False, stats_json=None, profile=None, directory=[])
+    arguments = iter(argv)
+    previous_option = False
+    for argument in arguments:
+        if not argument.startswith("-"):
+            # Like argparse, the paths must be consecutive
+            if previous_option and args.directory:
+                return None
+            args.directory.append(argument)
+            previous_option = False
+            continue
+        previous_option = True
+        if argument == "--total-size":
+            args.total_size = True
+        elif argument == "--filter" or argument.startswith("--filter="):
+            value = argument[len("--filter="):] if "=" in argument \
+                else next(arguments, None)
+            if value not in FILTER_CHOICES:
+                return None
+            args.filter = value
+        elif len(argument) > 1 and argument[1] != "-" \
+                and SHORT_FLAGS.issuperset(argument[1:]):
+            for flag in argument[1:]:
+                setattr(args, flag, True)
+        else:
+            return None
+    return args
+
+
+def parse_arguments(argv: list[str]) -> "argparse.Namespace":
+    """Parse the pyls command line arguments, with
+    parse_common_arguments when possible and argparse otherwise
+
+    Parameters
+    ----------
+    argv: list[str]
+        the command line arguments, program name excluded
+
+    Returns
+    ----------
+    args: argparse.Namespace | SimpleNamespace
+        the parsed arguments
+
+    Raises
+    ----------
+    SystemExit
+        if the arguments are not valid, or after printing the help
+    """
+    args = parse_common_arguments(argv)
+    if args is None:
+        args = build_parser().parse_args(argv)
+    return args
+
+
+def compile_json(argv: list[str]) -> int:
+    """Compile a json filesystem into a binary snapshot
+
+    Parameters
+    ----------
+    argv: list[str]
+        the command line arguments following "compile"
+
+    Returns
+    ----------
+    exit_code: int
+        0 on success, 1 if the json filesystem is invalid
+    """
+    from pyls.data.tree import FileSystemTree
+    from pyls.utils.snapshot import write_snapshot
+
+    args = build_compile_parser().parse_args(argv)
+    output = args.output or os.path.splitext(args.json_path)[0] + ".pyls"
+    if args.workers > 1:
+        tree = FileSystemTree(args.json_path, workers=args.workers)
+    else:
+        tree = FileSystemTree(args.json_path, streaming=True)
+    if tree.root is None:
+        return 1
+    write_snapshot(output, tree.root)
+    return 0
+
+
+def open_tree(json_path: str) -> "FileSystemTree":
+    """Open the filesystem tree of json_path. The binary snapshot
+    with the same name and the .pyls suffix is used instead
+    when it is newer than the json file
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json filesystem
+
+    Returns
+    ----------
+    tree: FileSystemTree
+        the filesystem tree
+    """
+    with stats.phase("import"):
+        from pyls.data.tree import FileSystemTree
+
+    snapshot_path = os.path.splitext(json_path)[0] + ".pyls"
+    try:
+        snapshot_mtime = os.path.getmtime(snapshot_path)
+    except OSError:
+        return FileSystemTree(json_path, lazy=True)
+    try:
+        use_snapshot = snapshot_mtime > os.path.getmtime(json_path)
+    except OSError:
+        use_snapshot = True
+    if use_snapshot:
+        return FileSystemTree(snapshot_path, snapshot=True)
+    return FileSystemTree(json_path, lazy=True)
+
+
+def load_resident_tree(json_path: str) -> "FileSystemTree":
+    """Build the whole filesystem tree of json_path, for the daemon.
+    Unlike open_tree it never maps the json file or the snapshot:
+    they can be rewritten while the daemon serves the tree, and a
+    mapped file rewritten in place gives wrong bytes or SIGBUS
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json filesystem
+
+    Returns
+    ----------
+    tree: FileSystemTree
+        the filesystem tree
+    """
+    from pyls.data.tree import FileSystemTree
+
+    return FileSystemTree(json_path)
+
+
+def operands(args: "argparse.Namespace") -> list[Optional[str]]:
+    """Collect the paths to list from the arguments and the
+    --paths-from file
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        the parsed pyls command line arguments
+
+    Returns
+    ----------
+    paths: list[str | None]
+        the paths to list, [None] to list the root
+    """
+    paths = list(args.directory)
+    if args.paths_from is not None:
+        paths.extend(line for line in args.paths_from.read().splitlines()
+                     if line)
+        if args.paths_from is not sys.stdin:
+            args.paths_from.close()
+    return paths or [None]
+
+
+def option_fields(args: "argparse.Namespace") -> dict:
+    """Convert the parsed arguments into the fields of the listing
+    options, as sent to the daemon. Unlike listing_options it does
+    not import the listing modules
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        the parsed pyls command line arguments
+
+    Returns
+    ----------
+    fields: dict
+        the value of each field of the ListingOptions class
+    """
+    return {"show_all": args.A, "long_listing": args.l,
+            "reverse_sorting": args.r, "sort_by_time": args.t,
+            "sort_by_size": args.S, "filter_by": args.filter,
+            "humanize": args.h, "total_size": args.total_size,
+            "limit": args.limit, "offset": args.offset,
+            "min_size": args.min_size, "newer_than": args.newer_than}
+
+
+def listing_options(args: "argparse.Namespace") -> "ListingOptions":
+    """Convert the parsed arguments into the listing options
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        the parsed pyls command line arguments
+
+    Returns
+    ----------
+    options: ListingOptions
+        the listing options
+    """
+    from pyls.data.listing import ListingOptions
+
+    return ListingOptions(**option_fields(args))
+
+
+def list_tree(tree: "FileSystemTree", args: "argparse.Namespace",
+              paths: list[Optional[str]]) -> None:
+    """Print the listing requested by the parsed arguments
+
+    Parameters
+    ----------
+    tree: FileSystemTree
+        the filesystem tree to list
+    args: argparse.Namespace
+        the parsed pyls command line arguments
+    paths: list[str | None]
+        the paths to list, as returned by operands
+    """
+    from pyls.data.listing import (not_found_message, write_listing,
+                                   write_listings)
+
+    if not tree.root:
+        return
+    if args.find is not None:
+        paths = tree.find(args.find)
+        if paths:
+            print("\n".join(paths))
+        return
+    if len(paths) > 1:
+        missing, results = tree.list_operands(
+            paths, listing_options(args), recursive=args.R)
+        for path in missing:
+            print(not_found_message(path))
+        write_listings(results, sys.stdout)
+        return
+    headers, results = tree.list_operand(
+        paths[0], listing_options(args), recursive=args.R)
+    if headers:
+        write_listings(results, sys.stdout)
+        return
+    result = next(results)
+    if not result.found:
+        print(not_found_message(paths[0]))
+    else:
+        write_listing(result, sys.stdout)
+
+
+def list_from_server(socket_path: str, args: "argparse.Namespace",
+                     paths: list[Optional[str]]) -> bool:
+    """Print the listing requested by the parsed arguments
+    asking it to the pyls daemon
+
+    Parameters
+    ----------
+    socket_path: str
+        the socket of the daemon
+    args: argparse.Namespace
+        the parsed pyls command line arguments
+    paths: list[str | None]
+        the paths to list, as returned by operands
+
+    Returns
+    ----------
+    result: bool
+        True if the daemon answered, False if the
+        listing must be done in process
+    """
+    if args.find is not None:
+        request = {"find": args.find}
+    else:
+        request = {"options": option_fields(args),
+                   "recursive": args.R}
+        if len(paths) > 1:
+            request["paths"] = paths
+        else:
+            request["path"] = paths[0]
+    response = client.request_listing(socket_path, request)
+    if response is None:
+        return False
+    if "output" in response:
+        # An empty listing is an empty line, no match of find prints nothing
+        if response["output"] or args.find is None:
+            print(response["output"])
+    elif response.get("error") == "not_found":
+        from pyls.data.listing import not_found_message
+
+        print(not_found_message(paths[0]))
+    else:
+        return False
+    return True
+
+
+def list_paths(json_path: str, socket_path: str,
+               args: "argparse.Namespace") -> None:
+    """Print the listing requested by the parsed arguments, asking it
+    to the daemon when it is running
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json filesystem
+    socket_path: str
+        the socket of the daemon
+    args: argparse.Namespace
+        the parsed pyls command line arguments
+    """
+    try:
+        paths = operands(args)
+        with stats.phase("daemon"):
+            answered = list_from_server(socket_path, args, paths)
+        if not answered:
+            tree = open_tree(json_path)
+            # Imported by open_tree, in the import phase
+            from pyls.data.tree import InvalidFileSystemError
+
+            try:
+                list_tree(tree, args, paths)
+            except InvalidFileSystemError as error:
+                # Found in a directory of the lazy tree read on demand
+                print(error, file=sys.stderr)
+            stats.add_cache("path_cache", tree.path_cache.cache_info())
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader, like head, does not want the rest of the listing.
+        # stdout is redirected so that its final flush does not fail
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+
+
+def write_stats(run_stats: stats.RunStats,
+                args: "argparse.Namespace") -> None:
+    """Write the statistics of a run as requested by --stats
+    and --stats-json
+
+    Parameters
+    ----------
+    run_stats: RunStats
+        the statistics of the run
+    args: argparse.Namespace
+        the parsed pyls command line arguments
+    """
+    if args.stats:
+        print(run_stats.report(), file=sys.stderr)
+    if args.stats_json == "-":
+        print(run_stats.to_json(), file=sys.stderr)
+    elif args.stats_json is not None:
+        with open(args.stats_json, "w", encoding="UTF-8") as stats_file:
+            stats_file.write(run_stats.to_json() + "\n")
 
 
 def main():
     """Function executed at startup"""
-    args = parser.parse_args()
-    tree = FileSystemTree(
-        os.path.join(
-            os.path.dirname(os.path.realpath(__file__)),
-            "structure.json"))
-    if tree.root:
-        if not tree.change_directory(args.directory):
-            print(
-                f"error: cannot access '{args.directory}': "
-                "No such file or directory")
-        else:
-            tree.print_children(
-                show_all=args.A, long_listing=args.l, reverse_sorting=args.r,
-                sort_by_time=args.t, filter_by=args.filter, humanize=args.h)
+    if sys.argv[1:2] == ["compile"]:
+        sys.exit(compile_json(sys.argv[2:]))
+    args = parse_arguments(sys.argv[1:])
+    json_path = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), "structure.json")
+    socket_path = client.default_socket_path(json_path)
+    if args.serve:
+        from pyls import server
+
+        try:
+            server.run_daemon(json_path, socket_path, load_resident_tree)
+        except OSError as error:
+            print(f"error: cannot listen on '{socket_path}': "
+                  f"{error.strerror}", file=sys.stderr)
+            sys.exit(1)
+        return
+    profiler = None
+    if args.profile is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    run_stats = None
+    collection = stats.collect() \
+        if args.stats or args.stats_json is not None \
+        else contextlib.nullcontext()
+    try:
+        with collection as run_stats:
+            list_paths(json_path, socket_path, args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if run_stats is not None:
+            write_stats(run_stats, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""Module providing the client used by the pyls command to reach the
+listing server of pyls.server. It imports only what a request needs,
+so that the pyls command starts quickly when the daemon is running"""
+
+import json
+import os
+import socket
+import tempfile
+import zlib
+from typing import Optional
+
+CONNECT_TIMEOUT = 5.0
+
+
+def default_socket_path(json_path: str) -> str:
+    """Return the socket of the daemon serving json_path. It can be
+    overridden with the PYLS_SOCKET environment variable
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json filesystem
+
+    Returns
+    ----------
+    socket_path: str
+        the path of the unix socket
+    """
+    if "PYLS_SOCKET" in os.environ:
+        return os.environ["PYLS_SOCKET"]
+    path_hash = zlib.crc32(os.path.realpath(json_path).encode())
+    return os.path.join(tempfile.gettempdir(),
+                        f"pyls-{os.getuid()}-{path_hash:08x}.sock")
+
+
+def is_running(socket_path: str) -> bool:
+    """Check whether a server is listening on socket_path.
+
+    Parameters
+    ----------
+    socket_path: str
+        the path of the unix socket
+
+    Returns
+    ----------
+    result: bool
+        True if the connection succeeds
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def request_listing(socket_path: str, request: dict) -> Optional[dict]:
+    """Send a single request to the server listening on socket_path.
+
+    Parameters
+    ----------
+    socket_path: str
+        the path of the unix socket
+    request: dict
+        the listing request
+
+    Returns
+    ----------
+    response: dict | None
+        the response, None if the server is not running
+        or does not answer
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(CONNECT_TIMEOUT)
+            client.connect(socket_path)
+            client.sendall(json.dumps(request).encode() + b"\n")
+            with client.makefile("rb") as response_file:
+                return json.loads(response_file.readline())
+    except (OSError, ValueError):
+        return None
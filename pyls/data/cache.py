@@ -0,0 +1,175 @@
+"""Module providing the cache of the paths resolved in the filesystem tree"""
+
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+# Default number of paths kept by a PathCache
+PATH_CACHE_SIZE = 4096
+
+
+def normalize_path(path: str) -> str:
+    """Remove the empty and the . components of a path. The ..
+    components are kept, since their parent may be a file.
+    The paths already normalized are returned without splitting them
+
+    Parameters
+    ----------
+    path: str
+        the path to normalize
+
+    Returns
+    ----------
+    normalized_path: str
+        the path without empty and . components, "" for the root
+    """
+    if "//" in path or "/./" in path or path == "." \
+            or path.startswith(("/", "./")) or path.endswith(("/", "/.")):
+        return "/".join(component for component in path.split("/")
+                        if component and component != ".")
+    return path
+
+
+class CacheInfo(NamedTuple):
+    """The statistics of a cache, like the ones of functools.lru_cache
+
+    Attributes
+    ----------
+    hits : int
+        the number of lookups that found their path
+    misses : int
+        the number of lookups that did not find their path
+    maxsize : int
+        the largest number of paths kept
+    currsize : int
+        the number of paths currently kept
+    """
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class PathCache:
+    """A class used to represent a bounded LRU cache from a normalized
+    path to its node. When it is full, the least recently used path
+    is dropped. It can be used from concurrent threads
+
+    Attributes
+    ----------
+    maxsize : int
+        the largest number of paths kept
+    hits : int
+        the number of get calls that found their path
+    misses : int
+        the number of get calls that did not find their path
+    """
+
+    def __init__(self, maxsize: int = PATH_CACHE_SIZE):
+        """
+        Parameters
+        ----------
+        maxsize: int
+            the largest number of paths kept, 0 to disable the cache
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._nodes: OrderedDict = OrderedDict()
+        self._root = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def bind(self, root) -> None:
+        """Clear the cache if its paths were resolved from a root
+        different from the given one, like after the tree is reloaded.
+
+        Parameters
+        ----------
+        root: TreeNode
+            the root the next paths are resolved from
+        """
+        if self._root is not root:
+            with self._lock:
+                self._nodes.clear()
+                self._root = root
+
+    def get(self, path: str):
+        """Return the node of a path, counting a hit or a miss.
+
+        Parameters
+        ----------
+        path: str
+            the normalized path
+
+        Returns
+        ----------
+        node: TreeNode | None
+            the node, None if the path is not in the cache
+        """
+        with self._lock:
+            node = self._nodes.get(path)
+            if node is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._nodes.move_to_end(path)
+        return node
+
+    def peek(self, path: str):
+        """Return the node of a path, like get, without counting it.
+        Used for the lookups of the ancestors of a path
+
+        Parameters
+        ----------
+        path: str
+            the normalized path
+
+        Returns
+        ----------
+        node: TreeNode | None
+            the node, None if the path is not in the cache
+        """
+        with self._lock:
+            node = self._nodes.get(path)
+            if node is not None:
+                self._nodes.move_to_end(path)
+        return node
+
+    def put(self, path: str, node) -> None:
+        """Add the node of a path, dropping the least
+        recently used path when the cache is full.
+
+        Parameters
+        ----------
+        path: str
+            the normalized path
+        node: TreeNode
+            the node of the path
+        """
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._nodes[path] = node
+            self._nodes.move_to_end(path)
+            if len(self._nodes) > self.maxsize:
+                self._nodes.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all the paths, like after a change of the tree.
+        The counters are kept"""
+        with self._lock:
+            self._nodes.clear()
+
+    def cache_info(self) -> CacheInfo:
+        """Return the statistics of the cache.
+
+        Returns
+        ----------
+        info: CacheInfo
+            the hits, the misses, the maximum and the current size
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._nodes))
@@ -0,0 +1,278 @@
+"""Module containing the column store of the children of a directory.
+When numpy is installed, the listings of big directories are filtered
+with boolean masks and sorted with argsort instead of visiting each
+node; without numpy the listings visit the nodes as before"""
+
+import functools
+import importlib
+import operator
+from typing import TYPE_CHECKING, Collection, Optional
+
+from pyls.data.filesystem import FileSystemNodeType
+
+if TYPE_CHECKING:
+    import numpy
+
+# Smallest number of children stored in columns. For smaller
+# directories the loops over the nodes are faster than the arrays
+COLUMNS_MIN_CHILDREN = 1024
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    """Import numpy, an optional dependency, on the first call, so
+    that the listings of small directories do not pay for its import.
+
+    Returns
+    ----------
+    numpy: module | None
+        the numpy module, None if it is not installed
+    """
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        return None
+
+
+class ChildColumns:
+    """A class used to represent the children of a directory as one
+    numpy array per field, in the json order of the children
+
+    Attributes
+    ----------
+    children : list[TreeNode]
+        the children, the rows of the columns
+    sizes : numpy.ndarray
+        the size of each child
+    times : numpy.ndarray
+        the last modification time of each child
+    types : numpy.ndarray
+        the FileSystemNodeType value of each child
+    permission_codes : numpy.ndarray
+        the position in permissions of the permissions of each child
+    permissions : list[Permissions]
+        the distinct permissions of the children
+    hidden : numpy.ndarray
+        whether the name of each child starts with .
+    """
+
+    __slots__ = ("children", "sizes", "times", "types", "permission_codes",
+                 "permissions", "hidden", "_total_sizes", "_orders")
+
+    def __init__(self, children: Collection):
+        """
+        Parameters
+        ----------
+        children: Collection[TreeNode]
+            the children of the directory
+
+        Raises
+        ----------
+        TypeError
+            if a size or a time is not an integer that fits in 64 bits
+        """
+        np = load_numpy()
+        self.children = list(children)
+        self.sizes = ChildColumns._integers(
+            [child.size for child in self.children])
+        self.times = ChildColumns._integers(
+            [child.time_modified for child in self.children])
+        self.types = np.array(
+            [child.node_type.value for child in self.children],
+            dtype=np.uint8)
+        codes: dict = {}
+        self.permission_codes = np.array(
+            [codes.setdefault(child.permissions, len(codes))
+             for child in self.children], dtype=np.uint32)
+        self.permissions = list(codes)
+        self.hidden = np.array(
+            [child.name.startswith(".") for child in self.children],
+            dtype=bool)
+        self._total_sizes = None
+        self._orders: "dict[tuple[str, bool], numpy.ndarray]" = {}
+
+    @staticmethod
+    def _integers(values: list) -> "numpy.ndarray":
+        """Convert a list of integers to an array.
+
+        Raises
+        ----------
+        TypeError
+            if a value is not an integer that fits in 64 bits
+        """
+        array = load_numpy().array(values)
+        if array.dtype.kind not in "iu":
+            raise TypeError("The values are not 64 bit integers")
+        return array
+
+    @classmethod
+    def build(cls, children: Collection) -> Optional["ChildColumns"]:
+        """Build the columns of the children of a directory, if numpy
+        is installed and they are enough to be worth it.
+
+        Parameters
+        ----------
+        children: Collection[TreeNode]
+            the children of the directory
+
+        Returns
+        ----------
+        columns: ChildColumns | None
+            the columns, None if the listings must visit the nodes
+        """
+        if len(children) < COLUMNS_MIN_CHILDREN or load_numpy() is None:
+            return None
+        try:
+            return cls(children)
+        except TypeError:
+            return None
+
+    def values(self, key: str) -> "numpy.ndarray":
+        """Return the column of an attribute of the TreeNode class.
+
+        Parameters
+        ----------
+        key: str
+            size, total_size or time_modified
+
+        Returns
+        ----------
+        values: numpy.ndarray
+            the value of each child
+        """
+        if key == "size":
+            return self.sizes
+        if key == "time_modified":
+            return self.times
+        if self._total_sizes is None:
+            self._total_sizes = ChildColumns._integers(
+                [child.total_size for child in self.children])
+        return self._total_sizes
+
+    def mask(self, node_type: Optional[FileSystemNodeType], show_all: bool,
+             min_size: Optional[int] = None,
+             newer_than: Optional[int] = None,
+             size_key: str = "size") -> "numpy.ndarray":
+        """Return the children kept by the filters of a listing.
+
+        Parameters
+        ----------
+        node_type: FileSystemNodeType | None
+            the node type listed, None for all of them
+        show_all: bool
+            whether the children whose name starts with . are kept
+        min_size: int | None
+            the smallest size kept, None for all the sizes
+        newer_than: int | None
+            the children modified at this time or before are
+            dropped, None for all the times
+        size_key: str
+            the attribute compared with min_size, size or total_size
+
+        Returns
+        ----------
+        mask: numpy.ndarray
+            True for each child kept
+        """
+        mask = load_numpy().ones(len(self.children), dtype=bool)
+        if node_type is not None:
+            mask &= self.types == node_type.value
+        if not show_all:
+            mask &= ~self.hidden
+        if min_size is not None:
+            mask &= self.values(size_key) >= min_size
+        if newer_than is not None:
+            mask &= self.times > newer_than
+        return mask
+
+    def order(self, sort_by: str, reverse: bool = False) -> "numpy.ndarray":
+        """Return the positions of the children sorted by an attribute,
+        computed on the first request and then kept. The children with
+        the same value stay in their json order also in descending
+        order, like DirectoryIndex.sorted_by.
+
+        Parameters
+        ----------
+        sort_by: str
+            the attribute of the TreeNode class used to sort
+        reverse: bool
+            whether the order is descending
+
+        Returns
+        ----------
+        positions: numpy.ndarray
+            the positions of the children in order
+        """
+        positions = self._orders.get((sort_by, reverse))
+        if positions is not None:
+            return positions
+        np = load_numpy()
+        if sort_by == "name":
+            # The names are unique, the descending order is the
+            # ascending one reversed
+            positions = self._orders.get((sort_by, False))
+            if positions is None:
+                positions = np.array(sorted(
+                    range(len(self.children)),
+                    key=[child.name for child in self.children].__getitem__))
+            if reverse:
+                positions = positions[::-1]
+        elif not reverse:
+            positions = np.argsort(self.values(sort_by), kind="stable")
+        else:
+            # Stable descending order: the stable ascending order of the
+            # reversed column, reversed and mapped to the original rows
+            values = self.values(sort_by)
+            positions = len(values) - 1 - np.argsort(
+                values[::-1], kind="stable")[::-1]
+        self._orders[(sort_by, reverse)] = positions
+        return positions
+
+    def select(self, sort_by: str, reverse: bool, mask: "numpy.ndarray",
+               start: int = 0, stop: Optional[int] = None) -> list:
+        """Return the children kept by a mask, in order. Only the
+        nodes of the requested page are taken from the children list.
+
+        Parameters
+        ----------
+        sort_by: str
+            the attribute of the TreeNode class used to sort
+        reverse: bool
+            whether the order is descending
+        mask: numpy.ndarray
+            True for each child kept, see mask
+        start: int
+            the number of children skipped
+        stop: int | None
+            the position following the last child returned,
+            None for all of them
+
+        Returns
+        ----------
+        children: list[TreeNode]
+            the children selected
+        """
+        positions = self.order(sort_by, reverse)
+        positions = positions[mask[positions]][start:stop]
+        if not len(positions):
+            return []
+        if len(positions) == 1:
+            return [self.children[positions[0]]]
+        return list(operator.itemgetter(*positions.tolist())(self.children))
+
+    def max_sizes(self) -> dict[FileSystemNodeType, int]:
+        """Return the largest size of the children of each node type.
+
+        Returns
+        ----------
+        max_size: dict[FileSystemNodeType, int]
+            the largest size of each type, 0 if there are no children
+            of that type
+        """
+        max_size = {}
+        for node_type in (FileSystemNodeType.FILE,
+                          FileSystemNodeType.DIRECTORY):
+            sizes = self.sizes[self.types == node_type.value]
+            max_size[node_type] = max(int(sizes.max()), 0) \
+                if len(sizes) else 0
+        return max_size
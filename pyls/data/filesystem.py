@@ -1,8 +1,24 @@
 """Module containing all the classes and method
 related to the filesystem of pyls"""
-from dataclasses import dataclass
+import stat
 from enum import Enum
 
+_FILE_TYPES = {"-": stat.S_IFREG, "d": stat.S_IFDIR, "l": stat.S_IFLNK,
+               "c": stat.S_IFCHR, "b": stat.S_IFBLK, "p": stat.S_IFIFO,
+               "s": stat.S_IFSOCK}
+# For each of the 9 permission characters, the bits set by each letter
+_PERMISSION_BITS = [
+    {"r": stat.S_IRUSR}, {"w": stat.S_IWUSR},
+    {"x": stat.S_IXUSR, "s": stat.S_IXUSR | stat.S_ISUID,
+     "S": stat.S_ISUID},
+    {"r": stat.S_IRGRP}, {"w": stat.S_IWGRP},
+    {"x": stat.S_IXGRP, "s": stat.S_IXGRP | stat.S_ISGID,
+     "S": stat.S_ISGID},
+    {"r": stat.S_IROTH}, {"w": stat.S_IWOTH},
+    {"x": stat.S_IXOTH, "t": stat.S_IXOTH | stat.S_ISVTX,
+     "T": stat.S_ISVTX},
+]
+
 
 # class syntax
 class FileSystemNodeType(Enum):
@@ -11,23 +27,62 @@ class FileSystemNodeType(Enum):
     DIRECTORY = 2
 
 
-@dataclass
-class FileSystemNode:
-    """A dataclass used to represent node of the pyls filesystem
+class Permissions(str):
+    """A class used to represent the permissions of a node.
+    The instances are shared: each distinct permissions string is
+    built once by Permissions.intern, with its mode bitmask
+    precomputed, and all the nodes reference the same object
 
     Attributes
     ----------
-    name : str
-        the file/directory name
-    size: int
-        the file/directory size
-    time_modified: int
-        the unix epoch of the file/directory last modification time
-    permissions: str
-        the permissions attached to the file/directory
+    mode : int
+        the st_mode bitmask equivalent to the string,
+        e.g. 0o40755 for drwxr-xr-x
     """
-    name: str
-    size: int
-    time_modified: int
-    permissions: str
-    node_type: FileSystemNodeType
+
+    _instances: dict[str, "Permissions"] = {}
+
+    def __new__(cls, permissions: str):
+        instance = super().__new__(cls, permissions)
+        instance.mode = Permissions.parse_mode(permissions)
+        return instance
+
+    @classmethod
+    def intern(cls, permissions: str) -> "Permissions":
+        """Return the shared instance for the given permissions string.
+
+        Parameters
+        ----------
+        permissions: str
+            the permissions string, e.g. -rw-r--r--
+
+        Returns
+        ----------
+        instance: Permissions
+            the shared instance equal to permissions
+        """
+        instance = cls._instances.get(permissions)
+        if instance is None:
+            instance = cls._instances.setdefault(
+                permissions, cls(permissions))
+        return instance
+
+    @staticmethod
+    def parse_mode(permissions: str) -> int:
+        """Convert a permissions string into a st_mode bitmask.
+        The unknown characters do not set any bit
+
+        Parameters
+        ----------
+        permissions: str
+            the permissions string, e.g. -rw-r--r--
+
+        Returns
+        ----------
+        mode: int
+            the st_mode bitmask
+        """
+        mode = _FILE_TYPES.get(permissions[:1], 0)
+        for bits, char in zip(_PERMISSION_BITS, permissions[1:]):
+            mode |= bits.get(char, 0)
+        return mode
@@ -0,0 +1,263 @@
+"""Module containing the data derived from the children of a
+directory, that is computed once and cached on the directory node"""
+
+import heapq
+import itertools
+import operator
+from array import array
+from typing import Callable, Collection, Iterator, Optional
+
+from pyls.data.columns import ChildColumns
+from pyls.data.filesystem import FileSystemNodeType
+from pyls.utils.formatters import humanize_sizes
+
+
+class DirectoryIndex:
+    """A class used to keep the data of the children of a directory
+    needed by each listing, so that it is not computed again by every
+    listing of the same directory
+
+    Attributes
+    ----------
+    max_size : dict[FileSystemNodeType, int]
+        the largest size of the children of each node type
+    subdirectories : list[TreeNode]
+        the children that are directories, in their json order
+    visible_subdirectories : list[TreeNode]
+        the subdirectories whose name does not start with .
+    """
+
+    __slots__ = ("_children", "_max_size", "_subdirectories",
+                 "_visible_subdirectories", "_descendants", "_widths",
+                 "_orders", "_columns", "_columns_built")
+
+    def __init__(self, children: Collection):
+        """
+        Parameters
+        ----------
+        children: Collection[TreeNode]
+            the children of the directory, usually the values
+            of its children dictionary
+        """
+        self._children = children
+        self._max_size: Optional[dict[FileSystemNodeType, int]] = None
+        self._subdirectories: Optional[list] = None
+        self._visible_subdirectories: Optional[list] = None
+        self._descendants: Optional[tuple[list, array]] = None
+        self._widths: dict[tuple[str, bool], dict] = {}
+        self._orders: dict[tuple[str, bool], list] = {}
+        self._columns: Optional[ChildColumns] = None
+        self._columns_built = False
+
+    def columns(self) -> Optional[ChildColumns]:
+        """Return the column store of the children, built on the first
+        call. See ChildColumns.build
+
+        Returns
+        ----------
+        columns: ChildColumns | None
+            the columns, None if the listings must visit the nodes
+        """
+        if not self._columns_built:
+            self._columns = ChildColumns.build(self._children)
+            self._columns_built = True
+        return self._columns
+
+    @property
+    def max_size(self) -> dict[FileSystemNodeType, int]:
+        """The largest size of the children of each node type,
+        computed on the first access"""
+        if self._max_size is None and self.columns() is not None:
+            self._max_size = self._columns.max_sizes()
+        if self._max_size is None:
+            max_size = {FileSystemNodeType.FILE: 0,
+                        FileSystemNodeType.DIRECTORY: 0}
+            for child in self._children:
+                if child.size > max_size[child.node_type]:
+                    max_size[child.node_type] = child.size
+            self._max_size = max_size
+        return self._max_size
+
+    @property
+    def subdirectories(self) -> list:
+        """The children that are directories, in their json order,
+        computed on the first access"""
+        if self._subdirectories is None:
+            self._subdirectories = [
+                child for child in self._children
+                if child.node_type == FileSystemNodeType.DIRECTORY]
+        return self._subdirectories
+
+    @property
+    def visible_subdirectories(self) -> list:
+        """The subdirectories whose name does not start with .,
+        computed on the first access"""
+        if self._visible_subdirectories is None:
+            self._visible_subdirectories = [
+                child for child in self.subdirectories
+                if not child.name.startswith(".")]
+        return self._visible_subdirectories
+
+    def visible_descendants(self, node) -> tuple[list, array]:
+        """Return all the directories of the subtree of node, the
+        ones whose name starts with . and their subtrees excluded.
+        They are collected on the first call and then kept, so that
+        the ** patterns starting at node do not visit the subtree again.
+        The tree must not be changed without FileSystemTree.add_node
+        and remove_node, that drop the indexes of the ancestors
+
+        Parameters
+        ----------
+        node: TreeNode
+            the directory of this index
+
+        Returns
+        ----------
+        result: tuple[list[TreeNode], array]
+            the directories, node first, and the position in the
+            list of the parent of each one, -1 for node
+        """
+        if self._descendants is None:
+            nodes = [node]
+            parents = array("l", [-1])
+            stack = [0]
+            while stack:
+                position = stack.pop()
+                index = nodes[position].directory_index()
+                if index is None:
+                    continue
+                for child in index.visible_subdirectories:
+                    stack.append(len(nodes))
+                    nodes.append(child)
+                    parents.append(position)
+            self._descendants = (nodes, parents)
+        return self._descendants
+
+    def sorted_by(self, sort_by: str, reverse: bool = False) -> list:
+        """Return the children sorted by one of their attributes.
+        Each order is sorted on the first request and then kept,
+        the children with the same value stay in their json order
+        also in descending order, like a stable sort does.
+
+        Parameters
+        ----------
+        sort_by: str
+            the attribute of the TreeNode class used to sort
+            the children: name, time_modified or size
+        reverse: bool
+            whether the order is descending
+
+        Returns
+        ----------
+        children: list[TreeNode]
+            the sorted children. The list must not be changed
+        """
+        ordered = self._orders.get((sort_by, reverse))
+        if ordered is None:
+            ordered = sorted(self._children,
+                             key=operator.attrgetter(sort_by),
+                             reverse=reverse)
+            self._orders[(sort_by, reverse)] = ordered
+        return ordered
+
+    def walk(self, sort_by: str, reverse: bool) -> Iterator:
+        """Iterate over the children in the order of a listing,
+        without sorting them again.
+
+        Parameters
+        ----------
+        sort_by: str
+            the attribute of the TreeNode class used to sort the children
+        reverse: bool
+            whether the order is descending
+
+        Returns
+        ----------
+        children: Iterator[TreeNode]
+            the children in order
+        """
+        if reverse and sort_by == "name":
+            # The names in a directory are unique, so the descending
+            # order is the ascending one reversed
+            return reversed(self.sorted_by(sort_by))
+        return iter(self.sorted_by(sort_by, reverse))
+
+    def size_width(self, node_type: Optional[FileSystemNodeType],
+                   humanize: bool, size_key: str = "size",
+                   texts: Optional[dict] = None) -> int:
+        """Return the width of the size column of a listing.
+
+        Parameters
+        ----------
+        node_type: FileSystemNodeType | None
+            the node type of the children listed, None for all of them
+        humanize: bool
+            whether the sizes are human readable
+        size_key: str
+            the attribute of the TreeNode class with the size listed,
+            size or total_size
+        texts: dict | None
+            updated with the human readable sizes, when they are
+            converted by this call, so that the rows of the listing
+            can reuse them. See humanize_sizes
+
+        Returns
+        ----------
+        width: int
+            the length of the longest size
+        """
+        if size_key == "size" and not humanize:
+            widths = {node: len(str(size))
+                      for node, size in self.max_size.items()}
+        else:
+            # The length of a human readable size does not grow with
+            # the size, so it is computed on all the children once
+            widths = self._widths.get((size_key, humanize))
+            if widths is None:
+                empty_width = 0 if humanize else 1
+                widths = {FileSystemNodeType.FILE: empty_width,
+                          FileSystemNodeType.DIRECTORY: empty_width}
+                sizes = [getattr(child, size_key) for child in self._children]
+                lengths = map(len, humanize_sizes(sizes, texts) if humanize
+                              else map(str, sizes))
+                for child, length in zip(self._children, lengths):
+                    if length > widths[child.node_type]:
+                        widths[child.node_type] = length
+                self._widths[(size_key, humanize)] = widths
+        if node_type is None:
+            return max(widths.values())
+        return widths[node_type]
+
+    def select(self, sort_by: str, reverse: bool, count: Optional[int],
+               keep: Callable[[object], bool]) -> list:
+        """Return the first children of an order that satisfy keep.
+        If the order is not cached yet, the children are selected
+        with a bounded heap instead of sorting all of them, and
+        the order is not cached.
+
+        Parameters
+        ----------
+        sort_by: str
+            the attribute of the TreeNode class used to sort the children
+        reverse: bool
+            whether the order is descending
+        count: int | None
+            the number of children to return, None for all of them
+        keep: Callable[[TreeNode], bool]
+            the function telling whether a child can be returned
+
+        Returns
+        ----------
+        children: list[TreeNode]
+            the children selected, in order
+        """
+        cached = (sort_by, reverse) in self._orders or (
+            reverse and sort_by == "name" and (sort_by, False) in self._orders)
+        if count is None or cached:
+            return list(itertools.islice(
+                filter(keep, self.walk(sort_by, reverse)), count))
+        # nsmallest and nlargest keep the children with the same
+        # value in their json order, like sorted does
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return select(count, filter(keep, self._children),
+                      key=operator.attrgetter(sort_by))
@@ -0,0 +1,376 @@
+"""Module containing the classes that describe a directory
+listing and the functions that render it as text"""
+
+import io
+from dataclasses import dataclass, field
+from typing import (IO, BinaryIO, Callable, Iterable, Iterator, Optional,
+                    TextIO, Union)
+
+from pyls.utils import stats
+from pyls.utils.formatters import TimeFormatter, humanize_sizes
+
+# Number of rows formatted before each write of write_listing
+WRITE_BATCH = 4096
+
+
+@dataclass(frozen=True)
+class ListingOptions:
+    """A dataclass used to represent the options of a listing
+
+    Attributes
+    ----------
+    show_all : bool
+        whether the entries starting with . are listed
+    long_listing : bool
+        whether the long listing format is used
+    reverse_sorting : bool
+        whether the sorting order is reversed
+    sort_by_time : bool
+        whether the entries are sorted by time instead of name
+    sort_by_size : bool
+        whether the entries are sorted by size instead of name.
+        sort_by_time takes precedence
+    filter_by : str | None
+        file to list only files, dir to list only directories
+    humanize : bool
+        whether the sizes are human readable in the long listing
+    total_size : bool
+        whether the size of the directories is the total size of their
+        subtree, for the long listing and for sort_by_size
+    limit : int | None
+        the largest number of entries listed, None for no limit
+    offset : int
+        the number of entries skipped before the first one listed
+    min_size : int | None
+        the smallest size listed, compared with the size listed,
+        None for all the sizes
+    newer_than : int | None
+        the unix epoch of the newest modification time not listed,
+        None for all the times
+    """
+    show_all: bool = False
+    long_listing: bool = False
+    reverse_sorting: bool = False
+    sort_by_time: bool = False
+    sort_by_size: bool = False
+    filter_by: Optional[str] = None
+    humanize: bool = False
+    total_size: bool = False
+    limit: Optional[int] = None
+    offset: int = 0
+    min_size: Optional[int] = None
+    newer_than: Optional[int] = None
+
+    def __post_init__(self):
+        """
+        Raises
+        ----------
+        ValueError
+            if limit, offset, min_size or newer_than are not valid
+        """
+        if self.limit is not None and (
+                not isinstance(self.limit, int) or self.limit < 0):
+            raise ValueError("The limit must be a non negative integer")
+        if not isinstance(self.offset, int) or self.offset < 0:
+            raise ValueError("The offset must be a non negative integer")
+        if self.min_size is not None and (
+                not isinstance(self.min_size, int) or self.min_size < 0):
+            raise ValueError("The minimum size must be a non negative "
+                             "integer")
+        if self.newer_than is not None \
+                and not isinstance(self.newer_than, int):
+            raise ValueError("The time must be an integer")
+
+    @property
+    def sort_key(self) -> str:
+        """The attribute of the TreeNode class the entries are sorted by"""
+        if self.sort_by_time:
+            return "time_modified"
+        if self.sort_by_size:
+            return self.size_key
+        return "name"
+
+    @property
+    def size_key(self) -> str:
+        """The attribute of the TreeNode class with the size listed"""
+        return "total_size" if self.total_size else "size"
+
+    def keeps(self, node) -> bool:
+        """Return whether a node passes the min_size and newer_than
+        filters. The node type and the hidden names are checked by
+        the listings themselves
+
+        Parameters
+        ----------
+        node: TreeNode
+            the node to check
+
+        Returns
+        ----------
+        kept: bool
+            whether the node can be listed
+        """
+        return ((self.min_size is None
+                 or getattr(node, self.size_key) >= self.min_size)
+                and (self.newer_than is None
+                     or node.time_modified > self.newer_than))
+
+
+@dataclass
+class ListingResult:
+    """A dataclass used to represent the result of a listing.
+    Iterating over it yields the rows, that are the listed nodes
+    in their order. The rows must be treated as read only
+
+    Attributes
+    ----------
+    path : str | None
+        the path requested
+    node : TreeNode | None
+        the node of the path, None if the path does not exist
+    options : ListingOptions
+        the options of the listing
+    rows : list[TreeNode]
+        the listed nodes, filtered and sorted
+    size_width : int
+        the width of the size column in the long listing format
+    names : list[str] | None
+        the names printed for the rows, when they are not the names
+        of the nodes, like the paths of the files matched by a pattern
+    humanized : dict | None
+        the human readable sizes already computed for the size width,
+        reused when the rows are formatted. See humanize_sizes
+    """
+    path: Optional[str]
+    node: Optional[object]
+    options: ListingOptions
+    rows: list = field(default_factory=list)
+    size_width: int = 0
+    names: Optional[list] = None
+    humanized: Optional[dict] = None
+
+    @property
+    def found(self) -> bool:
+        """Whether the path requested exists"""
+        return self.node is not None
+
+    def __iter__(self) -> Iterator:
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def format_row(row, options: ListingOptions, size_width: int,
+               name: Optional[str] = None) -> str:
+    """Format a single row of a listing.
+
+    Parameters
+    ----------
+    row: TreeNode
+        the node to format
+    options: ListingOptions
+        the options of the listing
+    size_width: int
+        the width of the size column in the long listing format
+    name: str | None
+        the name printed, the name of the node when None
+
+    Returns
+    ----------
+    line: str
+        the formatted row
+    """
+    return next(_format_rows([row], options, size_width,
+                             None if name is None else [name]))
+
+
+def _format_rows(rows: list, options: ListingOptions, size_width: int,
+                 names: Optional[list] = None,
+                 humanized: Optional[dict] = None) -> Iterator[str]:
+    """Format the rows of a listing. In the long listing format the
+    rows are formatted in batches of WRITE_BATCH: the sizes of each
+    batch are humanized together, each distinct size once, and the
+    times are formatted once per minute. See format_row"""
+    if names is None:
+        names = [row.name for row in rows]
+    if not options.long_listing:
+        yield from names
+        return
+    format_time = TimeFormatter()
+    size_key = options.size_key
+    texts = humanized if humanized is not None else {}
+    for start in range(0, len(rows), WRITE_BATCH):
+        batch = rows[start:start + WRITE_BATCH]
+        sizes = [getattr(row, size_key) for row in batch]
+        if options.humanize:
+            sizes = humanize_sizes(sizes, texts)
+        for row, size, name in zip(batch, sizes,
+                                   names[start:start + WRITE_BATCH]):
+            yield (f"{row.permissions} {size:>{size_width}} "
+                   f"{format_time(row.time_modified)} {name}")
+
+
+def iter_lines(result: ListingResult) -> Iterator[str]:
+    """Format the rows of a listing one at a time.
+
+    Parameters
+    ----------
+    result: ListingResult
+        the listing to format
+
+    Yields
+    ----------
+    line: str
+        the formatted row
+    """
+    return _format_rows(result.rows, result.options, result.size_width,
+                        result.names, result.humanized)
+
+
+def _text_writer(stream: Union[TextIO, BinaryIO],
+                 encoding: str) -> tuple[Callable[[str], None], IO]:
+    """Return a function writing text to stream. A text stream with
+    an underlying binary buffer, like sys.stdout, is written
+    through its buffer with the stream encoding
+
+    Returns
+    ----------
+    result: tuple[Callable[[str], None], IO]
+        the function and the stream it writes to
+    """
+    buffer = getattr(stream, "buffer", None)
+    if buffer is not None:
+        encoding = stream.encoding
+        stream.flush()
+        stream = buffer
+    if isinstance(stream, io.TextIOBase):
+        return stream.write, stream
+    return (lambda text: stream.write(
+        text.encode(encoding, "surrogateescape"))), stream
+
+
+def _write_rows(result: ListingResult, write: Callable[[str], None]) -> None:
+    """Format the rows of a listing in batches and pass
+    them to write, final newline included"""
+    stats.count("rows_listed", len(result.rows))
+    separator = "\n" if result.options.long_listing else " "
+    prefix = ""
+    batch: list[str] = []
+    for line in iter_lines(result):
+        batch.append(line)
+        if len(batch) == WRITE_BATCH:
+            write(prefix + separator.join(batch))
+            prefix = separator
+            batch.clear()
+    write((prefix if batch else "") + separator.join(batch) + "\n")
+
+
+def write_listing(result: ListingResult,
+                  stream: Union[TextIO, BinaryIO],
+                  encoding: str = "UTF-8") -> None:
+    """Write a listing as the text printed by pyls, final newline
+    included. The rows are formatted and written in batches, so the
+    whole text is never kept in memory. A text stream with an underlying
+    binary buffer, like sys.stdout, is written through its buffer.
+
+    Parameters
+    ----------
+    result: ListingResult
+        the listing to write
+    stream: TextIO | BinaryIO
+        the stream to write to
+    encoding: str
+        the encoding used when writing to a binary stream.
+        The stream encoding is used for a text stream with a buffer
+
+    Raises
+    ----------
+    BrokenPipeError
+        if the reader of the stream closed it
+    """
+    with stats.phase("format"):
+        write, stream = _text_writer(stream, encoding)
+        _write_rows(result, write)
+        stream.flush()
+
+
+def write_listings(results: Iterable[ListingResult],
+                   stream: Union[TextIO, BinaryIO],
+                   encoding: str = "UTF-8") -> None:
+    """Write many listings, each one preceded by its path and
+    separated by an empty line, like ls does for more directories.
+    The listings with path None, like the files matched by a pattern,
+    are written without header.
+    Each listing is written as soon as it is produced by results.
+    See write_listing for the parameters
+
+    Raises
+    ----------
+    BrokenPipeError
+        if the reader of the stream closed it
+    """
+    # The listings produced while they are written, like the ones
+    # of a recursive listing, count their own phases
+    with stats.phase("format"):
+        write, stream = _text_writer(stream, encoding)
+        separator = ""
+        for result in results:
+            write(separator if result.path is None
+                  else f"{separator}{result.path}:\n")
+            _write_rows(result, write)
+            separator = "\n"
+        stream.flush()
+
+
+def render(result: ListingResult) -> str:
+    """Render a listing as the text printed by pyls.
+
+    Parameters
+    ----------
+    result: ListingResult
+        the listing to render
+
+    Returns
+    ----------
+    text: str
+        the text of the listing, without the final newline
+    """
+    stats.count("rows_listed", len(result.rows))
+    join_operator = "\n" if result.options.long_listing else " "
+    with stats.phase("format"):
+        return join_operator.join(iter_lines(result))
+
+
+def render_listings(results: Iterable[ListingResult]) -> str:
+    """Render many listings as the text written by write_listings.
+
+    Parameters
+    ----------
+    results: Iterable[ListingResult]
+        the listings to render
+
+    Returns
+    ----------
+    text: str
+        the text of the listings, without the final newline
+    """
+    return "\n\n".join(
+        render(result) if result.path is None
+        else f"{result.path}:\n{render(result)}" for result in results)
+
+
+def not_found_message(path: Optional[str]) -> str:
+    """Return the error printed when a path does not exist.
+
+    Parameters
+    ----------
+    path: str | None
+        the path requested
+
+    Returns
+    ----------
+    message: str
+        the error message
+    """
+    return f"error: cannot access '{path}': No such file or directory"
@@ -0,0 +1,374 @@
+"""Module providing the name index of the filesystem tree, used to find
+the paths of the nodes with a given name without visiting the tree"""
+
+import fnmatch
+import re
+from array import array
+from collections import deque
+from typing import (Callable, Iterable, Iterator, NamedTuple, Optional,
+                    Sequence)
+
+from pyls.data.pattern import has_magic
+
+NO_PARENT = 0xFFFFFFFF
+# Number of characters of the n-grams of the substring index
+GRAM = 3
+
+
+class NameTables(NamedTuple):
+    """The flat tables of a name index. Each table is an array,
+    so that it can be written to and read from a snapshot as it is.
+    The nodes are identified by an integer id, the names by the id
+    of a string table
+
+    Attributes
+    ----------
+    node_names : array
+        the name id of each node
+    parents : array
+        the id of the parent of each node, NO_PARENT for the root
+    name_order : array
+        the id of each distinct name, sorted by name
+    name_offsets : array
+        the nodes with the k-th name of name_order are
+        name_nodes[name_offsets[k]:name_offsets[k + 1]]
+    name_nodes : array
+        the node ids grouped by name
+    gram_keys : array
+        the n-grams found in the names, sorted, each one encoded
+        by gram_key
+    gram_offsets : array
+        the names containing the k-th n-gram of gram_keys are
+        gram_names[gram_offsets[k]:gram_offsets[k + 1]]
+    gram_names : array
+        the positions in name_order of the names grouped by n-gram
+    """
+    node_names: array
+    parents: array
+    name_order: array
+    name_offsets: array
+    name_nodes: array
+    gram_keys: array
+    gram_offsets: array
+    gram_names: array
+
+
+# The array type code of each table, in the NameTables order
+TABLE_TYPES = ("I", "I", "I", "I", "I", "Q", "I", "I")
+
+
+def gram_key(gram: str) -> int:
+    """Encode an n-gram as an integer, 21 bits for each code point.
+
+    Parameters
+    ----------
+    gram: str
+        the n-gram, GRAM characters long
+
+    Returns
+    ----------
+    key: int
+        the encoded n-gram
+    """
+    key = 0
+    for character in gram:
+        key = (key << 21) | ord(character)
+    return key
+
+
+def grams(text: str) -> set[int]:
+    """Return the encoded n-grams of a text"""
+    return {gram_key(text[start:start + GRAM])
+            for start in range(len(text) - GRAM + 1)}
+
+
+def pattern_literals(pattern: str) -> list[str]:
+    """Split a pattern into the literal strings between its wildcards.
+    Each name matching the pattern contains all of them
+
+    Parameters
+    ----------
+    pattern: str
+        the shell-style pattern
+
+    Returns
+    ----------
+    literals: list[str]
+        the literal parts of the pattern
+    """
+    literals = []
+    literal = []
+    position = 0
+    while position < len(pattern):
+        character = pattern[position]
+        position += 1
+        if character in "*?":
+            literals.append("".join(literal))
+            literal = []
+        elif character == "[":
+            # Same rules of fnmatch: a ] just after [ or [! is literal
+            end = position
+            if end < len(pattern) and pattern[end] == "!":
+                end += 1
+            if end < len(pattern) and pattern[end] == "]":
+                end += 1
+            end = pattern.find("]", end)
+            if end < 0:
+                literal.append(character)
+            else:
+                literals.append("".join(literal))
+                literal = []
+                position = end + 1
+        else:
+            literal.append(character)
+    literals.append("".join(literal))
+    return [literal for literal in literals if literal]
+
+
+class NameIndexBuilder:
+    """A class used to collect the nodes of a tree, in the order of
+    their ids, and build the tables of their name index"""
+
+    def __init__(self):
+        self.node_names = array("I")
+        self.parents = array("I")
+        self._nodes: dict[int, list[int]] = {}
+
+    def add(self, name_id: int, parent: int) -> int:
+        """Add the next node.
+
+        Parameters
+        ----------
+        name_id: int
+            the id of the name of the node
+        parent: int
+            the id of the parent, NO_PARENT for the root
+
+        Returns
+        ----------
+        node_id: int
+            the id of the node
+        """
+        node_id = len(self.node_names)
+        self.node_names.append(name_id)
+        self.parents.append(parent)
+        self._nodes.setdefault(name_id, []).append(node_id)
+        return node_id
+
+    def build(self, string: Callable[[int], str]) -> NameTables:
+        """Build the tables of the nodes added.
+
+        Parameters
+        ----------
+        string: Callable[[int], str]
+            the function returning the name of each name id
+
+        Returns
+        ----------
+        tables: NameTables
+            the tables of the name index
+        """
+        name_order = array("I", sorted(self._nodes, key=string))
+        name_offsets = array("I", [0])
+        name_nodes = array("I")
+        gram_positions: dict[int, list[int]] = {}
+        for position, name_id in enumerate(name_order):
+            name_nodes.extend(self._nodes[name_id])
+            name_offsets.append(len(name_nodes))
+            for key in grams(string(name_id)):
+                gram_positions.setdefault(key, []).append(position)
+        gram_keys = array("Q", sorted(gram_positions))
+        gram_offsets = array("I", [0])
+        gram_names = array("I")
+        for key in gram_keys:
+            gram_names.extend(gram_positions[key])
+            gram_offsets.append(len(gram_names))
+        return NameTables(self.node_names, self.parents, name_order,
+                          name_offsets, name_nodes, gram_keys,
+                          gram_offsets, gram_names)
+
+
+class NameIndex:
+    """A class used to find the nodes of a tree by name.
+    A name without wildcards is found with a binary search of the
+    sorted names, a pattern is matched only against the names that
+    contain all the n-grams of its literal parts
+
+    Attributes
+    ----------
+    tables : NameTables
+        the tables of the index
+    string : Callable[[int], str]
+        the function returning the name of each name id
+    """
+
+    def __init__(self, tables: NameTables, string: Callable[[int], str]):
+        """
+        Parameters
+        ----------
+        tables: NameTables
+            the tables of the index
+        string: Callable[[int], str]
+            the function returning the name of each name id
+        """
+        self.tables = tables
+        self.string = string
+
+    @classmethod
+    def from_tree(cls, root) -> "NameIndex":
+        """Build the name index of a tree. The ids are assigned
+        in breadth first order.
+
+        Parameters
+        ----------
+        root: TreeNode
+            the root of the tree
+
+        Returns
+        ----------
+        index: NameIndex
+            the name index of the tree
+        """
+        names: dict[str, int] = {}
+        builder = NameIndexBuilder()
+        queue = deque([(root, NO_PARENT)])
+        while queue:
+            node, parent = queue.popleft()
+            node_id = builder.add(names.setdefault(node.name, len(names)),
+                                  parent)
+            for child in (node.children or {}).values():
+                queue.append((child, node_id))
+        strings = list(names)
+        return cls(builder.build(strings.__getitem__), strings.__getitem__)
+
+    def _name_position(self, name: str) -> Optional[int]:
+        """Binary search a name in name_order.
+
+        Returns
+        ----------
+        position: int | None
+            the position of the name, None if no node has that name
+        """
+        name_order = self.tables.name_order
+        low, high = 0, len(name_order)
+        while low < high:
+            middle = (low + high) // 2
+            middle_name = self.string(name_order[middle])
+            if middle_name < name:
+                low = middle + 1
+            elif middle_name > name:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _gram_names(self, key: int) -> Sequence[int]:
+        """Return the positions of the names containing an n-gram"""
+        gram_keys = self.tables.gram_keys
+        low, high = 0, len(gram_keys)
+        while low < high:
+            middle = (low + high) // 2
+            if gram_keys[middle] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(gram_keys) or gram_keys[low] != key:
+            return ()
+        offsets = self.tables.gram_offsets
+        return self.tables.gram_names[offsets[low]:offsets[low + 1]]
+
+    def _candidates(self, pattern: str) -> Iterator[int]:
+        """Return the positions of the names that can match a pattern,
+        in name order: the ones containing all the n-grams of its
+        literal parts, or all the names when it has none"""
+        keys = set()
+        for literal in pattern_literals(pattern):
+            keys.update(grams(literal))
+        if not keys:
+            return iter(range(len(self.tables.name_order)))
+        postings = sorted((self._gram_names(key) for key in keys), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return iter(sorted(candidates))
+
+    def find(self, pattern: str) -> Iterator[int]:
+        """Find the nodes whose name matches a shell-style pattern,
+        like find -name does.
+
+        Parameters
+        ----------
+        pattern: str
+            the name or the pattern
+
+        Yields
+        ----------
+        node_id: int
+            the id of each matching node
+        """
+        tables = self.tables
+        if not has_magic(pattern):
+            position = self._name_position(pattern)
+            positions = iter(()) if position is None else iter((position,))
+        else:
+            match = re.compile(fnmatch.translate(pattern)).match
+            positions = (
+                position for position in self._candidates(pattern)
+                if match(self.string(tables.name_order[position])))
+        offsets = tables.name_offsets
+        for position in positions:
+            yield from tables.name_nodes[offsets[position]:
+                                         offsets[position + 1]]
+
+    def path(self, node_id: int) -> str:
+        """Return the path of a node, relative to the root.
+        The cost is proportional to the depth of the node.
+
+        Parameters
+        ----------
+        node_id: int
+            the id of the node
+
+        Returns
+        ----------
+        path: str
+            the path of the node, . for the root
+        """
+        node_names = self.tables.node_names
+        parents = self.tables.parents
+        names = []
+        while parents[node_id] != NO_PARENT:
+            names.append(self.string(node_names[node_id]))
+            node_id = parents[node_id]
+        return "/".join(reversed(names)) or "."
+
+    def paths(self, node_ids: Iterable[int]) -> Iterator[str]:
+        """Return the paths of many nodes, like path does. The path
+        of each directory is built once, for all its children.
+
+        Parameters
+        ----------
+        node_ids: Iterable[int]
+            the ids of the nodes
+
+        Yields
+        ----------
+        path: str
+            the path of each node, in the order of node_ids
+        """
+        node_names = self.tables.node_names
+        parents = self.tables.parents
+        string = self.string
+        directories: dict[int, str] = {}
+        for node_id in node_ids:
+            parent = parents[node_id]
+            if parent == NO_PARENT:
+                yield "."
+                continue
+            parent_path = directories.get(parent)
+            if parent_path is None:
+                parent_path = directories[parent] = self.path(parent)
+            name = string(node_names[node_id])
+            yield f"{parent_path}/{name}" if parent_path != "." else name
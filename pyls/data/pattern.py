@@ -0,0 +1,261 @@
+"""Module providing the shell-style glob patterns
+matched against the paths of the filesystem tree"""
+
+import fnmatch
+import re
+from typing import Callable, Iterator, NamedTuple, Optional, Union
+
+from pyls.data.filesystem import FileSystemNodeType
+
+_MAGIC = re.compile(r"[*?[]")
+
+LITERAL = "literal"
+WILDCARD = "wildcard"
+RECURSIVE = "recursive"
+
+
+def has_magic(path: Optional[str]) -> bool:
+    """Check whether a path contains glob wildcards.
+
+    Parameters
+    ----------
+    path: str | None
+        the path to check
+
+    Returns
+    ----------
+    result: bool
+        True if the path contains *, ? or [
+    """
+    return path is not None and _MAGIC.search(path) is not None
+
+
+class ComponentMatcher(NamedTuple):
+    """The compiled version of a single component of a pattern
+
+    Attributes
+    ----------
+    kind : str
+        LITERAL, WILDCARD or RECURSIVE (the ** component)
+    value : str | Callable | None
+        the name for LITERAL, the match method of the compiled
+        regular expression for WILDCARD, None for RECURSIVE
+    """
+    kind: str
+    value: Union[str, Callable, None]
+
+
+def compile_component(component: str) -> ComponentMatcher:
+    """Compile a single component of a pattern.
+    Like the shell, the wildcards do not match the names starting
+    with . unless the component starts with . too
+
+    Parameters
+    ----------
+    component: str
+        the component, without /
+
+    Returns
+    ----------
+    matcher: ComponentMatcher
+        the compiled component
+    """
+    if component == "**":
+        return ComponentMatcher(RECURSIVE, None)
+    if not has_magic(component):
+        return ComponentMatcher(LITERAL, component)
+    regex = fnmatch.translate(component)
+    if not component.startswith("."):
+        regex = r"(?!\.)" + regex
+    return ComponentMatcher(WILDCARD, re.compile(regex).match)
+
+
+class PathPattern:
+    """A class used to represent a glob pattern compiled once
+    into a matcher for each of its components. A literal component
+    is looked up in the children of a directory, a wildcard scans
+    only the children of the directories it applies to, and ** matches
+    any number of directories, the hidden ones excluded
+
+    Attributes
+    ----------
+    pattern : str
+        the pattern
+    components : list[ComponentMatcher]
+        the compiled components
+    directories_only : bool
+        whether the pattern ends with / and only matches directories
+    """
+
+    def __init__(self, pattern: str):
+        """
+        Parameters
+        ----------
+        pattern: str
+            the pattern, relative to the root of the tree
+        """
+        self.pattern = pattern
+        self._prefix = "." if pattern.startswith("./") else ""
+        self.components = [compile_component(component)
+                           for component in pattern.split("/")
+                           if component and component != "."]
+        self.directories_only = pattern.endswith("/")
+
+    @staticmethod
+    def _join(path: str, name: str) -> str:
+        """Append a name to a path"""
+        return f"{path}/{name}" if path else name
+
+    def match(self, root) -> Iterator[tuple[str, object]]:
+        """Find the nodes of the tree matching the pattern.
+        The visit uses an explicit stack, so deep trees do not
+        reach the recursion limit
+
+        Parameters
+        ----------
+        root: TreeNode
+            the root of the tree
+
+        Yields
+        ----------
+        match: tuple[str, TreeNode]
+            the path of each matching node and the node.
+            Each node is yielded once
+        """
+        components = self.components
+        last = len(components)
+        directory = FileSystemNodeType.DIRECTORY
+        directories_only = self.directories_only
+        # The same node can be reached in more ways only with many **
+        seen: Optional[set] = set() if sum(
+            component.kind == RECURSIVE for component in components) > 1 \
+            else None
+        # Each element is (node, path, position of the next component)
+        stack = [(root, self._prefix, 0)]
+        while stack:
+            node, path, position = stack.pop()
+            if seen is not None:
+                if (id(node), position) in seen:
+                    continue
+                seen.add((id(node), position))
+            if position == last:
+                if not directories_only or node.node_type == directory:
+                    yield path or ".", node
+                continue
+            kind, value = components[position]
+            if kind == LITERAL:
+                child = node.get_child(value)
+                if child is not None:
+                    stack.append((child, self._join(path, value),
+                                  position + 1))
+                continue
+            if kind == RECURSIVE and seen is None:
+                yield from self._match_recursive(node, path, position, stack)
+                continue
+            if kind == RECURSIVE:
+                # ** matches no directory too
+                stack.append((node, path, position + 1))
+            index = node.directory_index()
+            if index is None:
+                continue
+            if kind == WILDCARD:
+                if position + 1 == last and not directories_only:
+                    children = node.children
+                    for name in filter(value, children):
+                        yield self._join(path, name), children[name]
+                    continue
+                for child in index.subdirectories:
+                    if value(child.name):
+                        stack.append((child, self._join(path, child.name),
+                                      position + 1))
+                continue
+            if position + 1 == last and not directories_only:
+                # A final ** matches the files too
+                for child in node.children.values():
+                    if child.node_type != directory \
+                            and not child.name.startswith("."):
+                        yield self._join(path, child.name), child
+            for child in index.visible_subdirectories:
+                stack.append((child, self._join(path, child.name), position))
+
+    def _match_recursive(self, node, path: str, position: int,
+                         stack: list) -> Iterator[tuple[str, object]]:
+        """Expand the ** component at position over the directories
+        below node, taken from DirectoryIndex.visible_descendants.
+        Each directory continues with the next component: when only
+        literal names follow they are looked up here, otherwise the
+        directory is pushed on the stack of match. The paths are built only for
+        the directories matched
+
+        Parameters
+        ----------
+        node: TreeNode
+            the directory where ** starts
+        path: str
+            the path of node
+        position: int
+            the position of the ** component
+        stack: list
+            the stack of match
+
+        Yields
+        ----------
+        match: tuple[str, TreeNode]
+            the path of each matching node and the node
+        """
+        following = position + 1
+        last = len(self.components)
+        index = node.directory_index()
+        if index is None:
+            nodes, parents = [node], [-1]
+        else:
+            nodes, parents = index.visible_descendants(node)
+
+        # The path of each directory is built once, from the one
+        # of its parent, only when it is needed
+        paths: list[Optional[str]] = [None] * len(nodes)
+        paths[0] = path
+
+        def path_of(start: int) -> str:
+            # The offsets of nodes, position is the one of components
+            missing = []
+            ancestor = start
+            while paths[ancestor] is None:
+                missing.append(ancestor)
+                ancestor = parents[ancestor]
+            for descendant in reversed(missing):
+                parent_path = paths[parents[descendant]]
+                name = nodes[descendant].name
+                paths[descendant] = (f"{parent_path}/{name}" if parent_path
+                                     else name)
+            return paths[start]
+
+        names = [component.value for component in self.components[following:]]
+        if names and all(component.kind == LITERAL
+                         for component in self.components[following:]):
+            # Only literal names follow: look them up below each directory
+            suffix = "/".join(names)
+            directory_type = FileSystemNodeType.DIRECTORY
+            for descendant, directory in enumerate(nodes):
+                child = directory
+                for name in names:
+                    child = child.get_child(name)
+                    if child is None:
+                        break
+                else:
+                    if not self.directories_only \
+                            or child.node_type == directory_type:
+                        yield self._join(path_of(descendant), suffix), child
+        elif following == last and not self.directories_only:
+            # A final ** matches the files too
+            file_type = FileSystemNodeType.FILE
+            for descendant, directory in enumerate(nodes):
+                directory_path = path_of(descendant)
+                yield directory_path or ".", directory
+                for child in (directory.children or {}).values():
+                    if child.node_type == file_type \
+                            and not child.name.startswith("."):
+                        yield self._join(directory_path, child.name), child
+        else:
+            for descendant, directory in enumerate(nodes):
+                stack.append((directory, path_of(descendant), following))
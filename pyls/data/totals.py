@@ -0,0 +1,85 @@
+"""Module containing the recursive totals of a directory,
+like the ones printed by du"""
+
+
+class DirectoryTotals:
+    """A class used to represent the totals of a directory subtree.
+    The directory itself is included in size and newest, but not
+    in the counts
+
+    Attributes
+    ----------
+    size : int
+        the size of the directory, of its files and of its subdirectories
+    file_count : int
+        the number of files in the subtree
+    directory_count : int
+        the number of directories in the subtree
+    newest : int
+        the unix epoch of the newest modification in the subtree
+    """
+
+    __slots__ = ("size", "file_count", "directory_count", "newest")
+
+    def __init__(self, size: int, file_count: int = 0,
+                 directory_count: int = 0, newest: int = 0):
+        """
+        Parameters
+        ----------
+        size: int
+            the total size
+        file_count: int
+            the number of files
+        directory_count: int
+            the number of directories
+        newest: int
+            the unix epoch of the newest modification
+        """
+        self.size = size
+        self.file_count = file_count
+        self.directory_count = directory_count
+        self.newest = newest
+
+    def __repr__(self) -> str:
+        return (f"DirectoryTotals(size={self.size}, "
+                f"file_count={self.file_count}, "
+                f"directory_count={self.directory_count}, "
+                f"newest={self.newest})")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DirectoryTotals):
+            return NotImplemented
+        return (self.size, self.file_count, self.directory_count,
+                self.newest) == (other.size, other.file_count,
+                                 other.directory_count, other.newest)
+
+    def add(self, child: "DirectoryTotals", is_directory: bool) -> None:
+        """Add the totals of a new child.
+
+        Parameters
+        ----------
+        child: DirectoryTotals
+            the totals of the child subtree
+        is_directory: bool
+            whether the child is a directory
+        """
+        self.size += child.size
+        self.file_count += child.file_count + (not is_directory)
+        self.directory_count += child.directory_count + is_directory
+        if child.newest > self.newest:
+            self.newest = child.newest
+
+    def remove(self, child: "DirectoryTotals", is_directory: bool) -> None:
+        """Remove the totals of a removed child. newest is not changed,
+        since the previous newest modification is not known
+
+        Parameters
+        ----------
+        child: DirectoryTotals
+            the totals of the child subtree
+        is_directory: bool
+            whether the child is a directory
+        """
+        self.size -= child.size
+        self.file_count -= child.file_count + (not is_directory)
+        self.directory_count -= child.directory_count + is_directory
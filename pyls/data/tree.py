@@ -1,35 +1,98 @@
 """Module that contains all the class and method
 related to the tree structure of the filesystem"""
 
+import contextlib
+import gc
+import io
+import json
 import operator
+import os
+import struct
 import sys
-import time
-from typing import Optional
+from itertools import repeat
+from typing import TYPE_CHECKING, Iterator, NamedTuple, Optional
 
 import pyls.utils.io as pylsio
-from pyls.data.filesystem import FileSystemNode, FileSystemNodeType
-from pyls.utils.formatters import humanize_size
+from pyls.data.cache import PathCache, normalize_path
+from pyls.data.filesystem import FileSystemNodeType, Permissions
+from pyls.data.index import DirectoryIndex
+from pyls.data.pattern import PathPattern, has_magic
+from pyls.data.totals import DirectoryTotals
+from pyls.data.listing import (ListingOptions, ListingResult, render,
+                               write_listing)
+from pyls.data.names import NameIndex
+from pyls.utils import stats
+from pyls.utils.snapshot import Snapshot
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+# Number of ranges of the root contents built by each worker process.
+# More ranges than workers keep them busy when the subtrees differ in size
+PARALLEL_RANGES_PER_WORKER = 4
+
+
+class InvalidFileSystemError(ValueError):
+    """Raised when the json filesystem read on demand by a lazy tree
+    turns out to be invalid. Its message is the one printed when the
+    whole json filesystem is built at once"""
+
+    def __init__(self):
+        super().__init__("The provided json filesystem is invalid")
+
+
+@contextlib.contextmanager
+def paused_gc() -> Iterator[None]:
+    """Context manager that disables the cyclic garbage collector.
+    The nodes of the tree never become garbage while it is built, but
+    each collection traverses all of them: with the collector enabled
+    the build time grows faster than the number of nodes"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 
 class TreeNode:
-    """A class used to represent a node of the filesystem tree
+    """A class used to represent a node of the filesystem tree.
+    The file/directory data is stored in the slots of the node itself,
+    so each file costs a single object without __dict__
 
     Attributes
     ----------
-    data : FileSystemNode
-        the file or directory data attached to the node
+    name : str
+        the file/directory name
+    size: int
+        the file/directory size
+    time_modified: int
+        the unix epoch of the file/directory last modification time
+    permissions: Permissions
+        the permissions attached to the file/directory.
+        Equal nodes permissions share the same object
+    node_type: FileSystemNodeType
+        whether the node is a file or a directory
     children : dict[str, TreeNode] | None
         dictionary name -> node of the node children if any.
         This value is None for the leaf
+    parent : TreeNode | None
+        the directory containing the node, None for the root
     """
 
+    __slots__ = ("name", "size", "time_modified", "permissions",
+                 "node_type", "children", "parent", "_index", "_totals")
+
     def __init__(self, name: str, size: int, time_modified: int,
                  permissions: str, node_type: FileSystemNodeType):
         """
         Parameters
         ----------
         name: str
-            the name of the file/directory
+            the name of the file/directory. It is interned,
+            since the same names repeat in many directories
         size: int
             the file/directory size
         time_modified: int
@@ -37,17 +100,33 @@ class TreeNode:
         permissions: str
             string that represents the permissions
             attached to the file/directory
+
+        Raises
+        ----------
+        TypeError
+            if name or permissions are not strings
         """
-        self.data = FileSystemNode(
-            name=name, size=size, time_modified=time_modified,
-            permissions=permissions, node_type=node_type)
+        self.name = sys.intern(name)
+        self.size = size
+        self.time_modified = time_modified
+        self.permissions = Permissions.intern(permissions)
+        self.node_type = node_type
         self.children: Optional[dict[str, TreeNode]] = None
+        self.parent: Optional[TreeNode] = None
+        self._index: Optional[DirectoryIndex] = None
+        self._totals: Optional[DirectoryTotals] = None
 
     def __str__(self) -> str:
-        return self.data.name
+        return self.name
+
+    @property
+    def data(self) -> "TreeNode":
+        """The file or directory data attached to the node,
+        that is the node itself"""
+        return self
 
     def add_child(self, name: str, child) -> None:
-        """Add a child to the node.
+        """Add a child to the node, that becomes its parent.
 
         Parameters
         ----------
@@ -59,6 +138,438 @@ class TreeNode:
         if self.children is None:
             self.children = {}
         self.children[name] = child
+        child.parent = self
+        self._index = None
+
+    def get_child(self, name: str):
+        """Return the child with the given name.
+
+        Parameters
+        ----------
+        name: str
+            the name of the file/directory
+
+        Returns
+        ----------
+        child: TreeNode | None
+            the child, None if the node has no child with that name
+        """
+        children = self.children
+        return children.get(name) if children else None
+
+    def path(self) -> str:
+        """Return the path of the node relative to the root, following
+        the parent links. The cost is proportional to the depth
+        of the node and no path is stored in the nodes
+
+        Returns
+        ----------
+        path: str
+            the path of the node, . for the root
+        """
+        names = []
+        node = self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        return "/".join(reversed(names)) or "."
+
+    def totals(self) -> DirectoryTotals:
+        """Return the recursive totals of the node. The totals of a
+        directory are computed with a post-order visit of its subtree
+        the first time they are requested, and then kept.
+        FileSystemTree.add_node and remove_node keep them updated
+
+        Returns
+        ----------
+        totals: DirectoryTotals
+            the totals. A file counts only its own size
+        """
+        if self._totals is not None:
+            return self._totals
+        if self.node_type != FileSystemNodeType.DIRECTORY:
+            return DirectoryTotals(self.size, newest=self.time_modified)
+        # Each element of the stack is a directory and the iterator
+        # over its children, the subtrees are visited before their root
+        stack = [(self, iter((self.children or {}).values()))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child.node_type == FileSystemNodeType.DIRECTORY \
+                        and child._totals is None:
+                    stack.append((child, iter((child.children or {})
+                                              .values())))
+                    break
+            else:
+                stack.pop()
+                node.compute_totals()
+        return self._totals
+
+    def compute_totals(self) -> None:
+        """Compute the totals of the directory from the ones of its
+        children. The totals of the subdirectories must be already
+        computed, so the tree builders call it on each directory
+        once all its children are built"""
+        size = self.size
+        file_count = directory_count = 0
+        newest = self.time_modified
+        for child in (self.children or {}).values():
+            if child.node_type == FileSystemNodeType.DIRECTORY:
+                totals = child._totals
+                size += totals.size
+                file_count += totals.file_count
+                directory_count += totals.directory_count + 1
+                if totals.newest > newest:
+                    newest = totals.newest
+            else:
+                size += child.size
+                file_count += 1
+                if child.time_modified > newest:
+                    newest = child.time_modified
+        self._totals = DirectoryTotals(size, file_count, directory_count,
+                                       newest)
+
+    @property
+    def total_size(self) -> int:
+        """The size of the node and of all its descendants"""
+        if self.node_type == FileSystemNodeType.DIRECTORY:
+            return self.totals().size
+        return self.size
+
+    def directory_index(self) -> Optional[DirectoryIndex]:
+        """Return the index of the children of the node,
+        built on the first call and kept until a child is added.
+
+        Returns
+        ----------
+        index: DirectoryIndex | None
+            the index, None if the node has no children
+        """
+        index = self._index
+        if index is None:
+            children = self.children
+            if children is None:
+                return None
+            index = DirectoryIndex(children.values())
+            self._index = index
+        return index
+
+
+class LazyTreeNode(TreeNode):
+    """A directory node whose children are read from the json file
+    only the first time they are accessed
+
+    Attributes
+    ----------
+    reader : MappedJson
+        the json file the children are read from
+    contents : JsonSpan | None
+        the position of the "contents" array in the json file.
+        None once the children have been built
+    """
+
+    __slots__ = ("reader", "contents", "_children")
+
+    def __init__(self, name: str, size: int, time_modified: int,
+                 permissions: str, reader: pylsio.MappedJson,
+                 contents: Optional[pylsio.JsonSpan]):
+        """
+        Parameters
+        ----------
+        name: str
+            the name of the directory
+        size: int
+            the directory size
+        time_modified: int
+            unix epoch of the directory last modified time
+        permissions: str
+            string that represents the permissions
+            attached to the directory
+        reader: MappedJson
+            the json file the children are read from
+        contents: JsonSpan | None
+            the position of the "contents" array in the json file
+        """
+        super().__init__(name=name, size=size, time_modified=time_modified,
+                         permissions=permissions,
+                         node_type=FileSystemNodeType.DIRECTORY)
+        self.reader = reader
+        self.contents = contents
+
+    @property
+    def children(self) -> Optional[dict[str, TreeNode]]:
+        """The children of the node, built on the first access.
+        Concurrent first accesses may both build the children, but
+        each one publishes a complete dictionary
+
+        Raises
+        ----------
+        InvalidFileSystemError
+            if the contents are not valid json
+        """
+        contents = self.contents
+        if contents is not None:
+            children = {}
+            try:
+                for child_data in self.reader.iter_array(contents.start):
+                    try:
+                        child = LazyTreeNode.from_json_members(
+                            self.reader, child_data)
+                    except (KeyError, TypeError):
+                        print(
+                            "There is some invalid data in your json file. "
+                            "Ignoring it.",
+                            file=sys.stderr)
+                        continue
+                    child.parent = self
+                    children[child.name] = child
+            except ValueError as error:
+                raise InvalidFileSystemError() from error
+            stats.count("nodes_loaded", len(children))
+            self._children = children or None
+            self.contents = None
+        return self._children
+
+    @children.setter
+    def children(self, children: Optional[dict[str, TreeNode]]) -> None:
+        # The children set replace the ones of the json file
+        self.contents = None
+        self._children = children
+        self._index = None
+
+    @staticmethod
+    def from_json_members(reader: pylsio.MappedJson,
+                          members: dict) -> TreeNode:
+        """Static method used to build a node from the members
+        of its json object, as returned by MappedJson.read_object.
+        Directories are built as LazyTreeNode
+
+        Parameters
+        ----------
+        reader: MappedJson
+            the json file the members were read from
+        members: dict
+            the members of the json object
+
+        Returns
+        ----------
+        node: TreeNode
+            the node built
+
+        Raises
+        ----------
+        KeyError
+            if one of the required members is missing
+        TypeError
+            if the name or the permissions are not strings
+        """
+        if "contents" not in members:
+            return TreeNode(name=members["name"], size=members["size"],
+                            permissions=members["permissions"],
+                            time_modified=members["time_modified"],
+                            node_type=FileSystemNodeType.FILE)
+        contents = members["contents"]
+        return LazyTreeNode(name=members["name"], size=members["size"],
+                            permissions=members["permissions"],
+                            time_modified=members["time_modified"],
+                            reader=reader,
+                            contents=(contents if isinstance(
+                                contents, pylsio.JsonSpan) else None))
+
+
+class SnapshotTreeNode(TreeNode):
+    """A node read from a binary snapshot. The children are decoded
+    from the snapshot only the first time they are accessed,
+    while get_child looks up a single child with a binary search
+
+    Attributes
+    ----------
+    snapshot : Snapshot
+        the snapshot the node is read from
+    index : int
+        the index of the node record in the snapshot
+    """
+
+    __slots__ = ("snapshot", "index", "_first_child", "_child_count",
+                 "_children")
+
+    def __init__(self, snapshot: Snapshot, index: int):
+        """
+        Parameters
+        ----------
+        snapshot: Snapshot
+            the snapshot the node is read from
+        index: int
+            the index of the node record in the snapshot
+        """
+        (name_id, permissions_id, size, time_modified, _, first_child,
+         child_count, _, is_directory) = snapshot.record(index)
+        super().__init__(name=snapshot.string(name_id), size=size,
+                         time_modified=time_modified,
+                         permissions=snapshot.string(permissions_id),
+                         node_type=(FileSystemNodeType.DIRECTORY
+                                    if is_directory
+                                    else FileSystemNodeType.FILE))
+        # After the children set to None by TreeNode
+        self._first_child = first_child
+        self._child_count = child_count
+        self.snapshot = snapshot
+        self.index = index
+
+    @property
+    def children(self) -> Optional[dict[str, TreeNode]]:
+        """The children of the node in their json order,
+        built on the first access"""
+        if self._child_count and self._children is None:
+            # The records are sorted by name, the field 7 of each
+            # record is its position in the json contents
+            indexes = sorted(
+                range(self._first_child,
+                      self._first_child + self._child_count),
+                key=lambda index: self.snapshot.record(index)[7])
+            children = {}
+            for index in indexes:
+                child = SnapshotTreeNode(self.snapshot, index)
+                child.parent = self
+                children[child.name] = child
+            stats.count("nodes_loaded", len(children))
+            self._children = children
+        return self._children
+
+    @children.setter
+    def children(self, children: Optional[dict[str, TreeNode]]) -> None:
+        # The children set replace the ones of the snapshot, also
+        # when they are None because the last child was removed
+        self._child_count = 0
+        self._children = children
+        self._index = None
+
+    def get_child(self, name: str) -> Optional[TreeNode]:
+        """Return the child with the given name. If the children
+        have not been built yet, only that child is decoded.
+
+        Parameters
+        ----------
+        name: str
+            the name of the file/directory
+
+        Returns
+        ----------
+        child: TreeNode | None
+            the child, None if the node has no child with that name
+        """
+        if self._children is not None:
+            return self._children.get(name)
+        if not self._child_count:
+            return None
+        index = self.snapshot.find_child(self.index, name)
+        if index is None:
+            return None
+        child = SnapshotTreeNode(self.snapshot, index)
+        child.parent = self
+        return child
+
+
+class TreeColumns(NamedTuple):
+    """The nodes of a tree flattened in depth first pre-order, one list
+    per field, so that a subtree can be sent between processes without
+    pickling its nodes one by one, nor reaching the recursion limit
+
+    Attributes
+    ----------
+    names : list[str]
+        the name of each node, the root first
+    sizes : list[int]
+        the size of each node
+    times : list[int]
+        the last modification time of each node
+    permissions : list[str]
+        the permissions of each node
+    child_counts : list[int]
+        the number of children of each directory, -1 for the files
+    totals : list[tuple[int, int, int, int]]
+        the size, file count, directory count and newest modification
+        of the totals of each directory, in the same order
+    """
+    names: list
+    sizes: list
+    times: list
+    permissions: list
+    child_counts: list
+    totals: list
+
+    @classmethod
+    def from_tree(cls, root: TreeNode) -> "TreeColumns":
+        """Flatten a tree whose directories have their totals computed.
+
+        Parameters
+        ----------
+        root: TreeNode
+            the root of the tree
+
+        Returns
+        ----------
+        columns: TreeColumns
+            the columns of all the nodes, the root included
+        """
+        columns = cls([], [], [], [], [], [])
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            columns.names.append(node.name)
+            columns.sizes.append(node.size)
+            columns.times.append(node.time_modified)
+            columns.permissions.append(node.permissions)
+            if node.node_type != FileSystemNodeType.DIRECTORY:
+                columns.child_counts.append(-1)
+                continue
+            children = node.children or {}
+            columns.child_counts.append(len(children))
+            totals = node._totals
+            columns.totals.append((totals.size, totals.file_count,
+                                   totals.directory_count, totals.newest))
+            stack.extend(reversed(children.values()))
+        return columns
+
+    def attach(self, parent: TreeNode) -> None:
+        """Rebuild the nodes under parent, which takes the place of the
+        root of the columns: its children are added to parent. The
+        totals of parent must be computed again once all its children
+        are added, since a child may replace one with the same name.
+
+        Parameters
+        ----------
+        parent: TreeNode
+            the directory receiving the nodes
+        """
+        names, sizes, times, permissions, child_counts, totals = self
+        totals = iter(totals)
+        # The totals of the root of the columns
+        next(totals)
+        # The directories still receiving children
+        # and the number of children each one is missing
+        parents = [parent]
+        missing = [child_counts[0]]
+        file_type = FileSystemNodeType.FILE
+        directory_type = FileSystemNodeType.DIRECTORY
+        for index in range(1, len(names)):
+            while not missing[-1]:
+                parents.pop()
+                missing.pop()
+            missing[-1] -= 1
+            child_count = child_counts[index]
+            # Positional arguments: this loop runs once per node
+            if child_count < 0:
+                node = TreeNode(names[index], sizes[index], times[index],
+                                permissions[index], file_type)
+            else:
+                node = TreeNode(names[index], sizes[index], times[index],
+                                permissions[index], directory_type)
+                node._totals = DirectoryTotals(*next(totals))
+            parents[-1].add_child(node.name, node)
+            if child_count > 0:
+                parents.append(node)
+                missing.append(child_count)
 
 
 class FileSystemTree:
@@ -71,9 +582,17 @@ class FileSystemTree:
     current_node : TreeNode | None
         the current node in the tree.
         Used to allow the path traversal in the tree
+    path_cache : PathCache
+        the cache of the paths resolved, with its hit and miss counters
     """
 
-    def __init__(self, json_path):
+    # The name index, built or read from the snapshot on the first find
+    _name_index: Optional[NameIndex] = None
+    # The snapshot the name index is read from
+    _name_snapshot: Optional[Snapshot] = None
+
+    def __init__(self, json_path, streaming=False, lazy=False,
+                 snapshot=False, workers=0):
         """Build the filesystem tree from a json file.
         The current_node is initialized as the root
 
@@ -81,11 +600,60 @@ class FileSystemTree:
         ----------
         json_path: str
             the path of the json file
+        streaming: bool
+            whether the json file must be parsed incrementally.
+            Slower, but the whole json document is never kept in memory
+        lazy: bool
+            whether the children of each directory must be read from
+            the json file only when they are accessed
+        snapshot: bool
+            whether json_path is a binary snapshot written by
+            pyls.utils.snapshot.write_snapshot instead of a json file
+        workers: int
+            the number of processes building the tree from the json
+            file, see build_tree_parallel. 0 or 1 to build it here
         """
         self.root: Optional[TreeNode] = None
-        self.build_tree_from_json(json_path)
+        self.path_cache = PathCache()
+        with stats.phase("tree_build"):
+            if snapshot:
+                self.build_tree_from_snapshot(json_path)
+            elif lazy:
+                self.build_lazy_tree(json_path)
+            elif streaming:
+                self.build_tree_from_stream(json_path)
+            elif workers > 1:
+                self.build_tree_parallel(json_path, workers)
+            else:
+                self.build_tree_from_json(json_path)
+        if self.root is not None:
+            # The trees built at once have the totals of the root,
+            # the lazy ones count their nodes as they are loaded
+            totals = self.root._totals
+            stats.count("nodes_loaded", 1 if totals is None else
+                        totals.file_count + totals.directory_count + 1)
         self.current_node = self.root
 
+    @classmethod
+    def from_root(cls, root: TreeNode) -> "FileSystemTree":
+        """Build a filesystem tree around an already built root.
+
+        Parameters
+        ----------
+        root: TreeNode
+            the root node of the tree
+
+        Returns
+        ----------
+        tree: FileSystemTree
+            the tree, with the current_node initialized as the root
+        """
+        tree = cls.__new__(cls)
+        tree.root = root
+        tree.current_node = root
+        tree.path_cache = PathCache()
+        return tree
+
     def build_tree_from_json(self, json_path: str) -> None:
         """Build the filesystem tree from a json file.
 
@@ -94,19 +662,58 @@ class FileSystemTree:
         json_path: str
             the path of the json file
         """
-        queue: list[tuple[dict, TreeNode]] = []
-        json_data = pylsio.load_json_from_file(json_path=json_path)
+        with stats.phase("json_load"):
+            json_data = pylsio.load_json_from_file(json_path=json_path)
         if json_data:
-            root = TreeNode(name=json_data["name"], size=json_data["size"],
-                            permissions=json_data["permissions"],
-                            time_modified=json_data["time_modified"],
-                            node_type=FileSystemNodeType.DIRECTORY)
-            FileSystemTree.enqueue_children(
-                queue=queue, data=json_data, parent=root)
-            while len(queue) > 0:
-                current_data = queue.pop(0)
-                node_data = current_data[0]
-                parent_node = current_data[1]
+            try:
+                self.root = FileSystemTree.build_tree_from_dict(json_data)
+            except TypeError:
+                print("The provided json filesystem is invalid",
+                      file=sys.stderr)
+
+    @staticmethod
+    def build_tree_from_dict(json_data: dict) -> TreeNode:
+        """Static method used to build a tree from the decoded json
+        filesystem. The time spent is linear in the number of nodes
+
+        Parameters
+        ----------
+        json_data: dict
+            the root object of the json filesystem
+
+        Returns
+        ----------
+        root: TreeNode
+            the root of the tree
+        """
+        root = TreeNode(name=json_data["name"], size=json_data["size"],
+                        permissions=json_data["permissions"],
+                        time_modified=json_data["time_modified"],
+                        node_type=FileSystemNodeType.DIRECTORY)
+        # Iterative depth first visit. Each element of the stack is
+        # the iterator over the json contents of a directory and the
+        # node of that directory, so no child is copied in advance
+        stack = [(iter(json_data.get("contents", ())), root)]
+        with paused_gc():
+            FileSystemTree._visit_json_contents(stack)
+        return root
+
+    @staticmethod
+    def _visit_json_contents(stack: list[tuple[Iterator, TreeNode]]) -> None:
+        """Build the nodes of the json contents in the stack and of all
+        their descendants. The totals of each directory are computed
+        once all its children are built, from the children kept: a
+        child replaced by a later one with the same name is not counted
+
+        Parameters
+        ----------
+        stack: list[tuple[Iterator, TreeNode]]
+            the stack of the depth first visit, with the iterator over
+            the json contents of each directory and its node
+        """
+        while stack:
+            contents, parent_node = stack[-1]
+            for node_data in contents:
                 node_type = (FileSystemNodeType.DIRECTORY
                              if "contents" in node_data
                              else FileSystemNodeType.FILE)
@@ -117,7 +724,7 @@ class FileSystemTree:
                         permissions=node_data["permissions"],
                         time_modified=node_data["time_modified"],
                         node_type=node_type)
-                except KeyError:
+                except (KeyError, TypeError):
                     print(
                         "There is some invalid data in your json file. "
                         "Ignoring it.",
@@ -125,31 +732,375 @@ class FileSystemTree:
                     continue
                 parent_node.add_child(node_data["name"], current_node)
                 if node_type == FileSystemNodeType.DIRECTORY:
-                    FileSystemTree.enqueue_children(
-                        queue=queue, data=node_data, parent=current_node)
+                    stack.append((iter(node_data["contents"]), current_node))
+                    break
+            else:
+                stack.pop()
+                # All the subtree is built, the totals of the
+                # subdirectories are complete
+                parent_node.compute_totals()
+
+    def build_tree_parallel(self, json_path: str, workers: int) -> None:
+        """Build the filesystem tree from a json file in worker processes,
+        in two passes. First the workers scan consecutive ranges of the
+        file, and the scans are joined to find where each item of the
+        root contents starts. Then the items are split into contiguous
+        ranges of about the same number of bytes: each worker parses a
+        range and builds its subtrees, that are sent back as TreeColumns
+        and added under the root in order. The tree is the same built
+        by build_tree_from_json, but only the nodes received are built
+        here, so the speedup is bounded by that step.
+
+        Parameters
+        ----------
+        json_path: str
+            the path of the json file
+        workers: int
+            the number of worker processes
+        """
+        if workers <= 1:
+            self.build_tree_from_json(json_path)
+            return
+        try:
+            reader = pylsio.MappedJson(json_path)
+        except ValueError:
+            print("The provided json filesystem is invalid", file=sys.stderr)
+            return
+        except FileNotFoundError:
+            print(f"There is no {os.path.basename(json_path)} file",
+                  file=sys.stderr)
+            return
+        # Imported here, multiprocessing is slow to import for the
+        # commands that do not build the tree in parallel
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(workers) as executor:
+                def read_contents(key: str, offset: int) -> Optional[tuple]:
+                    if key != "contents" \
+                            or reader.data[offset:offset + 1] != b"[":
+                        return None
+                    return FileSystemTree._split_contents(
+                        reader, json_path, executor, offset,
+                        workers * PARALLEL_RANGES_PER_WORKER)
+
+                root_data, _ = reader.read_object(0, read_contents)
+                ranges = root_data.get("contents")
+                if not isinstance(ranges, list) or len(ranges) < 2:
+                    self.build_tree_from_json(json_path)
+                    return
+                root = TreeNode(name=root_data["name"],
+                                size=root_data["size"],
+                                permissions=root_data["permissions"],
+                                time_modified=root_data["time_modified"],
+                                node_type=FileSystemNodeType.DIRECTORY)
+                with paused_gc():
+                    for columns, errors in executor.map(
+                            _build_json_range, repeat(json_path),
+                            *zip(*ranges)):
+                        sys.stderr.write(errors)
+                        columns.attach(root)
+                root.compute_totals()
+        except (ValueError, KeyError, TypeError):
+            print("The provided json filesystem is invalid", file=sys.stderr)
+            return
+        finally:
+            reader.close()
+        self.root = root
+
+    @staticmethod
+    def _split_contents(reader: pylsio.MappedJson, json_path: str,
+                        executor: "Executor", offset: int, count: int
+                        ) -> tuple[list[tuple[int, int]], int]:
+        """Find the items of the root contents with the scans of count
+        ranges of the file done by the executor, then group them into
+        at most count ranges of about the same number of bytes.
+
+        Parameters
+        ----------
+        reader: MappedJson
+            the json file
+        json_path: str
+            the path of the json file, opened again by the workers
+        executor: Executor
+            the executor scanning the ranges
+        offset: int
+            the offset of the contents array
+        count: int
+            the number of ranges wanted
+
+        Returns
+        ----------
+        result: tuple[list[tuple[int, int]], int]
+            the start and end offsets of each range of items, and
+            the offset following the contents array
+
+        Raises
+        ----------
+        ValueError
+            if the contents array does not end
+        """
+        data = reader.data
+        step = (len(data) - offset) // count
+        starts = [offset + 1]
+        for index in range(1, count):
+            start = reader.object_start(max(offset + 1 + step * index,
+                                            starts[-1] + 1))
+            if start is None:
+                break
+            starts.append(start)
+        scans = executor.map(_scan_json_range, repeat(json_path),
+                             starts, starts[1:] + [len(data)])
+        # The depth inside the contents array is 1: its items
+        # are opened at depth 1 and it is closed at depth 0
+        item_starts = []
+        depth = 1
+        end = None
+        for scan in scans:
+            for closing, closing_depth in scan.closings:
+                if depth + closing_depth == 0:
+                    end = closing
+                    break
+            item_starts.extend(
+                opening for opening, opening_depth in scan.openings
+                if depth + opening_depth == 1
+                and (end is None or opening < end))
+            if end is not None:
+                break
+            depth += scan.depth
+        if end is None:
+            raise ValueError("The contents array does not end")
+        last = end
+        while last > offset + 1 \
+                and data[last - 1:last] in (b" ", b"\t", b"\n", b"\r"):
+            last -= 1
+        if data[last - 1:last] == b",":
+            raise ValueError("Trailing comma in the contents array")
+        if not item_starts or data[offset + 1:item_starts[0]].strip():
+            item_starts.insert(0, offset + 1)
+        items = [pylsio.JsonSpan(start, item_end) for start, item_end
+                 in zip(item_starts, item_starts[1:] + [end])]
+        return FileSystemTree.split_spans(items, count), end + 1
+
+    @staticmethod
+    def split_spans(spans: list[pylsio.JsonSpan],
+                    count: int) -> list[tuple[int, int]]:
+        """Group consecutive spans into at most count ranges
+        of about the same number of bytes.
+
+        Parameters
+        ----------
+        spans: list[JsonSpan]
+            the spans of the items of an array, in order
+        count: int
+            the number of ranges wanted
+
+        Returns
+        ----------
+        ranges: list[tuple[int, int]]
+            the start and end offsets of each range, covering
+            the spans and the separators between them
+        """
+        target = (spans[-1].end - spans[0].start) / count
+        ranges = []
+        start = None
+        for span in spans:
+            if start is None:
+                start = span.start
+            if span.end - start >= target:
+                ranges.append((start, span.end))
+                start = None
+        if start is not None:
+            ranges.append((start, spans[-1].end))
+        return ranges
+
+    def build_tree_from_snapshot(self, snapshot_path: str) -> None:
+        """Open the root of the filesystem tree from a binary snapshot.
+        The other nodes are decoded from the snapshot when they are accessed
+
+        Parameters
+        ----------
+        snapshot_path: str
+            the path of the snapshot
+        """
+        try:
+            snapshot = Snapshot(snapshot_path)
+            self.root = SnapshotTreeNode(snapshot, 0)
+            self._name_snapshot = snapshot
+        except (ValueError, struct.error):
+            print("The provided snapshot is invalid", file=sys.stderr)
+        except FileNotFoundError:
+            print(f"There is no {os.path.basename(snapshot_path)} file",
+                  file=sys.stderr)
+
+    def build_lazy_tree(self, json_path: str) -> None:
+        """Build the root of the filesystem tree from a json file.
+        The other nodes are read from the file when they are accessed,
+        so only the directories actually visited are built.
+
+        Parameters
+        ----------
+        json_path: str
+            the path of the json file
+        """
+        try:
+            reader = pylsio.MappedJson(json_path)
+            root_data, _ = reader.read_object(0)
+            if not isinstance(root_data.get("contents"), pylsio.JsonSpan):
+                root_data["contents"] = None
+            self.root = LazyTreeNode.from_json_members(reader, root_data)
+        except (ValueError, KeyError):
+            print("The provided json filesystem is invalid", file=sys.stderr)
+        except FileNotFoundError:
+            print(f"There is no {os.path.basename(json_path)} file",
+                  file=sys.stderr)
+
+    def build_tree_from_stream(self, json_path: str) -> None:
+        """Build the filesystem tree from a json file parsed incrementally.
+        Each node is built as soon as its json object ends, so the
+        memory used is the one of the tree plus the pending path.
+
+        Parameters
+        ----------
+        json_path: str
+            the path of the json file
+        """
+        try:
+            with open(json_path, encoding="UTF-8") as json_file, \
+                    paused_gc():
+                root, invalid_nodes = FileSystemTree.build_tree_from_events(
+                    pylsio.iter_json_events(json_file))
+        except ValueError:
+            print("The provided json filesystem is invalid", file=sys.stderr)
+        except FileNotFoundError:
+            print(f"There is no {os.path.basename(json_path)} file",
+                  file=sys.stderr)
+        else:
+            for _ in range(invalid_nodes):
+                print(
+                    "There is some invalid data in your json file. "
+                    "Ignoring it.",
+                    file=sys.stderr)
             self.root = root
 
     @staticmethod
-    def enqueue_children(queue: list[tuple[dict, TreeNode]],
-                         data: dict, parent: TreeNode) -> None:
-        """Static method used to insert in the 'queue' list,
-        each object inside data["contents"]. The queue contains tuple
-        of type (dict, TreeNode) where dict is the node data and TreeNode
-        is a reference to the parent
+    def build_tree_from_events(
+            events: Iterator[tuple]) -> tuple[TreeNode, int]:
+        """Static method used to build a tree from the events
+        yielded by pyls.utils.io.iter_json_events.
+        The invalid nodes are counted like build_tree_from_json does:
+        the invalid descendants of an invalid node are not reported
 
         Parameters
         ----------
-        queue: list[tuple[dict, TreeNode]]
-            list into enqueue
-        data: dict
-            first element of the tuple to enqueue.
-            Represent the data that will be used to build the child
-        parent: TreeNode
-            second element of the tuple to enqueue.
-            Represent the parent node of the child that will be built
+        events: Iterator[tuple]
+            the (event, value) tuples of the json document
+
+        Returns
+        ----------
+        result: tuple[TreeNode, int]
+            the root of the tree and the number of invalid nodes ignored
+
+        Raises
+        ----------
+        ValueError
+            if the root object misses some of the required fields
         """
-        for child_data in data["contents"]:
-            queue.append((child_data, parent))
+        # Each frame is [fields, children, invalid_nodes, in_contents]
+        frames: list[list] = []
+        key = None
+        skip_depth = 0
+        for event, value in events:
+            if skip_depth:
+                if event in ("start_map", "start_array"):
+                    skip_depth += 1
+                elif event in ("end_map", "end_array"):
+                    skip_depth -= 1
+                continue
+            if not frames and event != "start_map":
+                break
+            if event == "map_key":
+                key = value
+            elif event == "start_map":
+                if not frames or frames[-1][3]:
+                    frames.append([{}, None, 0, False])
+                else:
+                    skip_depth = 1
+            elif event == "start_array":
+                frame = frames[-1]
+                if key == "contents" and not frame[3] \
+                        and frame[1] is None:
+                    frame[1] = []
+                    frame[3] = True
+                elif frame[3]:
+                    frame[2] += 1
+                    skip_depth = 1
+                else:
+                    skip_depth = 1
+            elif event == "end_array":
+                frames[-1][3] = False
+            elif event == "value":
+                frame = frames[-1]
+                if frame[3]:
+                    frame[2] += 1
+                else:
+                    frame[0][key] = value
+            elif event == "end_map":
+                fields, children, invalid_nodes, _ = frames.pop()
+                if not frames:
+                    try:
+                        root = FileSystemTree._node_from_fields(
+                            fields, children, FileSystemNodeType.DIRECTORY)
+                    except (KeyError, TypeError) as error:
+                        raise ValueError("Invalid root object") from error
+                    return root, invalid_nodes
+                parent = frames[-1]
+                try:
+                    node = FileSystemTree._node_from_fields(
+                        fields, children,
+                        FileSystemNodeType.FILE if children is None
+                        else FileSystemNodeType.DIRECTORY)
+                except (KeyError, TypeError):
+                    parent[2] += 1
+                    continue
+                parent[1].append(node)
+                parent[2] += invalid_nodes
+        raise ValueError("The json document is not an object")
+
+    @staticmethod
+    def _node_from_fields(fields: dict, children: Optional[list],
+                          node_type: FileSystemNodeType) -> TreeNode:
+        """Build a TreeNode from the fields of its json object.
+
+        Parameters
+        ----------
+        fields: dict
+            the scalar fields of the json object
+        children: list[TreeNode] | None
+            the children already built, None for a file
+        node_type: FileSystemNodeType
+            the type of the node to build
+
+        Returns
+        ----------
+        node: TreeNode
+            the node built
+
+        Raises
+        ----------
+        KeyError
+            if one of the required fields is missing
+        TypeError
+            if the name or the permissions are not strings
+        """
+        node = TreeNode(name=fields["name"], size=fields["size"],
+                        permissions=fields["permissions"],
+                        time_modified=fields["time_modified"],
+                        node_type=node_type)
+        for child in children or ():
+            node.add_child(child.name, child)
+        if node_type == FileSystemNodeType.DIRECTORY:
+            node.compute_totals()
+        return node
 
     @staticmethod
     def filter_children(
@@ -171,14 +1122,33 @@ class FileSystemTree:
             list of filtered TreeNode
         """
         filtered_children = children
-        if filter_by in ("file", "dir"):
-            filter_by_enum = (FileSystemNodeType.FILE if filter_by == "file"
-                              else FileSystemNodeType.DIRECTORY)
+        filter_by_enum = FileSystemTree.filter_type(filter_by)
+        if filter_by_enum is not None:
             filtered_children = [
                 child for child in children
-                if child.data.node_type == filter_by_enum]
+                if child.node_type == filter_by_enum]
         return filtered_children
 
+    @staticmethod
+    def filter_type(filter_by: Optional[str]) -> Optional[FileSystemNodeType]:
+        """Return the node type selected by a filter key.
+
+        Parameters
+        ----------
+        filter_by: str | None
+            filter key. file for the file nodes, dir for the directory nodes
+
+        Returns
+        ----------
+        node_type: FileSystemNodeType | None
+            the node type, None if the key does not filter the nodes
+        """
+        if filter_by == "file":
+            return FileSystemNodeType.FILE
+        if filter_by == "dir":
+            return FileSystemNodeType.DIRECTORY
+        return None
+
     @staticmethod
     def sort_children(
             children: list[TreeNode],
@@ -197,80 +1167,774 @@ class FileSystemTree:
         """
         children.sort(key=operator.attrgetter(sort_by), reverse=reverse)
 
+    def resolve(self, path: Optional[str]) -> Optional[TreeNode]:
+        """Find the node of the provided path, without changing
+        the current_node. Safe to call from concurrent requests.
+        The nodes found are kept in path_cache, and a path not in
+        the cache is walked from its longest ancestor in the cache
+
+        Parameters
+        ----------
+        path: str | None
+            The path to navigate, relative to the root.
+            The .. components move to the parent directory
+
+        Returns
+        ----------
+        node: TreeNode | None
+            The node of the path, None if the path is not valid
+        """
+        root = self.root
+        if root is None:
+            return None
+        normalized_path = normalize_path(path or "")
+        if not normalized_path:
+            return root
+        stats.count("paths_resolved")
+        cache = self.path_cache
+        cache.bind(root)
+        current_node = cache.get(normalized_path)
+        if current_node is None:
+            with stats.phase("resolve"):
+                current_node = self._walk_components(
+                    normalized_path.split("/"))
+            if current_node is None:
+                return None
+            cache.put(normalized_path, current_node)
+        if current_node.node_type == FileSystemNodeType.FILE and path.endswith("/"):
+            return None
+        return current_node
+
+    def _walk_components(self, components: list[str]) -> Optional[TreeNode]:
+        """Walk the components of a path starting from the longest
+        ancestor in path_cache, or from the root. The directory
+        containing the node is added to the cache, so the next
+        paths of the same directory start from it
+
+        Parameters
+        ----------
+        components: list[str]
+            The components of the path, without empty and . components
+
+        Returns
+        ----------
+        node: TreeNode | None
+            The node of the path, None if the path is not valid
+        """
+        cache = self.path_cache
+        current_node = self.root
+        start = 0
+        for end in range(len(components) - 1, 0, -1):
+            ancestor = cache.peek("/".join(components[:end]))
+            if ancestor is not None:
+                current_node, start = ancestor, end
+                break
+        for position in range(start, len(components)):
+            if position == len(components) - 1 and position > start:
+                cache.put("/".join(components[:position]), current_node)
+            current_node = self._step(current_node, components[position])
+            if current_node is None:
+                return None
+        return current_node
+
+    def _step(self, node: TreeNode, component: str) -> Optional[TreeNode]:
+        """Move from a node to the child with the name component,
+        or to its parent for the .. component
+
+        Returns
+        ----------
+        node: TreeNode | None
+            The node reached, None if there is no such node
+        """
+        if component != "..":
+            return node.get_child(component)
+        if node.node_type == FileSystemNodeType.FILE:
+            return None
+        # Like in the shell, the parent of the root is the root
+        return node if node is self.root else node.parent
+
+    def resolve_many(self, paths: list[Optional[str]]
+                     ) -> list[Optional[TreeNode]]:
+        """Find the nodes of many paths, like resolve does for each one.
+        The paths are resolved in sorted order, so that the components
+        shared with the previous path are not walked again. The paths
+        are not added to path_cache, that keeps the hot ones
+
+        Parameters
+        ----------
+        paths: list[str | None]
+            The paths to navigate, relative to the root
+
+        Returns
+        ----------
+        nodes: list[TreeNode | None]
+            The node of each path, None for the paths not valid
+        """
+        nodes: list[Optional[TreeNode]] = [None] * len(paths)
+        if self.root is None:
+            return nodes
+        normalized_paths = [normalize_path(path or "") for path in paths]
+        # chain[count] is the node of the first count components
+        # of the previous path
+        chain = [self.root]
+        previous: list[str] = []
+        for position in sorted(range(len(paths)),
+                               key=normalized_paths.__getitem__):
+            components = normalized_paths[position].split("/") \
+                if normalized_paths[position] else []
+            common = 0
+            limit = min(len(components), len(chain) - 1)
+            while common < limit and components[common] == previous[common]:
+                common += 1
+            del chain[common + 1:]
+            node = chain[-1]
+            for component in components[common:]:
+                node = self._step(node, component)
+                if node is None:
+                    break
+                chain.append(node)
+            previous = components
+            if node is not None \
+                    and node.node_type == FileSystemNodeType.FILE \
+                    and (paths[position] or "").endswith("/"):
+                node = None
+            nodes[position] = node
+        return nodes
+
+    def resolve_ancestors(self, path: Optional[str]
+                          ) -> Optional[list[TreeNode]]:
+        """Find the node of the provided path and all its ancestors,
+        following the parent links from the node to the root.
+
+        Parameters
+        ----------
+        path: str | None
+            The path to navigate, relative to the root
+
+        Returns
+        ----------
+        nodes: list[TreeNode] | None
+            The nodes from the root to the node of the path,
+            None if the path is not valid
+        """
+        node = self.resolve(path)
+        if node is None:
+            return None
+        nodes = [node]
+        while node is not self.root:
+            node = node.parent
+            nodes.append(node)
+        nodes.reverse()
+        return nodes
+
+    def add_node(self, path: Optional[str], node: TreeNode) -> bool:
+        """Add a node to the directory of the provided path, replacing
+        the child with the same name. The totals of the directory and
+        of its ancestors are updated without visiting their subtrees
+
+        Parameters
+        ----------
+        path: str | None
+            The path of the directory, relative to the root
+        node: TreeNode
+            The node to add, with its subtree
+
+        Returns
+        ----------
+        result: bool
+            True if the node was added, False if the path
+            is not a valid directory
+        """
+        ancestors = self.resolve_ancestors(path)
+        if ancestors is None \
+                or ancestors[-1].node_type != FileSystemNodeType.DIRECTORY:
+            return False
+        if ancestors[-1].get_child(node.name) is not None:
+            self._remove_child(ancestors, node.name)
+        ancestors[-1].add_child(node.name, node)
+        self._invalidate()
+        for ancestor in ancestors:
+            # The orders by total size of the ancestors are changed
+            ancestor._index = None
+        totals = FileSystemTree._totals_if_cached(ancestors, node)
+        if totals is None:
+            return True
+        is_directory = node.node_type == FileSystemNodeType.DIRECTORY
+        for ancestor in ancestors:
+            if ancestor._totals is not None:
+                ancestor._totals.add(totals, is_directory)
+        return True
+
+    @staticmethod
+    def _totals_if_cached(ancestors: list[TreeNode],
+                          node: TreeNode) -> Optional[DirectoryTotals]:
+        """Return the totals of a node added or removed, if one of its
+        ancestors has its totals to update. Otherwise the subtree of
+        the node, maybe not read yet from a lazy tree or a snapshot,
+        is not visited
+
+        Parameters
+        ----------
+        ancestors: list[TreeNode]
+            The nodes from the root to the parent of the node
+        node: TreeNode
+            The node added or removed
+
+        Returns
+        ----------
+        totals: DirectoryTotals | None
+            The totals of the node, None if no ancestor has totals
+        """
+        if all(ancestor._totals is None for ancestor in ancestors):
+            return None
+        return node.totals()
+
+    def remove_node(self, path: Optional[str]) -> Optional[TreeNode]:
+        """Remove the node of the provided path with its subtree.
+        The totals of its ancestors are updated without visiting their
+        subtrees, except the newest modification time that is computed
+        again from the children when the removed node was the newest
+
+        Parameters
+        ----------
+        path: str | None
+            The path of the node, relative to the root
+
+        Returns
+        ----------
+        node: TreeNode | None
+            The node removed, None if the path is not valid
+            or it is the root
+        """
+        ancestors = self.resolve_ancestors(path)
+        if ancestors is None or len(ancestors) < 2:
+            return None
+        node = ancestors.pop()
+        self._remove_child(ancestors, node.name)
+        self._invalidate()
+        return node
+
+    def _invalidate(self) -> None:
+        """Drop the name index and the paths cached after a change
+        of the tree. The name index of the snapshot does not
+        describe the tree anymore"""
+        self._name_index = None
+        self._name_snapshot = None
+        self.path_cache.clear()
+
+    def name_index(self) -> Optional[NameIndex]:
+        """Return the name index of the tree. It is read from the
+        snapshot when the tree has one, otherwise it is built
+        visiting the tree the first time it is requested
+
+        Returns
+        ----------
+        index: NameIndex | None
+            The name index, None if the tree has no root
+        """
+        if self._name_index is None and self.root is not None:
+            tables = (self._name_snapshot.name_tables()
+                      if self._name_snapshot is not None else None)
+            if tables is not None:
+                self._name_index = NameIndex(tables,
+                                             self._name_snapshot.string)
+            else:
+                self._name_index = NameIndex.from_tree(self.root)
+        return self._name_index
+
+    def find(self, pattern: str) -> list[str]:
+        """Find the paths of the nodes whose name matches a
+        shell-style pattern, like find -name does, using the name index.
+
+        Parameters
+        ----------
+        pattern: str
+            The name or the pattern
+
+        Returns
+        ----------
+        paths: list[str]
+            The sorted paths of the matching nodes, relative to the root
+        """
+        index = self.name_index()
+        if index is None:
+            return []
+        return sorted(index.paths(index.find(pattern)))
+
+    @staticmethod
+    def _remove_child(ancestors: list[TreeNode], name: str) -> None:
+        """Remove a child of the last node of ancestors, updating the
+        totals of ancestors
+
+        Parameters
+        ----------
+        ancestors: list[TreeNode]
+            The nodes from the root to the parent of the child
+        name: str
+            The name of the child
+        """
+        parent = ancestors[-1]
+        node = parent.children.pop(name)
+        node.parent = None
+        if not parent.children:
+            parent.children = None
+        for ancestor in ancestors:
+            ancestor._index = None
+        totals = FileSystemTree._totals_if_cached(ancestors, node)
+        if totals is None:
+            return
+        is_directory = node.node_type == FileSystemNodeType.DIRECTORY
+        for ancestor in reversed(ancestors):
+            ancestor_totals = ancestor._totals
+            if ancestor_totals is None:
+                continue
+            ancestor_totals.remove(totals, is_directory)
+            if totals.newest >= ancestor_totals.newest:
+                ancestor_totals.newest = max(
+                    [ancestor.time_modified] + [
+                        child.totals().newest
+                        for child in (ancestor.children or {}).values()])
+
     def change_directory(self, path: Optional[str]) -> bool:
         """Change the current_node navigating the provided path
 
         Parameters
         ----------
         path: str | None
-            The path to navigate
+            The path to navigate, relative to the root.
+            The .. components move to the parent directory
 
         Returns
         ----------
         result: bool
             True if the path is valid, False otherwise
         """
-        fixed_path = path.replace("./", "") if path else path
-        current_node = self.root
-        if fixed_path and fixed_path != ".":
-            splitted_path = filter(None, fixed_path.split("/"))
-            for component in splitted_path:
-                if component in current_node.children:
-                    current_node = current_node.children[component]
-                else:
-                    return False
-        if current_node.data.node_type == FileSystemNodeType.FILE and path.endswith("/"):
+        current_node = self.resolve(path)
+        if current_node is None:
             return False
         self.current_node = current_node
         return True
 
-    def print_children(self, show_all=False, long_listing=False,
-                       reverse_sorting=False, sort_by_time=False,
-                       filter_by: Optional[str] = None,
-                       humanize=False) -> None:
-        """Print the children of the curren_node
+    def list_directory(self, path: Optional[str],
+                       options: Optional[ListingOptions] = None
+                       ) -> ListingResult:
+        """List the provided path without changing the current_node.
+        The tree is only read, so many threads can list the same tree
 
         Parameters
         ----------
         path: str | None
-            The path to navigate
+            The path to list, relative to the root
+        options: ListingOptions | None
+            The options of the listing. The defaults when None
+
+        Returns
+        ----------
+        result: ListingResult
+            The listing. Its node is None if the path is not valid
         """
-        if self.root is None:
+        options = options or ListingOptions()
+        node = self.resolve(path)
+        if node is None:
+            return ListingResult(path=path, node=None, options=options)
+        return FileSystemTree.list_node(node, options, path=path)
+
+    def list_recursive(self, path: Optional[str],
+                       options: Optional[ListingOptions] = None
+                       ) -> Iterator[ListingResult]:
+        """List the provided path and all its subdirectories, like ls -R.
+        The directories are listed one at a time in depth first order,
+        the subdirectories of each one in the order of its listing.
+        The visit uses an explicit stack holding the directories still
+        to list, so the memory used grows with the depth of the tree
+        times the width of the directories, and deep trees do not reach
+        the recursion limit
+
+        Parameters
+        ----------
+        path: str | None
+            The path to list, relative to the root
+        options: ListingOptions | None
+            The options of each listing. The defaults when None
+
+        Yields
+        ----------
+        result: ListingResult
+            The listing of each directory, with its path. A single
+            listing with node None if the path is not valid
+        """
+        options = options or ListingOptions()
+        node = self.resolve(path)
+        if node is None:
+            yield ListingResult(path=path, node=None, options=options)
             return
+        yield from FileSystemTree.walk_listings(node, path or ".", options)
 
-        if self.current_node.children is None:
-            children_list = [self.current_node]
-        else:
-            children_list = list(self.current_node.children.values())
+    @staticmethod
+    def walk_listings(node: TreeNode, path: str,
+                      options: ListingOptions) -> Iterator[ListingResult]:
+        """List a node and all its subdirectories.
+        See list_recursive for the order and the memory used
 
-        filtered_children = FileSystemTree.filter_children(
-            filter_by, children_list)
+        Parameters
+        ----------
+        node: TreeNode
+            The node to list
+        path: str
+            The path of the node
+        options: ListingOptions
+            The options of each listing
 
-        sort_key = "data.time_modified" if sort_by_time else "data.name"
-        FileSystemTree.sort_children(children=filtered_children,
-                                     sort_by=sort_key, reverse=reverse_sorting)
+        Yields
+        ----------
+        result: ListingResult
+            The listing of each directory, with its path
+        """
+        stack = [(path, node)]
+        while stack:
+            node_path, node = stack.pop()
+            yield FileSystemTree.list_node(node, options, path=node_path)
+            index = node.directory_index()
+            if index is None:
+                continue
+            prefix = node_path.rstrip("/")
+            subdirectories = [
+                (f"{prefix}/{child.name}", child)
+                for child in index.walk(options.sort_key,
+                                        options.reverse_sorting)
+                if child.node_type == FileSystemNodeType.DIRECTORY
+                and (options.show_all or not child.name.startswith("."))]
+            subdirectories.reverse()
+            stack.extend(subdirectories)
 
-        strings_to_print: list[str] = []
-        if humanize:
-            size_max_length = max(
-                map(lambda x: len(humanize_size(x.data.size)), filtered_children))
-        else:
-            size_max_length = len(
-                str(max(filtered_children, key=operator.attrgetter("data.size")).data.size))
-
-        for child in filtered_children:
-            if (not show_all and not child.data.name.startswith(".")) or show_all:
-                if long_listing:
-                    formatted_time = time.strftime(
-                        "%b %d %H:%M", time.localtime(
-                            child.data.time_modified))
-                    formatted_size = humanize_size(
-                        child.data.size) if humanize else child.data.size
-                    strings_to_print.append(
-                        f"{child.data.permissions} "
-                        f"{formatted_size:>{size_max_length}} "
-                        f"{formatted_time} {child.data.name}")
+    def glob(self, pattern: str) -> Iterator[tuple[str, TreeNode]]:
+        """Find the nodes whose path matches a shell-style pattern,
+        with the wildcards *, ?, [...] and ** for any number of
+        directories. See pyls.data.pattern.PathPattern
+
+        Parameters
+        ----------
+        pattern: str
+            The pattern, relative to the root
+
+        Yields
+        ----------
+        match: tuple[str, TreeNode]
+            The path of each matching node and the node
+        """
+        if self.root is not None:
+            yield from PathPattern(pattern).match(self.root)
+
+    @staticmethod
+    def list_paths(matches: list[tuple[str, TreeNode]],
+                   options: ListingOptions,
+                   recursive: bool = False) -> Iterator[ListingResult]:
+        """List many paths like ls lists its operands: the files first,
+        in a single listing without path whose rows are named by their
+        path, then the listing of each directory. The operands are
+        sorted with the options of the listing
+
+        Parameters
+        ----------
+        matches: list[tuple[str, TreeNode]]
+            The path and the node of each operand
+        options: ListingOptions
+            The options of the listings
+        recursive: bool
+            Whether the subdirectories of the directories are listed too
+
+        Yields
+        ----------
+        result: ListingResult
+            The listing of the files, with path and node None,
+            and the listing of each directory
+        """
+        node_key = operator.attrgetter(options.sort_key)
+
+        def key(match: tuple[str, TreeNode]):
+            # The operands are sorted by their path, not their name
+            return match[0] if options.sort_key == "name" \
+                else node_key(match[1])
+
+        with stats.phase("sort"):
+            ordered = sorted(matches, key=key,
+                             reverse=options.reverse_sorting)
+        node_type = FileSystemTree.filter_type(options.filter_by)
+        files = [(path, node) for path, node in ordered
+                 if node.node_type != FileSystemNodeType.DIRECTORY
+                 and node_type in (None, node.node_type)
+                 and options.keeps(node)]
+        if files:
+            rows = [node for _, node in files]
+            humanized: dict = {}
+            yield ListingResult(
+                path=None, node=None, options=options, rows=rows,
+                size_width=DirectoryIndex(rows).size_width(
+                    None, options.humanize, options.size_key, humanized),
+                names=[path for path, _ in files],
+                humanized=humanized or None)
+        for path, node in ordered:
+            if node.node_type != FileSystemNodeType.DIRECTORY:
+                continue
+            if recursive:
+                yield from FileSystemTree.walk_listings(node, path, options)
+            else:
+                yield FileSystemTree.list_node(node, options, path=path)
+
+    def list_operand(self, path: Optional[str], options: ListingOptions,
+                     recursive: bool = False
+                     ) -> tuple[bool, Iterator[ListingResult]]:
+        """List a path argument of pyls, that can be a pattern.
+
+        Parameters
+        ----------
+        path: str | None
+            The path or the pattern to list, relative to the root
+        options: ListingOptions
+            The options of the listings
+        recursive: bool
+            Whether the subdirectories are listed too
+
+        Returns
+        ----------
+        result: tuple[bool, Iterator[ListingResult]]
+            Whether the listings must be printed with their path as
+            header, like write_listings does, and the listings. When
+            nothing matches, a single listing with node None
+        """
+        if not has_magic(path):
+            if recursive:
+                node = self.resolve(path)
+                if node is not None \
+                        and node.node_type == FileSystemNodeType.DIRECTORY:
+                    return True, self.list_recursive(path, options)
+            return False, iter((self.list_directory(path, options),))
+        with stats.phase("resolve"):
+            matches = list(self.glob(path))
+        if not matches:
+            return False, iter((ListingResult(path=path, node=None,
+                                              options=options),))
+        if len(matches) == 1 and not recursive:
+            match_path, node = matches[0]
+            if node.node_type == FileSystemNodeType.DIRECTORY:
+                return False, iter((FileSystemTree.list_node(
+                    node, options, path=match_path),))
+        return True, FileSystemTree.list_paths(matches, options, recursive)
+
+    def list_operands(self, paths: list[str], options: ListingOptions,
+                      recursive: bool = False
+                      ) -> tuple[list[str], Iterator[ListingResult]]:
+        """List many path arguments of pyls together, like ls does with
+        more operands: the files first, then each directory with its
+        path as header. The paths without patterns are resolved
+        together with resolve_many
+
+        Parameters
+        ----------
+        paths: list[str]
+            The paths or the patterns to list, relative to the root
+        options: ListingOptions
+            The options of the listings
+        recursive: bool
+            Whether the subdirectories are listed too
+
+        Returns
+        ----------
+        result: tuple[list[str], Iterator[ListingResult]]
+            The paths that do not exist or match nothing,
+            and the listings of the others, like list_paths
+        """
+        plain_paths = [path for path in paths if not has_magic(path)]
+        missing = []
+        matches = []
+        with stats.phase("resolve"):
+            nodes = dict(zip(plain_paths, self.resolve_many(plain_paths)))
+            for path in paths:
+                if has_magic(path):
+                    path_matches = list(self.glob(path))
+                else:
+                    node = nodes[path]
+                    path_matches = [] if node is None else [(path, node)]
+                if path_matches:
+                    matches.extend(path_matches)
+                else:
+                    missing.append(path)
+        return missing, FileSystemTree.list_paths(matches, options,
+                                                  recursive)
+
+    @staticmethod
+    def list_node(node: TreeNode, options: ListingOptions,
+                  path: Optional[str] = None) -> ListingResult:
+        """List the children of a node.
+        The node itself is listed if it is a file
+
+        Parameters
+        ----------
+        node: TreeNode
+            The node to list
+        options: ListingOptions
+            The options of the listing
+        path: str | None
+            The path of the node, reported in the result
+
+        Returns
+        ----------
+        result: ListingResult
+            The listing of the node
+        """
+        with stats.phase("sort"):
+            # A file lists itself
+            index = node.directory_index() or DirectoryIndex((node,))
+            node_type = FileSystemTree.filter_type(options.filter_by)
+            # The hidden entries count in the size width even when not listed
+            humanized: dict = {}
+            size_max_length = index.size_width(node_type, options.humanize,
+                                               options.size_key, humanized)
+            show_all = options.show_all
+            stop = None if options.limit is None \
+                else options.offset + options.limit
+            columns = index.columns()
+            if columns is not None:
+                # Filters as masks and cached orders as arrays of positions
+                filtered_children = columns.select(
+                    options.sort_key, options.reverse_sorting,
+                    columns.mask(node_type, show_all, options.min_size,
+                                 options.newer_than, options.size_key),
+                    options.offset, stop)
+            else:
+                filtered = options.min_size is not None \
+                    or options.newer_than is not None
+
+                def keep(child: TreeNode) -> bool:
+                    return ((node_type is None or child.node_type == node_type)
+                            and (show_all or not child.name.startswith("."))
+                            and (not filtered or options.keeps(child)))
+
+                if stop is None and not options.offset:
+                    filtered_children = list(filter(
+                        keep, index.walk(options.sort_key,
+                                         options.reverse_sorting)))
                 else:
-                    strings_to_print.append(child.data.name)
-        join_operator = "\n" if long_listing else " "
-        print(join_operator.join(strings_to_print))
+                    # Only the rows of the requested page are selected
+                    filtered_children = index.select(
+                        options.sort_key, options.reverse_sorting, stop,
+                        keep)[options.offset:]
+            return ListingResult(path=path, node=node, options=options,
+                                 rows=filtered_children,
+                                 size_width=size_max_length,
+                                 humanized=humanized or None)
+
+    @staticmethod
+    def render_children(node: TreeNode, show_all=False, long_listing=False,
+                        reverse_sorting=False, sort_by_time=False,
+                        filter_by: Optional[str] = None,
+                        humanize=False, sort_by_size=False) -> str:
+        """Format the listing of the children of a node.
+        The node itself is listed if it is a file
+
+        Parameters
+        ----------
+        node: TreeNode
+            The node to list
+        show_all: bool
+            whether the entries starting with . are listed
+        long_listing: bool
+            whether the long listing format is used
+        reverse_sorting: bool
+            whether the sorting order is reversed
+        sort_by_time: bool
+            whether the entries are sorted by time instead of name
+        filter_by: str | None
+            file to list only files, dir to list only directories
+        humanize: bool
+            whether the sizes are human readable in the long listing
+        sort_by_size: bool
+            whether the entries are sorted by size instead of name
+
+        Returns
+        ----------
+        listing: str
+            The text of the listing, without the final newline
+        """
+        return render(FileSystemTree.list_node(node, ListingOptions(
+            show_all=show_all, long_listing=long_listing,
+            reverse_sorting=reverse_sorting, sort_by_time=sort_by_time,
+            sort_by_size=sort_by_size, filter_by=filter_by,
+            humanize=humanize)))
+
+    def print_children(self, show_all=False, long_listing=False,
+                       reverse_sorting=False, sort_by_time=False,
+                       filter_by: Optional[str] = None,
+                       humanize=False, sort_by_size=False) -> None:
+        """Print the children of the curren_node, writing the
+        rows as they are formatted. See render_children for the parameters
+        """
+        if self.root is None:
+            return
+        options = ListingOptions(
+            show_all=show_all, long_listing=long_listing,
+            reverse_sorting=reverse_sorting, sort_by_time=sort_by_time,
+            sort_by_size=sort_by_size, filter_by=filter_by,
+            humanize=humanize)
+        write_listing(FileSystemTree.list_node(self.current_node, options),
+                      sys.stdout)
+
+
+def _scan_json_range(json_path: str, start: int,
+                     end: int) -> pylsio.JsonRangeScan:
+    """Scan a range of a json file, in a worker process
+    of FileSystemTree.build_tree_parallel.
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json file
+    start: int
+        the offset where the scan starts, not inside a string
+    end: int
+        the offset where the scan ends
+
+    Returns
+    ----------
+    scan: JsonRangeScan
+        the brackets not matched inside the range
+    """
+    reader = pylsio.MappedJson(json_path)
+    try:
+        return reader.scan_range(start, end)
+    finally:
+        reader.close()
+
+
+def _build_json_range(json_path: str, start: int,
+                      end: int) -> tuple[TreeColumns, str]:
+    """Build the subtrees of a range of items of the root contents of
+    a json file, in a worker process of FileSystemTree.build_tree_parallel.
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json file
+    start: int
+        the offset of the first item
+    end: int
+        the offset following the last item and its separator
+
+    Returns
+    ----------
+    result: tuple[TreeColumns, str]
+        the columns of the subtrees, under a root without name, and
+        the messages about the invalid data, to be printed in order
+    """
+    with open(json_path, "rb") as json_file:
+        json_file.seek(start)
+        items = json_file.read(end - start).rstrip(b" \t\n\r")
+    if items.endswith(b","):
+        items = items[:-1]
+    contents = json.loads(b"[" + items + b"]")
+    root = TreeNode(name="", size=0, time_modified=0, permissions="",
+                    node_type=FileSystemNodeType.DIRECTORY)
+    errors = io.StringIO()
+    with contextlib.redirect_stderr(errors), paused_gc():
+        FileSystemTree._visit_json_contents([(iter(contents), root)])
+    return TreeColumns.from_tree(root), errors.getvalue()
@@ -0,0 +1,413 @@
+"""Module providing the pyls listing server, that keeps a FileSystemTree
+loaded and answers the listing requests sent over a unix socket.
+The client used by the pyls command to reach it is pyls.client.
+
+Each request is a json line {"path": ..., "options": {...}} where the
+options are the fields of pyls.data.listing.ListingOptions. A request
+with "recursive": true lists the subdirectories too, like pyls -R.
+The path can be a glob pattern, like the pyls argument, and a request
+with "paths": [...] instead of "path" lists many paths, like pyls with
+more arguments. The request
+{"find": "pattern"} is answered with the paths found by
+FileSystemTree.find, one per line, like pyls --find.
+Each response is a json line, either {"output": "..."} with the listing
+text or {"error": "..."}. A client can send many requests without
+waiting: the responses of a connection come back in the same order.
+A request may carry an "id", echoed in its response.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import errno
+import json
+import os
+import signal
+import sys
+from typing import Callable, Optional, Union
+
+from pyls.client import is_running
+from pyls.data.listing import (ListingOptions, not_found_message, render,
+                               render_listings)
+from pyls.data.pattern import has_magic
+from pyls.data.tree import FileSystemTree
+
+RELOAD_INTERVAL = 1.0
+# The longest request line accepted, in bytes. The default limit of
+# asyncio, 64 KiB, is reached by the requests of a few thousand paths
+REQUEST_LIMIT = 1 << 26
+LISTING_OPTIONS = frozenset(
+    option.name for option in dataclasses.fields(ListingOptions))
+# The largest request line and the largest directory listed on the
+# event loop, and the keys of the requests listed there. The other
+# requests are answered by the threads of the executor
+INLINE_REQUEST_SIZE = 1 << 12
+INLINE_MAX_CHILDREN = 1024
+INLINE_REQUEST_KEYS = frozenset(("path", "options", "id"))
+
+
+def decode_request(line: bytes):
+    """Decode a request line.
+
+    Parameters
+    ----------
+    line: bytes
+        the json line of the request
+
+    Returns
+    ----------
+    request: object
+        the decoded request, None if it is not valid json
+    """
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+class ListingService:
+    """A class used to answer listing requests from a resident tree.
+    The requests are answered with FileSystemTree.list_operand, that
+    never changes the tree current_node, so any number of them can be
+    served from the same tree, also by concurrent threads
+
+    Attributes
+    ----------
+    tree : FileSystemTree
+        the tree currently served
+    """
+
+    def __init__(self, tree: FileSystemTree):
+        """
+        Parameters
+        ----------
+        tree: FileSystemTree
+            the tree to serve
+        """
+        self.tree = tree
+
+    def handle_request(self, request: dict) -> dict:
+        """Answer a single listing request.
+
+        Parameters
+        ----------
+        request: dict
+            the decoded request
+
+        Returns
+        ----------
+        response: dict
+            the response to encode. The error is "not_found" when
+            the path does not exist, "no_filesystem" when the tree
+            could not be loaded
+        """
+        if not isinstance(request, dict):
+            return {"error": "invalid_request"}
+        # The tree may be replaced while the request is served
+        tree = self.tree
+        options = request.get("options") or {}
+        path = request.get("path")
+        paths = request.get("paths")
+        find = request.get("find")
+        try:
+            if not isinstance(options, dict) \
+                    or not set(options) <= LISTING_OPTIONS \
+                    or not isinstance(path, (str, type(None))) \
+                    or not isinstance(find, (str, type(None))) \
+                    or not (paths is None or isinstance(paths, list) and all(
+                        isinstance(path, str) for path in paths)):
+                raise ValueError("Invalid request")
+            options = ListingOptions(**options)
+        except ValueError:
+            response = {"error": "invalid_request"}
+        else:
+            if tree.root is None:
+                response = {"error": "no_filesystem"}
+            elif find is not None:
+                response = {"output": "\n".join(tree.find(find))}
+            elif paths is not None:
+                missing, results = tree.list_operands(
+                    paths, options, recursive=bool(request.get("recursive")))
+                output = [not_found_message(path) for path in missing]
+                listings = render_listings(results)
+                if listings:
+                    output.append(listings)
+                response = {"output": "\n".join(output)}
+            else:
+                headers, results = tree.list_operand(
+                    path, options, recursive=bool(request.get("recursive")))
+                if headers:
+                    response = {"output": render_listings(results)}
+                else:
+                    result = next(results)
+                    if not result.found:
+                        response = {"error": "not_found"}
+                    else:
+                        response = {"output": render(result)}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def is_small(self, request) -> bool:
+        """Check whether a request is answered quickly enough to be
+        answered on the event loop: the listing of a single path,
+        without wildcards, of a directory with fewer than
+        INLINE_MAX_CHILDREN children. The other ones are answered
+        by the executor, like the finds and the recursive listings
+
+        Parameters
+        ----------
+        request: dict | None
+            the decoded request
+
+        Returns
+        ----------
+        result: bool
+            True if the request can be answered on the event loop
+        """
+        if not isinstance(request, dict) \
+                or not set(request) <= INLINE_REQUEST_KEYS:
+            return False
+        path = request.get("path")
+        if not isinstance(path, (str, type(None))) or has_magic(path):
+            return False
+        node = self.tree.resolve(path)
+        return node is None \
+            or len(node.children or ()) < INLINE_MAX_CHILDREN
+
+    def respond(self, request) -> bytes:
+        """Answer a request and encode the response.
+
+        Parameters
+        ----------
+        request: dict | None
+            the decoded request, None if it is not valid json
+
+        Returns
+        ----------
+        response: bytes
+            the json line of the response
+        """
+        return json.dumps(self.handle_request(request)).encode() + b"\n"
+
+    def answer(self, line: bytes) -> bytes:
+        """Decode a request line and answer it, see respond"""
+        return self.respond(decode_request(line))
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of a connection, in order,
+        until the client closes it. Only the small requests are
+        answered on the event loop, see is_small: the others are
+        answered by the threads of the default executor, so that a
+        big listing does not delay the other connections
+
+        Parameters
+        ----------
+        reader: asyncio.StreamReader
+            the stream of the requests
+        writer: asyncio.StreamWriter
+            the stream of the responses
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The line is longer than REQUEST_LIMIT, the rest
+                    # of the connection cannot be split in requests
+                    writer.write(json.dumps(
+                        {"error": "invalid_request"}).encode() + b"\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                if len(line) > INLINE_REQUEST_SIZE:
+                    response = await loop.run_in_executor(None, self.answer,
+                                                          line)
+                else:
+                    request = decode_request(line)
+                    if self.is_small(request):
+                        response = self.respond(request)
+                    else:
+                        response = await loop.run_in_executor(
+                            None, self.respond, request)
+                writer.write(response)
+                # Only waits when the client is not reading the responses
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class ReloadingListingService(ListingService):
+    """A ListingService that builds again its tree when the json
+    filesystem is modified. The new tree is built in a worker thread
+    and replaces the served one with a single assignment, so each
+    request sees either the old or the new tree. The trees must be
+    fully built: a tree reading its nodes from the mapped json file
+    would read the rewritten file
+
+    Attributes
+    ----------
+    json_path : str
+        the path of the json filesystem
+    """
+
+    def __init__(self, json_path: str,
+                 load_tree: Callable[[str], FileSystemTree]):
+        """
+        Parameters
+        ----------
+        json_path: str
+            the path of the json filesystem
+        load_tree: Callable[[str], FileSystemTree]
+            the function used to build the tree from json_path
+        """
+        self.json_path = json_path
+        self.load_tree = load_tree
+        self._modified = self._modification_key()
+        super().__init__(load_tree(json_path))
+
+    def _modification_key(self) -> Optional[tuple]:
+        """Return the modification time and the size of the json
+        filesystem, None when it is missing"""
+        try:
+            stat = os.stat(self.json_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload_if_modified(self) -> bool:
+        """Build a new tree if the json filesystem changed
+        since the last load, and serve it.
+
+        Returns
+        ----------
+        result: bool
+            True if the tree was reloaded
+        """
+        modified = self._modification_key()
+        if modified == self._modified:
+            return False
+        self._modified = modified
+        tree = self.load_tree(self.json_path)
+        if tree.root is None:
+            return False
+        self.tree = tree
+        return True
+
+    async def watch(self, interval: float = RELOAD_INTERVAL) -> None:
+        """Check the json filesystem every interval seconds
+        and reload it when it changes
+
+        Parameters
+        ----------
+        interval: float
+            the seconds between two checks
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.reload_if_modified)
+
+
+async def start_server(service: Union[ListingService, FileSystemTree],
+                       socket_path: str) -> asyncio.AbstractServer:
+    """Start listening for listing requests on a unix socket.
+    A stale socket left by a dead server is replaced
+
+    Parameters
+    ----------
+    service: ListingService | FileSystemTree
+        the service answering the requests, or the tree to serve
+    socket_path: str
+        the path of the unix socket to listen on
+
+    Returns
+    ----------
+    server: asyncio.AbstractServer
+        the server started
+
+    Raises
+    ----------
+    OSError
+        if another server is listening on socket_path
+    """
+    if isinstance(service, FileSystemTree):
+        service = ListingService(service)
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            raise OSError(errno.EADDRINUSE, os.strerror(errno.EADDRINUSE))
+        os.unlink(socket_path)
+    return await asyncio.start_unix_server(service.handle_connection,
+                                           path=socket_path,
+                                           limit=REQUEST_LIMIT)
+
+
+async def serve(service: Union[ListingService, FileSystemTree],
+                socket_path: str) -> None:
+    """Answer the listing requests until the task is cancelled
+    or the process receives SIGINT or SIGTERM. The socket is
+    removed at the end
+
+    Parameters
+    ----------
+    service: ListingService | FileSystemTree
+        the service answering the requests, or the tree to serve
+    socket_path: str
+        the path of the unix socket to listen on
+    """
+    server = await start_server(service, socket_path)
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    signals = []
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        # Signal handlers can only be set in the main thread
+        with contextlib.suppress(ValueError, RuntimeError):
+            loop.add_signal_handler(signal_number, stopped.set)
+            signals.append(signal_number)
+    try:
+        async with server:
+            await stopped.wait()
+    finally:
+        for signal_number in signals:
+            loop.remove_signal_handler(signal_number)
+        with contextlib.suppress(OSError):
+            os.unlink(socket_path)
+
+
+def run_daemon(json_path: str, socket_path: str,
+               load_tree: Callable[[str], FileSystemTree]) -> None:
+    """Load json_path and serve it until the process is stopped,
+    reloading it when it changes.
+
+    Parameters
+    ----------
+    json_path: str
+        the path of the json filesystem
+    socket_path: str
+        the path of the unix socket to listen on
+    load_tree: Callable[[str], FileSystemTree]
+        the function used to build the tree from json_path
+
+    Raises
+    ----------
+    OSError
+        if another server is listening on socket_path
+    """
+    if is_running(socket_path):
+        raise OSError(errno.EADDRINUSE, os.strerror(errno.EADDRINUSE))
+    service = ReloadingListingService(json_path, load_tree)
+
+    async def main() -> None:
+        watcher = asyncio.create_task(service.watch())
+        try:
+            await serve(service, socket_path)
+        finally:
+            watcher.cancel()
+
+    print(f"pyls: serving {json_path} on {socket_path}", file=sys.stderr)
+    asyncio.run(main())
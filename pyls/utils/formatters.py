@@ -1,6 +1,8 @@
 """Module providing various formatter."""
 
+import time
 from math import ceil
+from typing import Iterable, Optional
 
 
 def humanize_size(size: float) -> str:
@@ -29,3 +31,78 @@ def humanize_size(size: float) -> str:
         return f"{size:.0f}{units[unit_index]}"
     else:
         return f"{size:.1f}{units[unit_index]}"
+
+
+def humanize_sizes(sizes: Iterable[float],
+                   texts: Optional[dict] = None) -> list[str]:
+    """Convert many sizes with humanize_size, each distinct size once.
+
+    Parameters
+    ----------
+    sizes : Iterable[float]
+        The sizes in bytes to be converted.
+    texts : dict | None
+        The sizes already converted, updated with the new ones,
+        so that it can be shared by many calls
+
+    Returns
+    ----------
+    humanized_sizes : list[str]
+        The human-readable size of each size, in order.
+    """
+    if texts is None:
+        texts = {}
+    humanized_sizes = []
+    for size in sizes:
+        text = texts.get(size)
+        if text is None:
+            text = texts[size] = humanize_size(size)
+        humanized_sizes.append(text)
+    return humanized_sizes
+
+
+class TimeFormatter:
+    """A class used to format the modification times of a listing.
+    The times of the same minute have the same text, so strftime is
+    called once per minute instead of once per time
+
+    Attributes
+    ----------
+    time_format : str
+        The strftime format, without seconds
+    """
+
+    def __init__(self, time_format: str = "%b %d %H:%M"):
+        """
+        Parameters
+        ----------
+        time_format : str
+            The strftime format, that must not show the seconds
+        """
+        self.time_format = time_format
+        # Number of minutes since the epoch -> text
+        self._minutes: dict[float, str] = {}
+
+    def __call__(self, timestamp: float) -> str:
+        """Format a unix epoch in local time.
+
+        Parameters
+        ----------
+        timestamp : float
+            The unix epoch to format
+
+        Returns
+        ----------
+        formatted_time : str
+            The formatted time
+        """
+        minute = timestamp // 60
+        formatted_time = self._minutes.get(minute)
+        if formatted_time is None:
+            local_time = time.localtime(timestamp)
+            formatted_time = time.strftime(self.time_format, local_time)
+            # The local minutes do not start with the utc ones in the
+            # timezones whose offset has seconds, their times are not kept
+            if local_time.tm_sec == (timestamp - minute * 60) // 1:
+                self._minutes[minute] = formatted_time
+        return formatted_time
@@ -1,8 +1,20 @@
 """Module providing various methods that do io operations"""
 
 import json
+import json.decoder
+import mmap
 import os
+import re
 import sys
+from typing import Callable, Iterator, NamedTuple, Optional, TextIO
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+_STRUCTURAL = frozenset("{}[]:,")
+# The characters that can follow the closing quote of a string
+_STRING_FOLLOWERS = frozenset(
+    (b"", b",", b":", b"}", b"]", b" ", b"\t", b"\n", b"\r"))
 
 
 def load_json_from_file(json_path: str) -> dict:
@@ -27,3 +39,496 @@ def load_json_from_file(json_path: str) -> dict:
         print(f"There is no {os.path.basename(json_path)} file",
               file=sys.stderr)
     return json_data
+
+
+class JsonTokenizer:
+    """A class used to split a json text file into tokens
+    without reading it all in memory.
+
+    Attributes
+    ----------
+    json_file : TextIO
+        the file the tokens are read from
+    chunk_size : int
+        the number of characters read from the file at each refill
+    """
+
+    def __init__(self, json_file: TextIO, chunk_size: int = 1 << 16):
+        """
+        Parameters
+        ----------
+        json_file: TextIO
+            the file the tokens are read from
+        chunk_size: int
+            the number of characters read from the file at each refill
+        """
+        self.json_file = json_file
+        self.chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Drop the consumed part of the buffer and append a new chunk.
+
+        Returns
+        ----------
+        result: bool
+            True if some data was read, False at the end of the file
+        """
+        if self._eof:
+            return False
+        chunk = self.json_file.read(self.chunk_size)
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        self._eof = not chunk
+        return not self._eof
+
+    def next_token(self) -> tuple:
+        """Read the next token of the file.
+
+        Returns
+        ----------
+        token: tuple[str | None, object]
+            a tuple (kind, value). kind is one of the structural
+            characters, "value" for strings, numbers and literals,
+            or None at the end of the file
+
+        Raises
+        ----------
+        ValueError
+            if the file contains an invalid token
+        """
+        while True:
+            buffer = self._buffer
+            position = _WHITESPACE.match(buffer, self._position).end()
+            self._position = position
+            if position == len(buffer):
+                if self._fill():
+                    continue
+                return None, None
+            char = buffer[position]
+            if char in _STRUCTURAL:
+                self._position = position + 1
+                return char, None
+            if char == '"':
+                try:
+                    value, end = json.decoder.scanstring(buffer, position + 1)
+                except json.JSONDecodeError as error:
+                    truncated = (error.msg.startswith("Unterminated")
+                                 or error.pos >= len(buffer) - 6)
+                    if truncated and self._fill():
+                        continue
+                    raise
+                self._position = end
+                return "value", value
+            match = _NUMBER.match(buffer, position)
+            if match:
+                # A number at the end of the buffer may be truncated
+                if len(buffer) - match.end() < 3 and self._fill():
+                    continue
+                self._position = match.end()
+                if match.group(1) or match.group(2):
+                    return "value", float(match.group())
+                return "value", int(match.group())
+            for literal, value in _LITERALS.items():
+                if buffer.startswith(literal, position):
+                    self._position = position + len(literal)
+                    return "value", value
+            if len(buffer) - position < 5 and self._fill():
+                continue
+            raise ValueError(
+                f"Invalid json token at {buffer[position:position + 20]!r}")
+
+
+def iter_json_events(json_file: TextIO,
+                     chunk_size: int = 1 << 16) -> Iterator[tuple]:
+    """Parse a json file incrementally, yielding one event for
+    each element found. Only the chunk currently parsed is kept in memory.
+
+    Parameters
+    ----------
+    json_file: TextIO
+        the file to parse
+    chunk_size: int
+        the number of characters read from the file at each refill
+
+    Yields
+    ----------
+    event: tuple[str, object]
+        a tuple (event, value) where event is one of start_map, map_key,
+        end_map, start_array, end_array and value.
+        value is None for all the events except map_key and value
+
+    Raises
+    ----------
+    ValueError
+        if the file is not a valid json document
+    """
+    tokenizer = JsonTokenizer(json_file, chunk_size)
+    containers: list[str] = []
+    expected = "value"
+    while True:
+        kind, value = tokenizer.next_token()
+        if kind is None:
+            if containers or expected != "end":
+                raise ValueError("Unexpected end of the json file")
+            return
+        if expected in ("value", "value_or_end"):
+            if kind == "{":
+                containers.append("{")
+                yield "start_map", None
+                expected = "key_or_end"
+                continue
+            if kind == "[":
+                containers.append("[")
+                yield "start_array", None
+                expected = "value_or_end"
+                continue
+            if kind == "value":
+                yield "value", value
+            elif kind == "]" and expected == "value_or_end":
+                containers.pop()
+                yield "end_array", None
+            else:
+                raise ValueError(f"Unexpected {kind!r} in the json file")
+        elif expected in ("key", "key_or_end"):
+            if kind == "value" and isinstance(value, str):
+                yield "map_key", value
+                expected = "colon"
+                continue
+            if kind == "}" and expected == "key_or_end":
+                containers.pop()
+                yield "end_map", None
+            else:
+                raise ValueError(f"Unexpected {kind!r} in the json file")
+        elif expected == "colon":
+            if kind != ":":
+                raise ValueError(f"Unexpected {kind!r} in the json file")
+            expected = "value"
+            continue
+        elif expected == "comma":
+            if kind == ",":
+                expected = "key" if containers[-1] == "{" else "value"
+                continue
+            if kind == "}" and containers[-1] == "{":
+                containers.pop()
+                yield "end_map", None
+            elif kind == "]" and containers[-1] == "[":
+                containers.pop()
+                yield "end_array", None
+            else:
+                raise ValueError(f"Unexpected {kind!r} in the json file")
+        else:
+            raise ValueError("Unexpected data after the json document")
+        expected = "comma" if containers else "end"
+
+
+class JsonSpan(NamedTuple):
+    """Byte range of a json array or object inside a MappedJson file
+
+    Attributes
+    ----------
+    start : int
+        the offset of the opening bracket
+    end : int
+        the offset following the closing bracket
+    """
+    start: int
+    end: int
+
+
+class MappedJson:
+    """A class used to read a json file on demand through mmap.
+    Objects and arrays are parsed one level at a time: nested
+    containers are skipped and returned as JsonSpan, so that
+    they can be parsed later only if needed.
+
+    Attributes
+    ----------
+    data : mmap.mmap
+        the memory mapped content of the file
+    """
+
+    _WHITESPACE = re.compile(rb"[ \t\n\r]*")
+    _STRING = re.compile(rb'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+    _NUMBER = re.compile(_NUMBER.pattern.encode())
+    # Everything up to the next bracket, with strings and objects
+    # without nested containers taken as a whole, so the loop of
+    # skip_container runs once per array or nested object
+    _OTHER = rb'[^"\[\]{}]*'
+    _QUOTED = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+    _SKIP = re.compile(
+        _OTHER + rb'(?:(?:' + _QUOTED + rb'|\{' + _OTHER + rb'(?:' + _QUOTED
+        + _OTHER + rb')*\})' + _OTHER + rb')*', re.DOTALL)
+
+    def __init__(self, json_path: str):
+        """
+        Parameters
+        ----------
+        json_path: str
+            the path of the json file
+
+        Raises
+        ----------
+        ValueError
+            if the file is empty
+        """
+        with open(json_path, "rb") as json_file:
+            self.data = mmap.mmap(json_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """Unmap the file"""
+        self.data.close()
+
+    def _skip_whitespace(self, offset: int) -> int:
+        """Return the offset of the first non whitespace
+        character starting from offset"""
+        return self._WHITESPACE.match(self.data, offset).end()
+
+    def _expect(self, offset: int, chars: bytes) -> tuple[bytes, int]:
+        """Skip the whitespaces and check that the next
+        character is one of chars.
+
+        Returns
+        ----------
+        result: tuple[bytes, int]
+            the character found and the offset following it
+        """
+        offset = self._skip_whitespace(offset)
+        char = self.data[offset:offset + 1]
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {offset}")
+        return char, offset + 1
+
+    def skip_container(self, offset: int) -> int:
+        """Find the end of the array or object starting at offset.
+
+        Parameters
+        ----------
+        offset: int
+            the offset of the opening bracket
+
+        Returns
+        ----------
+        end: int
+            the offset following the closing bracket
+        """
+        depth = 1
+        data = self.data
+        offset += 1
+        while True:
+            offset = self._SKIP.match(data, offset).end()
+            char = data[offset:offset + 1]
+            if char in (b"[", b"{"):
+                depth += 1
+            elif char in (b"]", b"}"):
+                depth -= 1
+                if depth == 0:
+                    return offset + 1
+            else:
+                raise ValueError("Unexpected end of the json file")
+            offset += 1
+
+    def read_value(self, offset: int) -> tuple[object, int]:
+        """Read the json value starting at offset. Arrays and objects
+        are not parsed and are returned as JsonSpan.
+
+        Parameters
+        ----------
+        offset: int
+            the offset of the value
+
+        Returns
+        ----------
+        result: tuple[object, int]
+            the value read and the offset following it
+        """
+        data = self.data
+        offset = self._skip_whitespace(offset)
+        char = data[offset:offset + 1]
+        if char in (b"[", b"{"):
+            end = self.skip_container(offset)
+            return JsonSpan(offset, end), end
+        if char == b'"':
+            match = self._STRING.match(data, offset)
+            if match is None:
+                raise ValueError(f"Unterminated string at offset {offset}")
+            raw = match.group(1)
+            if b"\\" in raw:
+                return json.loads(match.group()), match.end()
+            return raw.decode("UTF-8"), match.end()
+        match = self._NUMBER.match(data, offset)
+        if match:
+            if match.group(1) or match.group(2):
+                return float(match.group()), match.end()
+            return int(match.group()), match.end()
+        for literal, value in _LITERALS.items():
+            if data[offset:offset + len(literal)] == literal.encode():
+                return value, offset + len(literal)
+        raise ValueError(f"Invalid json value at offset {offset}")
+
+    def read_object(
+            self, offset: int,
+            read_member: Optional[Callable[[str, int], Optional[tuple]]]
+            = None) -> tuple[dict, int]:
+        """Read the members of the json object starting at offset.
+
+        Parameters
+        ----------
+        offset: int
+            the offset of the object
+        read_member: Callable[[str, int], tuple | None] | None
+            called with the key and the offset of each member that is
+            an array or an object. It returns the value of the member
+            and the offset following it, or None to skip it as usual
+
+        Returns
+        ----------
+        result: tuple[dict, int]
+            the members of the object, with the nested containers
+            as JsonSpan, and the offset following the object
+        """
+        members = {}
+        _, offset = self._expect(offset, b"{")
+        offset = self._skip_whitespace(offset)
+        if self.data[offset:offset + 1] == b"}":
+            return members, offset + 1
+        while True:
+            key, offset = self.read_value(offset)
+            if not isinstance(key, str):
+                raise ValueError(f"Invalid object key at offset {offset}")
+            _, offset = self._expect(offset, b":")
+            offset = self._skip_whitespace(offset)
+            member = None
+            if read_member is not None \
+                    and self.data[offset:offset + 1] in (b"[", b"{"):
+                member = read_member(key, offset)
+            members[key], offset = member or self.read_value(offset)
+            char, offset = self._expect(offset, b",}")
+            if char == b"}":
+                return members, offset
+
+    def iter_array(self, offset: int) -> Iterator[object]:
+        """Iterate over the items of the json array starting at offset.
+        The items that are objects are read with read_object.
+
+        Parameters
+        ----------
+        offset: int
+            the offset of the array
+
+        Yields
+        ----------
+        item: object
+            a dict for each object item, the value read
+            by read_value for any other item
+        """
+        _, offset = self._expect(offset, b"[")
+        offset = self._skip_whitespace(offset)
+        if self.data[offset:offset + 1] == b"]":
+            return
+        while True:
+            offset = self._skip_whitespace(offset)
+            if self.data[offset:offset + 1] == b"{":
+                item, offset = self.read_object(offset)
+            else:
+                item, offset = self.read_value(offset)
+            yield item
+            char, offset = self._expect(offset, b",]")
+            if char == b"]":
+                return
+
+    def object_start(self, offset: int) -> Optional[int]:
+        """Find the first object starting at or after offset.
+        In a valid json document a { followed by a quote and by a
+        character that cannot follow a string is never inside a string,
+        so the search needs no context and can start anywhere.
+
+        Parameters
+        ----------
+        offset: int
+            the offset where the search starts
+
+        Returns
+        ----------
+        start: int | None
+            the offset of the opening bracket, None if there is none
+        """
+        data = self.data
+        while True:
+            offset = data.find(b'{"', offset)
+            if offset < 0:
+                return None
+            if data[offset + 2:offset + 3] not in _STRING_FOLLOWERS:
+                return offset
+            offset += 1
+
+    def scan_range(self, start: int, end: int) -> "JsonRangeScan":
+        """Scan the brackets between start and end without parsing the
+        values. start must not be inside a string, like the offsets
+        returned by object_start, so that the ranges of a file can be
+        scanned independently and then joined, see JsonRangeScan.
+
+        Parameters
+        ----------
+        start: int
+            the offset where the scan starts
+        end: int
+            the offset where the scan ends
+
+        Returns
+        ----------
+        scan: JsonRangeScan
+            the brackets that are not matched inside the range
+
+        Raises
+        ----------
+        ValueError
+            if a string does not end inside the range
+        """
+        data = self.data
+        depth = lowest = 0
+        openings = []
+        closings = []
+        offset = start
+        while True:
+            offset = self._SKIP.match(data, offset, end).end()
+            if offset == end:
+                return JsonRangeScan(depth, openings, closings)
+            char = data[offset:offset + 1]
+            if char in (b"[", b"{"):
+                if depth == lowest:
+                    openings.append((offset, depth))
+                depth += 1
+            elif char in (b"]", b"}"):
+                depth -= 1
+                if depth < lowest:
+                    lowest = depth
+                    closings.append((offset, depth))
+            else:
+                raise ValueError(f"Unterminated string at offset {offset}")
+            offset += 1
+
+
+class JsonRangeScan(NamedTuple):
+    """The brackets of a range of a json file, as found by
+    MappedJson.scan_range. The depths are relative to the start of the
+    range: once the depth at the start is known, the one at the end is
+    too, so the depths of all the ranges follow from the first one
+
+    Attributes
+    ----------
+    depth : int
+        the depth at the end of the range
+    openings : list[tuple[int, int]]
+        the offset and the depth before it of each bracket opening
+        a container at the lowest depth reached so far
+    closings : list[tuple[int, int]]
+        the offset and the depth after it of each bracket
+        closing a container below the lowest depth reached so far
+    """
+    depth: int
+    openings: list
+    closings: list
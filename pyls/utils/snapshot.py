@@ -0,0 +1,244 @@
+"""Module providing the reader and the writer of the pyls binary snapshot.
+
+A snapshot is a compiled version of the json filesystem made of:
+
+- a header with the position of the other sections
+- one fixed width record for each node. The children of a directory
+  are stored in a contiguous range of records, sorted by name
+- a table with each distinct name and permissions string
+- the tables of the name index, see pyls.data.names.NameTables
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from collections import deque
+from typing import Optional
+
+from pyls.data.filesystem import FileSystemNodeType
+from pyls.data.names import TABLE_TYPES, NameIndexBuilder, NameTables
+
+MAGIC = b"PYLS"
+VERSION = 2
+
+# magic, version, reserved, node count, nodes offset,
+# string count, strings offset, name index offset
+HEADER = struct.Struct("<4sHH5Q")
+# The header of the version 1 snapshots, written without name index
+HEADER_V1 = struct.Struct("<4sHH4Q")
+# name id, permissions id, size, time modified, parent,
+# first child, child count, position in the json contents, is directory
+RECORD = struct.Struct("<IIqqIIIIB7x")
+OFFSET = struct.Struct("<Q")
+# The number of items of each table of the name index
+TABLES = struct.Struct(f"<{len(TABLE_TYPES)}Q")
+
+NO_PARENT = 0xFFFFFFFF
+
+
+def _aligned(offset: int) -> int:
+    """Round an offset up to a multiple of 8"""
+    return (offset + 7) & ~7
+
+
+def write_snapshot(output_path: str, root) -> None:
+    """Write the tree starting at root as a binary snapshot,
+    with its name index. The ids of the nodes in the name index
+    are the indexes of their records.
+
+    Parameters
+    ----------
+    output_path: str
+        the path of the snapshot to write
+    root: TreeNode
+        the root of the tree to compile
+    """
+    strings: dict[str, int] = {}
+    names = NameIndexBuilder()
+    node_count = 1
+    index = 0
+    # Each element is (node, parent index, position in the parent contents)
+    queue = deque([(root, NO_PARENT, 0)])
+    with open(output_path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0, 0, 0))
+        while queue:
+            node, parent, order = queue.popleft()
+            children = node.children or {}
+            first_child = node_count
+            for position, child in sorted(
+                    enumerate(children.values()),
+                    key=lambda item: item[1].name):
+                queue.append((child, index, position))
+            node_count += len(children)
+            name_id = strings.setdefault(node.name, len(strings))
+            names.add(name_id, parent)
+            output.write(RECORD.pack(
+                name_id,
+                strings.setdefault(node.permissions, len(strings)),
+                int(node.size), int(node.time_modified), parent,
+                first_child, len(children), order,
+                node.node_type == FileSystemNodeType.DIRECTORY))
+            index += 1
+        strings_offset = output.tell()
+        encoded = [string.encode("UTF-8") for string in strings]
+        offset = 0
+        for string in encoded:
+            output.write(OFFSET.pack(offset))
+            offset += len(string)
+        output.write(OFFSET.pack(offset))
+        for string in encoded:
+            output.write(string)
+        names_offset = _aligned(output.tell())
+        output.write(bytes(names_offset - output.tell()))
+        tables = names.build(list(strings).__getitem__)
+        output.write(TABLES.pack(*map(len, tables)))
+        for table in tables:
+            if sys.byteorder == "big":
+                table = array(table.typecode, table)
+                table.byteswap()
+            output.write(table.tobytes())
+            output.write(bytes(_aligned(output.tell()) - output.tell()))
+        output.seek(0)
+        output.write(HEADER.pack(MAGIC, VERSION, 0, node_count, HEADER.size,
+                                 len(strings), strings_offset, names_offset))
+
+
+class Snapshot:
+    """A class used to read a binary snapshot through mmap.
+    The records and the strings are decoded only when requested.
+
+    Attributes
+    ----------
+    data : mmap.mmap
+        the memory mapped content of the snapshot
+    node_count : int
+        the number of nodes in the snapshot
+    """
+
+    def __init__(self, snapshot_path: str):
+        """
+        Parameters
+        ----------
+        snapshot_path: str
+            the path of the snapshot
+
+        Raises
+        ----------
+        ValueError
+            if the file is not a valid snapshot
+        """
+        with open(snapshot_path, "rb") as snapshot_file:
+            self.data = mmap.mmap(snapshot_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError("The snapshot is truncated")
+        magic, version = struct.unpack_from("<4sH", self.data)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError("The file is not a pyls snapshot")
+        if version == 1:
+            (_, _, _, self.node_count, self._nodes_offset, string_count,
+             strings_offset) = HEADER_V1.unpack_from(self.data)
+            self._names_offset = 0
+        else:
+            (_, _, _, self.node_count, self._nodes_offset, string_count,
+             strings_offset, self._names_offset) = HEADER.unpack_from(
+                 self.data)
+        self._string_offsets = strings_offset
+        self._string_data = strings_offset + OFFSET.size * (string_count + 1)
+        self._strings: dict[int, str] = {}
+
+    def close(self) -> None:
+        """Unmap the snapshot"""
+        self.data.close()
+
+    def name_tables(self) -> Optional[NameTables]:
+        """Read the tables of the name index.
+
+        Returns
+        ----------
+        tables: NameTables | None
+            the tables, None if the snapshot has no name index
+        """
+        if not self._names_offset:
+            return None
+        offset = self._names_offset + TABLES.size
+        tables = []
+        for typecode, length in zip(
+                TABLE_TYPES, TABLES.unpack_from(self.data, self._names_offset)):
+            table = array(typecode)
+            end = offset + length * table.itemsize
+            table.frombytes(self.data[offset:end])
+            if sys.byteorder == "big":
+                table.byteswap()
+            tables.append(table)
+            offset = _aligned(end)
+        return NameTables(*tables)
+
+    def string(self, string_id: int) -> str:
+        """Return the string with the given id of the string table.
+
+        Parameters
+        ----------
+        string_id: int
+            the id of the string
+
+        Returns
+        ----------
+        string: str
+            the decoded string
+        """
+        string = self._strings.get(string_id)
+        if string is None:
+            start, end = struct.unpack_from(
+                "<QQ", self.data,
+                self._string_offsets + string_id * OFFSET.size)
+            string = self.data[self._string_data + start:
+                               self._string_data + end].decode("UTF-8")
+            self._strings[string_id] = string
+        return string
+
+    def record(self, index: int) -> tuple:
+        """Return the raw record of the node with the given index.
+
+        Parameters
+        ----------
+        index: int
+            the index of the node. The root has index 0
+
+        Returns
+        ----------
+        record: tuple
+            the fields of the record, in the RECORD order
+        """
+        return RECORD.unpack_from(
+            self.data, self._nodes_offset + index * RECORD.size)
+
+    def find_child(self, index: int, name: str) -> Optional[int]:
+        """Binary search a child by name in the children
+        of the node with the given index.
+
+        Parameters
+        ----------
+        index: int
+            the index of the parent node
+        name: str
+            the name of the child
+
+        Returns
+        ----------
+        child_index: int | None
+            the index of the child, None if there is no such child
+        """
+        record = self.record(index)
+        low, high = record[5], record[5] + record[6]
+        while low < high:
+            middle = (low + high) // 2
+            middle_name = self.string(self.record(middle)[0])
+            if middle_name < name:
+                low = middle + 1
+            elif middle_name > name:
+                high = middle
+            else:
+                return middle
+        return None
@@ -0,0 +1,213 @@
+"""Module providing the instrumentation of a pyls run: the wall time
+of each phase, the number of nodes loaded, resolved and listed, the
+peak memory traced by tracemalloc and the hit rates of the caches.
+Nothing is recorded unless a collection is active, see collect"""
+
+import contextlib
+import json
+import time
+from typing import Iterator, Optional
+
+# The phases of a run, in the order of the reports
+PHASES = ("import", "json_load", "tree_build", "daemon", "resolve", "sort",
+          "format")
+# The context manager returned by phase when no collection is active
+_NO_PHASE = contextlib.nullcontext()
+
+
+class RunStats:
+    """A class used to represent the statistics of a run. The time of
+    a phase excludes the phases nested in it, like the sort of the
+    listings formatted while they are produced, so the times add up to
+    the time of the run. The phases must be entered by a single thread
+
+    Attributes
+    ----------
+    phases : dict[str, float]
+        the seconds spent in each phase
+    counts : dict[str, int]
+        the counters, like the nodes loaded and the rows listed
+    caches : dict[str, dict]
+        the hits, the misses and the hit rate of each cache
+    peak_memory : int | None
+        the peak of the memory traced by tracemalloc in bytes,
+        None if the memory was not traced
+    wall_time : float
+        the seconds of the whole collection
+    """
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.caches: dict[str, dict] = {}
+        self.peak_memory: Optional[int] = None
+        self.wall_time = 0.0
+        # The seconds of the phases nested in each open phase
+        self._nested: list[float] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Context manager that adds its time to a phase.
+
+        Parameters
+        ----------
+        name: str
+            the name of the phase, one of PHASES for the
+            phases of pyls
+        """
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Add amount to a counter"""
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def add_cache(self, name: str, info) -> None:
+        """Record the statistics of a cache.
+
+        Parameters
+        ----------
+        name: str
+            the name of the cache
+        info: CacheInfo
+            the statistics of the cache, with hits and misses
+            like the ones of functools.lru_cache
+        """
+        lookups = info.hits + info.misses
+        self.caches[name] = {
+            "hits": info.hits, "misses": info.misses,
+            "hit_rate": info.hits / lookups if lookups else None}
+
+    def as_dict(self) -> dict:
+        """Return the statistics as a dictionary that can be dumped
+        as json. The phases are in the order of PHASES"""
+        return {
+            "wall_time": self.wall_time,
+            "phases": dict(sorted(
+                self.phases.items(),
+                key=lambda item: (PHASES.index(item[0])
+                                  if item[0] in PHASES else len(PHASES)))),
+            "counts": dict(self.counts),
+            "peak_memory": self.peak_memory,
+            "caches": dict(self.caches),
+        }
+
+    def to_json(self) -> str:
+        """Return the statistics as a json document, see as_dict"""
+        return json.dumps(self.as_dict(), indent=2)
+
+    def report(self) -> str:
+        """Return the statistics as the text printed by pyls --stats.
+
+        Returns
+        ----------
+        text: str
+            one line for each phase, counter and cache,
+            without the final newline
+        """
+        stats = self.as_dict()
+        wall_time = stats["wall_time"]
+        lines = [f"{'phase':<12} {'seconds':>10} {'share':>7}"]
+        for name, seconds in stats["phases"].items():
+            share = seconds / wall_time if wall_time else 0.0
+            lines.append(f"{name:<12} {seconds:10.6f} {share:7.1%}")
+        other = wall_time - sum(stats["phases"].values())
+        lines.append(f"{'other':<12} {other:10.6f} "
+                     f"{other / wall_time if wall_time else 0.0:7.1%}")
+        lines.append(f"{'total':<12} {wall_time:10.6f}")
+        for name, value in stats["counts"].items():
+            lines.append(f"{name:<12} {value:>10}")
+        if self.peak_memory is not None:
+            lines.append(f"{'peak memory':<12} "
+                         f"{self.peak_memory / 1e6:9.1f}M")
+        for name, cache in stats["caches"].items():
+            hit_rate = "-" if cache["hit_rate"] is None \
+                else f"{cache['hit_rate']:.1%}"
+            lines.append(f"{name:<12} hits {cache['hits']} misses "
+                         f"{cache['misses']} hit rate {hit_rate}")
+        return "\n".join(lines)
+
+
+# The collections recording the phases and the counters, the active
+# one last. Empty when nothing is recorded
+_active: list[RunStats] = []
+
+
+def phase(name: str) -> contextlib.AbstractContextManager:
+    """Return a context manager that adds its time to a phase of the
+    active collection. When no collection is active it does nothing,
+    so the instrumented code pays only this call.
+
+    Parameters
+    ----------
+    name: str
+        the name of the phase
+
+    Returns
+    ----------
+    context: AbstractContextManager
+        the context manager
+    """
+    if not _active:
+        return _NO_PHASE
+    return _active[-1].phase(name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add amount to a counter of the active collection, if any"""
+    if _active:
+        _active[-1].count(name, amount)
+
+
+def add_cache(name: str, info) -> None:
+    """Record the statistics of a cache in the active collection,
+    if any. See RunStats.add_cache"""
+    if _active:
+        _active[-1].add_cache(name, info)
+
+
+@contextlib.contextmanager
+def collect(trace_memory: bool = True) -> Iterator[RunStats]:
+    """Context manager that records the phases and the counters of the
+    code it runs, like pyls --stats does.
+
+    Parameters
+    ----------
+    trace_memory: bool
+        whether the peak memory is traced with tracemalloc. Tracing
+        slows down the allocations, and so all the phases
+
+    Yields
+    ----------
+    run_stats: RunStats
+        the statistics, complete when the context exits
+    """
+    run_stats = RunStats()
+    _active.append(run_stats)
+    started = False
+    if trace_memory:
+        import tracemalloc
+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield run_stats
+    finally:
+        run_stats.wall_time = time.perf_counter() - start
+        if trace_memory:
+            run_stats.peak_memory = tracemalloc.get_traced_memory()[1]
+            if started:
+                tracemalloc.stop()
+        _active.remove(run_stats)
@@ -0,0 +1,56 @@
+"""Test suite for the pyls.data.cache module"""
+
+from pyls.data.cache import CacheInfo, PathCache, normalize_path
+
+
+def test_normalize_path():
+    """Test the removal of the empty and . components"""
+    assert normalize_path("parser/parser.go") == "parser/parser.go"
+    assert normalize_path("./parser//./parser.go/") == "parser/parser.go"
+    assert normalize_path("parser/.") == "parser"
+    assert normalize_path(".gitignore") == ".gitignore"
+    assert normalize_path("../parser/..") == "../parser/.."
+    assert normalize_path(".") == ""
+    assert normalize_path("") == ""
+
+
+def test_path_cache_counters():
+    """Test the hits and the misses counted by get"""
+    cache = PathCache(2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.peek("b") is None
+    assert cache.cache_info() == CacheInfo(hits=1, misses=1, maxsize=2,
+                                           currsize=1)
+
+
+def test_path_cache_lru():
+    """Test that the least recently used path is dropped"""
+    cache = PathCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.peek("b") is None
+    assert cache.peek("a") == 1
+    assert len(cache) == 2
+
+
+def test_path_cache_disabled():
+    """Test a cache with size 0"""
+    cache = PathCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_path_cache_bind():
+    """Test that the paths are dropped when the root changes"""
+    cache = PathCache()
+    root = object()
+    cache.bind(root)
+    cache.put("a", 1)
+    cache.bind(root)
+    assert cache.peek("a") == 1
+    cache.bind(object())
+    assert cache.peek("a") is None
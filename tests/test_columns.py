@@ -0,0 +1,98 @@
+"""Test suite for the pyls.data.columns module"""
+
+import operator
+
+import pytest
+
+import pyls.data.columns
+from pyls.data.columns import COLUMNS_MIN_CHILDREN, ChildColumns, load_numpy
+from pyls.data.filesystem import FileSystemNodeType
+from pyls.data.tree import TreeNode
+
+requires_numpy = pytest.mark.skipif(load_numpy() is None,
+                                    reason="numpy is not installed")
+
+
+def make_children(count=COLUMNS_MIN_CHILDREN):
+    """Build count children with repeated sizes and times"""
+    return [TreeNode(name=f"{'.' if number % 9 == 0 else ''}node{number}",
+                     size=number % 13, time_modified=number % 5,
+                     permissions="drwxr-xr-x" if number % 4 == 0
+                     else "-rw-r--r--",
+                     node_type=FileSystemNodeType.DIRECTORY
+                     if number % 4 == 0 else FileSystemNodeType.FILE)
+            for number in range(count)]
+
+
+@requires_numpy
+def test_child_columns_values():
+    """Test the columns of the children"""
+    children = make_children()
+    columns = ChildColumns.build(children)
+    assert columns.sizes.tolist() == [child.size for child in children]
+    assert columns.types[:2].tolist() == [2, 1]
+    assert columns.permissions == ["drwxr-xr-x", "-rw-r--r--"]
+    assert columns.permission_codes[:2].tolist() == [0, 1]
+    assert columns.hidden.sum() == len(range(0, len(children), 9))
+    assert columns.max_sizes() == {FileSystemNodeType.FILE: 12,
+                                   FileSystemNodeType.DIRECTORY: 12}
+
+
+@requires_numpy
+def test_child_columns_order():
+    """Test that the orders are the ones of a stable sort,
+    also in reverse with many equal values"""
+    children = make_children()
+    columns = ChildColumns.build(children)
+    for sort_by in ("name", "size", "time_modified", "total_size"):
+        for reverse in (False, True):
+            expected = sorted(children, key=operator.attrgetter(sort_by),
+                              reverse=reverse)
+            positions = columns.order(sort_by, reverse)
+            assert [children[position] for position in positions] \
+                == expected
+            assert columns.order(sort_by, reverse) is positions
+
+
+@requires_numpy
+def test_child_columns_select():
+    """Test the selection of a page of the children kept by a mask"""
+    children = make_children()
+    columns = ChildColumns.build(children)
+    mask = columns.mask(FileSystemNodeType.FILE, False, min_size=10,
+                        newer_than=2)
+    expected = [child for child in sorted(children,
+                                          key=lambda child: child.size)
+                if child.node_type == FileSystemNodeType.FILE
+                and not child.name.startswith(".")
+                and child.size >= 10 and child.time_modified > 2]
+    assert columns.select("size", False, mask) == expected
+    assert columns.select("size", False, mask, 3, 5) == expected[3:5]
+    assert columns.select("size", False, mask, 3, 4) == expected[3:4]
+    assert not columns.select("size", False, mask, len(children))
+
+
+@requires_numpy
+def test_child_columns_not_built():
+    """Test that the columns are not built for few children
+    or for sizes that are not 64 bit integers"""
+    assert ChildColumns.build(make_children(10)) is None
+    children = make_children()
+    children[3].size = 1.5
+    assert ChildColumns.build(children) is None
+    children[3].size = 1 << 70
+    assert ChildColumns.build(children) is None
+
+
+def test_child_columns_without_numpy(mocker):
+    """Test that the listings visit the nodes without numpy"""
+    mocker.patch("pyls.data.columns.load_numpy", return_value=None)
+    assert ChildColumns.build(make_children()) is None
+
+
+def test_child_columns_small_directory(mocker):
+    """Test that numpy is not imported for the small directories"""
+    load = mocker.spy(pyls.data.columns, "load_numpy")
+    assert ChildColumns.build(make_children(COLUMNS_MIN_CHILDREN - 1)) \
+        is None
+    assert load.call_count == 0
@@ -0,0 +1,30 @@
+"""Test suite for the pyls.data.filesystem module"""
+
+import stat
+
+import pytest
+
+from pyls.data.filesystem import Permissions
+
+
+@pytest.mark.parametrize("permissions", [
+    "-rw-r--r--", "drwxr-xr-x", "lrwxrwxrwx", "-rwsr-sr-t", "-rwSr-xr-T"])
+def test_permissions_mode(permissions):
+    """Test that the mode of the permissions is the inverse
+    of stat.filemode"""
+    assert stat.filemode(Permissions.intern(permissions).mode) == permissions
+
+
+def test_permissions_intern():
+    """Test that equal permissions share the same instance
+    and compare equal to the plain string"""
+    permissions = Permissions.intern("".join(["-rw-", "r--r--"]))
+    assert permissions is Permissions.intern("-rw-r--r--")
+    assert permissions == "-rw-r--r--"
+    assert f"{permissions}" == "-rw-r--r--"
+
+
+def test_permissions_invalid_characters():
+    """Test that the unknown characters do not set any bit"""
+    assert Permissions.intern("?rwz------").mode == (
+        stat.S_IRUSR | stat.S_IWUSR)
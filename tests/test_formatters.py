@@ -1,6 +1,8 @@
 """Test suite for the pyls.utils.formatters module"""
 
-from pyls.utils.formatters import humanize_size
+from datetime import datetime, timedelta, timezone
+
+from pyls.utils.formatters import TimeFormatter, humanize_size, humanize_sizes
 
 
 def test_humanize_size_zero():
@@ -36,3 +38,42 @@ def test_humanize_size_gigabyte():
 def test_humanize_size_verybig():
     """Test the humanization of a very big size over the last allowed unit"""
     assert humanize_size(1378322800000000000000000) == "1195505E"
+
+
+def test_humanize_sizes():
+    """Test the humanization of many sizes, each distinct one once"""
+    texts = {2040: "cached"}
+    assert humanize_sizes([533, 1622, 533, 2040], texts) == \
+        ["533", "1.6K", "533", "cached"]
+    assert texts == {533: "533", 1622: "1.6K", 2040: "cached"}
+    assert humanize_sizes([]) == []
+
+
+def test_time_formatter(mocker):
+    """Test that the times are formatted once per minute"""
+    localtime = mocker.patch(
+        "time.localtime", side_effect=lambda timestamp: datetime.fromtimestamp(
+            timestamp, tz=timezone.utc).timetuple())
+    format_time = TimeFormatter()
+    assert format_time(1699954787) == "Nov 14 09:39"
+    assert format_time(1699954799) == "Nov 14 09:39"
+    assert format_time(1699954780.5) == "Nov 14 09:39"
+    assert format_time(1699954800) == "Nov 14 09:40"
+    assert format_time(1699954740) == "Nov 14 09:39"
+    assert localtime.call_count == 2
+    assert TimeFormatter()(1699954787.5) == "Nov 14 09:39"
+    assert localtime.call_count == 3
+
+
+def test_time_formatter_offset_seconds(mocker):
+    """Test the minutes of a timezone whose offset has seconds"""
+    zone = timezone(timedelta(seconds=30))
+    localtime = mocker.patch(
+        "time.localtime", side_effect=lambda timestamp: datetime.fromtimestamp(
+            timestamp, tz=zone).timetuple())
+    format_time = TimeFormatter()
+    assert format_time(1699954770) == "Nov 14 09:40"
+    assert format_time(1699954769) == "Nov 14 09:39"
+    assert format_time(1699954740) == "Nov 14 09:39"
+    assert format_time(1699954779) == "Nov 14 09:40"
+    assert localtime.call_count == 4
@@ -0,0 +1,86 @@
+"""Test suite for the pyls.data.index module"""
+
+from pyls.data.filesystem import FileSystemNodeType
+from pyls.data.index import DirectoryIndex
+from pyls.data.tree import TreeNode
+
+
+def make_node(name, size, node_type=FileSystemNodeType.FILE):
+    """Build a node with the given size"""
+    return TreeNode(name=name, size=size, time_modified=0,
+                    permissions="-rw-r--r--", node_type=node_type)
+
+
+def test_directory_index_max_size():
+    """Test the largest size of each node type"""
+    index = DirectoryIndex([
+        make_node("a", 10), make_node("b", 533),
+        make_node("c", 4096, FileSystemNodeType.DIRECTORY)])
+    assert index.max_size == {FileSystemNodeType.FILE: 533,
+                              FileSystemNodeType.DIRECTORY: 4096}
+    assert index.size_width(None, False) == 4
+    assert index.size_width(FileSystemNodeType.FILE, False) == 3
+
+
+def test_directory_index_empty_type():
+    """Test the width of a node type without children"""
+    index = DirectoryIndex([make_node("a", 10)])
+    assert index.size_width(FileSystemNodeType.DIRECTORY, False) == 1
+    assert index.size_width(FileSystemNodeType.DIRECTORY, True) == 0
+
+
+def test_directory_index_humanized_width():
+    """Test that the humanized width is the longest humanized
+    size, that is not always the one of the largest size"""
+    index = DirectoryIndex([make_node("a", 1622), make_node("b", 20400)])
+    assert index.size_width(None, True) == len("1.6K")
+
+
+def test_directory_index_sorted_by_cached():
+    """Test that each order is sorted only once"""
+    index = DirectoryIndex([make_node("b", 1), make_node("a", 2)])
+    ordered = index.sorted_by("name")
+    assert [child.name for child in ordered] == ["a", "b"]
+    assert index.sorted_by("name") is ordered
+    assert index.sorted_by("name", reverse=True) is not ordered
+
+
+def test_directory_index_walk_matches_sort():
+    """Test that the walks give the order of a stable sort,
+    also in reverse with many equal values"""
+    children = [make_node(f"node{number}", number % 4)
+                for number in range(50)]
+    for child in children:
+        child.time_modified = len(child.name) % 3
+    index = DirectoryIndex(children)
+    for sort_by in ("name", "size", "time_modified"):
+        for reverse in (False, True):
+            expected = sorted(children, key=lambda child: getattr(
+                child, sort_by), reverse=reverse)
+            assert list(index.walk(sort_by, reverse)) == expected
+
+
+def test_directory_index_select_heap():
+    """Test that the selection without a cached order
+    gives the first children of the sorted order"""
+    children = [make_node(f"node{number}", number % 7)
+                for number in range(100)]
+    index = DirectoryIndex(children)
+    for reverse in (False, True):
+        expected = sorted(children, key=lambda child: child.size,
+                          reverse=reverse)
+        assert index.select("size", reverse, 10,
+                            lambda child: True) == expected[:10]
+    assert not index._orders
+
+
+def test_directory_index_select_cached():
+    """Test the selection of the children that satisfy keep
+    from a cached order"""
+    children = [make_node(f"node{number}", number)
+                for number in range(10)]
+    index = DirectoryIndex(children)
+    index.sorted_by("size", reverse=True)
+    selected = index.select("size", True, 2,
+                            lambda child: child.size % 2 == 0)
+    assert [child.size for child in selected] == [8, 6]
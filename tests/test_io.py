@@ -1,6 +1,11 @@
 """Test suite for the pyls.utils.io module"""
 
-from pyls.utils.io import load_json_from_file
+import io
+
+import pytest
+
+from pyls.utils.io import (JsonSpan, MappedJson, iter_json_events,
+                          load_json_from_file)
 from tests.utils import mock_object
 
 
@@ -44,3 +49,83 @@ def test_load_not_existing_file(capfd, mocker):
     _, err = capfd.readouterr()
     assert err == "There is no test file\n"
     assert actual_ret == {}
+
+
+def test_iter_json_events():
+    "Test iter_json_events with tokens split across chunks"
+    json_file = io.StringIO(
+        '{"name": "root", "size": -4.5e1, "flag": true, "none": null,'
+        ' "contents": [{"name": "a\\u00e8\\"b"}, [], 10]}')
+    events = list(iter_json_events(json_file, chunk_size=3))
+    assert events == [
+        ("start_map", None), ("map_key", "name"), ("value", "root"),
+        ("map_key", "size"), ("value", -45.0),
+        ("map_key", "flag"), ("value", True),
+        ("map_key", "none"), ("value", None),
+        ("map_key", "contents"), ("start_array", None),
+        ("start_map", None), ("map_key", "name"), ("value", 'aè"b'),
+        ("end_map", None), ("start_array", None), ("end_array", None),
+        ("value", 10), ("end_array", None), ("end_map", None)]
+
+
+@pytest.mark.parametrize("document", [
+    '{"name": "root"', '{"name" "root"}', '{"name": "root",}',
+    '[1 2]', '{} {}', '{"name": nope}'])
+def test_iter_json_events_invalid(document):
+    "Test iter_json_events with invalid json documents"
+    with pytest.raises(ValueError):
+        list(iter_json_events(io.StringIO(document), chunk_size=4))
+
+
+def test_mapped_json(tmp_path):
+    "Test MappedJson reading one level at a time"
+    json_path = tmp_path / "test.json"
+    json_path.write_bytes(
+        b'{"name": "r\\u00e8", "size": 1.5, "x": [1, {"a": "]"}],'
+        b' "contents": [{"name": "\xc3\xa8"}, 2, []]}')
+    reader = MappedJson(str(json_path))
+    members, end = reader.read_object(0)
+    assert end == len(json_path.read_bytes())
+    assert members["name"] == "rè"
+    assert members["size"] == 1.5
+    assert isinstance(members["x"], JsonSpan)
+    items = list(reader.iter_array(members["contents"].start))
+    assert items == [{"name": "è"}, 2, JsonSpan(members["contents"].end - 3,
+                                                 members["contents"].end - 1)]
+    reader.close()
+
+
+def test_mapped_json_read_member(tmp_path):
+    "Test MappedJson reading some members with read_member"
+    json_path = tmp_path / "test.json"
+    json_path.write_bytes(b'{"a": [1], "b": {"c": 2}, "d": 3}')
+    reader = MappedJson(str(json_path))
+    members, _ = reader.read_object(
+        0, lambda key, offset: (offset, offset + 3) if key == "a" else None)
+    assert members == {"a": 6, "b": JsonSpan(16, 24), "d": 3}
+    reader.close()
+
+
+def test_mapped_json_scan_range(tmp_path):
+    "Test MappedJson scanning ranges that are joined by their depths"
+    document = (b'{"contents": [{"name": "a{\\"", "contents": [{"x": [1]}]},'
+                b' {"name": "b", "contents": []}, 3], "x": {"}": "]"}}')
+    json_path = tmp_path / "test.json"
+    json_path.write_bytes(document)
+    reader = MappedJson(str(json_path))
+    middle = reader.object_start(20)
+    assert document[middle:].startswith(b'{"x"')
+    assert reader.object_start(len(document) - 10) is None
+    first = reader.scan_range(0, middle)
+    second = reader.scan_range(middle, len(document))
+    assert first.depth == 4
+    assert [depth for _, depth in first.openings] == [0]
+    assert [first.depth + depth for _, depth in second.closings] == [
+        3, 2, 1, 0]
+    assert [document[offset:offset + 1] for offset, _ in second.closings] \
+        == [b"]", b"}", b"]", b"}"]
+    # The flat objects are skipped as a whole
+    assert [first.depth + depth for _, depth in second.openings] == [4, 2]
+    with pytest.raises(ValueError):
+        reader.scan_range(0, 25)
+    reader.close()
@@ -0,0 +1,116 @@
+"""Test suite for the pyls.data.listing module"""
+
+import io
+
+from pyls.data.filesystem import FileSystemNodeType
+from pyls.data.listing import (ListingOptions, ListingResult, format_row,
+                               not_found_message, render, render_listings,
+                               write_listing, write_listings)
+from pyls.data.tree import TreeNode
+
+
+def make_rows():
+    """Build two rows to render"""
+    return [TreeNode(name="a.txt", size=5, time_modified=0,
+                     permissions="-rw-r--r--",
+                     node_type=FileSystemNodeType.FILE),
+            TreeNode(name="b", size=4096, time_modified=0,
+                     permissions="drwxr-xr-x",
+                     node_type=FileSystemNodeType.DIRECTORY)]
+
+
+def test_format_row_short():
+    """Test that the short format is the name"""
+    row = make_rows()[0]
+    assert format_row(row, ListingOptions(), 0) == "a.txt"
+
+
+def test_format_row_long(mocker):
+    """Test the long listing format of a row"""
+    mocker.patch("time.strftime", return_value="Jan 01 00:00")
+    row = make_rows()[0]
+    assert format_row(row, ListingOptions(long_listing=True), 4) == \
+        "-rw-r--r--    5 Jan 01 00:00 a.txt"
+    row.size = 1622
+    assert format_row(row, ListingOptions(long_listing=True,
+                                          humanize=True), 5) == \
+        "-rw-r--r--  1.6K Jan 01 00:00 a.txt"
+
+
+def test_render():
+    """Test that the short format joins the rows on a line"""
+    result = ListingResult(path=None, node=None, options=ListingOptions(),
+                           rows=make_rows())
+    assert render(result) == "a.txt b"
+    assert len(result) == 2
+    assert not result.found
+
+
+def test_render_empty():
+    """Test the rendering of an empty listing"""
+    result = ListingResult(path=None, node=None,
+                           options=ListingOptions(long_listing=True))
+    assert render(result) == ""
+
+
+def test_not_found_message():
+    """Test the message of a path that does not exist"""
+    assert not_found_message("x") == \
+        "error: cannot access 'x': No such file or directory"
+
+
+def test_write_listing_binary(mocker):
+    """Test that the batches written are the rendered text"""
+    mocker.patch("pyls.data.listing.WRITE_BATCH", 2)
+    rows = make_rows() * 3
+    for options in (ListingOptions(), ListingOptions(long_listing=True)):
+        result = ListingResult(path=None, node=None, options=options,
+                               rows=rows)
+        stream = io.BytesIO()
+        write_listing(result, stream)
+        assert stream.getvalue().decode() == render(result) + "\n"
+
+
+def test_write_listing_text():
+    """Test writing to a text stream without binary buffer"""
+    result = ListingResult(path=None, node=None, options=ListingOptions(),
+                           rows=make_rows())
+    stream = io.StringIO()
+    write_listing(result, stream)
+    assert stream.getvalue() == "a.txt b\n"
+
+
+def test_write_listing_empty():
+    """Test that an empty listing writes an empty line"""
+    result = ListingResult(path=None, node=None, options=ListingOptions())
+    stream = io.BytesIO()
+    write_listing(result, stream)
+    assert stream.getvalue() == b"\n"
+
+
+def test_write_listings():
+    """Test that each listing is preceded by its path
+    and separated by an empty line"""
+    results = [
+        ListingResult(path=path, node=None, options=ListingOptions(),
+                      rows=rows)
+        for path, rows in ((".", make_rows()), ("./b", []))]
+    stream = io.StringIO()
+    write_listings(results, stream)
+    assert stream.getvalue() == ".:\na.txt b\n\n./b:\n\n"
+    assert render_listings(results) + "\n" == stream.getvalue()
+
+
+def test_write_listings_names():
+    """Test that a listing without path is written without header
+    and with the names of the result"""
+    rows = make_rows()
+    results = [
+        ListingResult(path=None, node=None, options=ListingOptions(),
+                      rows=rows[:1], names=["dir/a.txt"]),
+        ListingResult(path="b", node=rows[1], options=ListingOptions(),
+                      rows=rows)]
+    stream = io.StringIO()
+    write_listings(results, stream)
+    assert stream.getvalue() == "dir/a.txt\n\nb:\na.txt b\n"
+    assert render_listings(results) + "\n" == stream.getvalue()
@@ -0,0 +1,114 @@
+"""Test suite for the pyls.__main__ module"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+import tests.utils as ut
+
+from pyls.__main__ import (build_parser, list_paths, parse_arguments,
+                           parse_common_arguments)
+
+# Cumulative import time of pyls.__main__, in microseconds, measured
+# with python -X importtime. It is about 50ms, the budget leaves room
+# for slow machines but fails if the listing modules are imported again
+IMPORT_BUDGET = 150_000
+# Modules that the command must import only when they are used
+DEFERRED_MODULES = ("argparse", "asyncio", "dataclasses",
+                    "multiprocessing", "numpy", "pyls.data.tree",
+                    "pyls.server")
+
+
+def import_times() -> dict[str, int]:
+    """Import pyls.__main__ in a new interpreter and return the
+    cumulative import time of each module, in microseconds"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pyls.__main__"],
+        capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def test_import_deferred_modules():
+    """Test that the slow modules are not imported at startup"""
+    imported = import_times()
+    assert "pyls.__main__" in imported
+    assert not set(DEFERRED_MODULES) & set(imported)
+
+
+def test_import_time_budget():
+    """Test that the startup imports fit the budget. The best of three
+    runs is taken, a single run can be slowed down by the machine"""
+    assert min(import_times()["pyls.__main__"]
+               for _ in range(3)) < IMPORT_BUDGET
+
+
+@pytest.mark.parametrize("argv", [
+    [], ["-l"], ["-lrt"], ["-A", "-l", "-h"], ["-S", "--filter", "dir"],
+    ["--filter=file", "-l"], ["--total-size", "-lS"], ["parser"],
+    ["parser", "ast", "-l"], ["-l", "parser", "ast"], ["-ll", ""],
+    ["-R", "-A", "parser", "lexer"]])
+def test_parse_common_arguments(argv):
+    """Test that the common command lines are parsed like argparse does"""
+    assert vars(parse_common_arguments(argv)) == \
+        vars(build_parser().parse_args(argv))
+
+
+@pytest.mark.parametrize("argv", [
+    ["parser", "-l", "ast"], ["--filter", "bad"], ["--filter"],
+    ["-"], ["-x"], ["-lx"], ["--"], ["--limit", "2"], ["--tot"],
+    ["--find", "*.py"], ["--serve"], ["--help"], ["--stats", "-l"],
+    ["--profile", "run.prof"]])
+def test_parse_common_arguments_fallback(argv):
+    """Test that the other command lines are left to argparse"""
+    assert parse_common_arguments(argv) is None
+
+
+def test_parse_arguments(capsys):
+    """Test the command lines parsed by argparse"""
+    args = parse_arguments(["--limit", "2", "--min-size", "1K", "-l"])
+    assert (args.limit, args.min_size, args.l) == (2, 1024, True)
+    with pytest.raises(SystemExit):
+        parse_arguments(["parser", "-l", "ast"])
+    assert "unrecognized arguments: ast" in capsys.readouterr().err
+
+
+def test_list_paths_invalid_lazy_directory(capsys, tmp_path):
+    """Test that an invalid directory found in the lazy tree is reported
+    like an invalid json filesystem"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(
+        '{"name": "root", "size": 4096, "time_modified": 1, '
+        '"permissions": "drwxr-xr-x", "contents": [{"name": "dir", '
+        '"size": 4096, "time_modified": 1, "permissions": "drwxr-xr-x", '
+        '"contents": [{"name" "x"}]}]}', encoding="UTF-8")
+    list_paths(str(json_path), str(tmp_path / "pyls.sock"),
+               parse_arguments(["dir"]))
+    assert capsys.readouterr() == (
+        "", "The provided json filesystem is invalid\n")
+
+
+def test_list_paths_import_phase(tmp_path):
+    """Test that the deferred imports of a cold start are booked in the
+    import phase of --stats"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    process = subprocess.run(
+        [sys.executable, "-c",
+         "import sys\n"
+         "from pyls.__main__ import list_paths, parse_arguments\n"
+         "from pyls.utils import stats\n"
+         "with stats.collect(trace_memory=False) as run_stats:\n"
+         "    list_paths(sys.argv[1], sys.argv[2], parse_arguments([]))\n"
+         "print(run_stats.to_json())\n",
+         str(json_path), str(tmp_path / "pyls.sock")],
+        capture_output=True, text=True, check=True)
+    run_stats = json.loads(process.stdout[process.stdout.index("{"):])
+    # Loading pyls.data.tree takes milliseconds, its lookup microseconds
+    assert run_stats["phases"]["import"] > 0.001
@@ -0,0 +1,79 @@
+"""Test suite for the pyls.data.names module"""
+
+import tests.utils as ut
+from pyls.data.names import (NO_PARENT, NameIndex, NameIndexBuilder,
+                             gram_key, grams, pattern_literals)
+from pyls.data.tree import FileSystemTree
+
+
+def make_index():
+    """Build the name index of the tests.ut.mock_filesystem tree"""
+    return NameIndex.from_tree(
+        FileSystemTree.build_tree_from_dict(ut.mock_filesystem))
+
+
+def find_paths(index, pattern):
+    """Return the sorted paths found by the index"""
+    return sorted(map(index.path, index.find(pattern)))
+
+
+def test_grams():
+    """Test the n-grams of a text"""
+    assert grams("go.mod") == {gram_key(gram)
+                               for gram in ("go.", "o.m", ".mo", "mod")}
+    assert grams("go") == set()
+    assert gram_key("abc") != gram_key("acb")
+
+
+def test_pattern_literals():
+    """Test the literal parts of a pattern"""
+    assert pattern_literals("*_test.go") == ["_test.go"]
+    assert pattern_literals("lex?r[._]go") == ["lex", "r", "go"]
+    assert pattern_literals("a[]b]c") == ["a", "c"]
+    assert pattern_literals("a[bc") == ["a[bc"]
+    assert pattern_literals("*") == []
+
+
+def test_builder_tables():
+    """Test the tables built from the nodes added"""
+    builder = NameIndexBuilder()
+    names = ["root", "b", "a", "b"]
+    root = builder.add(0, NO_PARENT)
+    builder.add(1, root)
+    directory = builder.add(2, root)
+    builder.add(1, directory)
+    tables = builder.build(names.__getitem__)
+    assert list(tables.name_order) == [2, 1, 0]
+    assert list(tables.name_offsets) == [0, 1, 3, 4]
+    assert list(tables.name_nodes) == [2, 1, 3, 0]
+    assert list(tables.parents) == [NO_PARENT, 0, 0, 2]
+
+
+def test_find_name():
+    """Test the lookup of a name without wildcards"""
+    index = make_index()
+    assert find_paths(index, "go.mod") == [
+        "ast/go.mod", "go.mod", "lexer/go.mod", "parser/go.mod",
+        "token/go.mod"]
+    assert find_paths(index, "parser") == ["parser"]
+    assert find_paths(index, "interpreter") == ["."]
+    assert find_paths(index, "missing") == []
+
+
+def test_find_pattern():
+    """Test the patterns, that match the hidden names too like find"""
+    index = make_index()
+    assert find_paths(index, "*_test.go") == [
+        "lexer/lexer_test.go", "parser/parser_test.go"]
+    assert find_paths(index, "*ken*") == ["token", "token/token.go"]
+    assert find_paths(index, ".git*") == [".gitignore"]
+    assert find_paths(index, "*.m?") == ["README.md"]
+    assert len(find_paths(index, "*")) == 20
+    assert find_paths(index, "*zzz*") == []
+
+
+def test_paths():
+    """Test that the paths of many nodes are the ones of path"""
+    index = make_index()
+    node_ids = list(index.find("*"))
+    assert list(index.paths(node_ids)) == list(map(index.path, node_ids))
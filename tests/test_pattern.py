@@ -0,0 +1,98 @@
+"""Test suite for the pyls.data.pattern module"""
+
+import tests.utils as ut
+from pyls.data.pattern import (LITERAL, RECURSIVE, WILDCARD, PathPattern,
+                               compile_component, has_magic)
+from pyls.data.tree import FileSystemTree
+
+
+def match_paths(pattern, json_data=None):
+    """Return the sorted paths matched by pattern in a tree"""
+    root = FileSystemTree.build_tree_from_dict(
+        json_data or ut.mock_filesystem)
+    return sorted(path for path, _ in PathPattern(pattern).match(root))
+
+
+def test_has_magic():
+    """Test the detection of the wildcards"""
+    assert has_magic("*.go")
+    assert has_magic("parser/pars?r.go")
+    assert has_magic("[ab]st")
+    assert not has_magic("parser/parser.go")
+    assert not has_magic(None)
+
+
+def test_compile_component():
+    """Test the kind of each compiled component"""
+    assert compile_component("go.mod") == (LITERAL, "go.mod")
+    assert compile_component("**").kind == RECURSIVE
+    matcher = compile_component("*.go")
+    assert matcher.kind == WILDCARD
+    assert matcher.value("main.go")
+    assert not matcher.value("go.mod")
+
+
+def test_compile_component_hidden():
+    """Test that the wildcards match the hidden names
+    only when the component starts with ."""
+    assert not compile_component("*").value(".gitignore")
+    assert compile_component(".*").value(".gitignore")
+
+
+def test_match_literal():
+    """Test a pattern without wildcards"""
+    assert match_paths("parser/go.mod") == ["parser/go.mod"]
+    assert match_paths("parser/missing") == []
+    assert match_paths("main.go/go.mod") == []
+
+
+def test_match_wildcard():
+    """Test the wildcards in the middle and at the end of a pattern"""
+    assert match_paths("*/go.mod") == [
+        "ast/go.mod", "lexer/go.mod", "parser/go.mod", "token/go.mod"]
+    assert match_paths("*er/*_test.go") == [
+        "lexer/lexer_test.go", "parser/parser_test.go"]
+    assert match_paths("[lp]*/*.go") == [
+        "lexer/lexer.go", "lexer/lexer_test.go",
+        "parser/parser.go", "parser/parser_test.go"]
+
+
+def test_match_recursive():
+    """Test that ** matches any number of directories, none included"""
+    assert match_paths("**/go.mod") == [
+        "ast/go.mod", "go.mod", "lexer/go.mod", "parser/go.mod",
+        "token/go.mod"]
+    assert match_paths("**/*_test.go") == [
+        "lexer/lexer_test.go", "parser/parser_test.go"]
+    assert "token/token.go" in match_paths("**")
+    assert ".gitignore" not in match_paths("**")
+
+
+def test_match_directories_only():
+    """Test that a final / matches only the directories"""
+    assert match_paths("*/") == ["ast", "lexer", "parser", "token"]
+    assert match_paths("**/parser/") == ["parser"]
+    assert match_paths("**/main.go/") == []
+
+
+def test_match_current_directory():
+    """Test the patterns starting with ./"""
+    assert match_paths("./*/go.mod")[0] == "./ast/go.mod"
+    assert match_paths("./**/lexer.go") == ["./lexer/lexer.go"]
+
+
+def test_match_many_recursive():
+    """Test that a node reached by many ** is matched once"""
+    assert match_paths("**/**/go.mod") == match_paths("**/go.mod")
+    assert match_paths("**/*/**/go.mod") == [
+        "ast/go.mod", "lexer/go.mod", "parser/go.mod", "token/go.mod"]
+
+
+def test_match_deep_tree():
+    """Test that a deep tree does not reach the recursion limit"""
+    json_data = dict(ut.mock_object, name="leaf")
+    for depth in range(5000):
+        json_data = dict(ut.mock_object, name=f"dir{depth}",
+                         contents=[json_data])
+    assert match_paths("**/leaf", json_data)[0].endswith("/dir0/leaf")
+    assert len(match_paths("**/dir?/", json_data)) == 10
@@ -0,0 +1,286 @@
+"""Test suite for the pyls.server module"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import tests.utils as ut
+from pyls.__main__ import load_resident_tree
+from pyls.client import request_listing
+from pyls.data.tree import FileSystemTree
+from pyls.server import (INLINE_MAX_CHILDREN, ListingService,
+                         ReloadingListingService, serve, start_server)
+
+
+@pytest.fixture(name="json_path")
+def fixture_json_path(tmp_path):
+    """Fixture that writes the tests.ut.mock_filesystem structure
+    in a temporary json file
+
+    Parameters
+    ----------
+    tmp_path
+        The temporary directory provided by pytest
+    """
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    return str(json_path)
+
+
+@pytest.fixture(name="service")
+def fixture_service(json_path, request):
+    """Fixture that builds a ReloadingListingService of json_path,
+    with the tree loader given as indirect parameter if any
+
+    Parameters
+    ----------
+    json_path
+        The json filesystem served
+    request
+        The pytest request, with the optional tree loader
+    """
+    return ReloadingListingService(
+        json_path, getattr(request, "param", FileSystemTree))
+
+
+@pytest.fixture(name="socket_path")
+def fixture_socket_path(service, tmp_path):
+    """Fixture that serves the service from an event loop
+    running in a thread, and returns its socket
+
+    Parameters
+    ----------
+    service
+        The service to serve
+    tmp_path
+        The temporary directory provided by pytest
+    """
+    socket_path = str(tmp_path / "pyls.sock")
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    future = asyncio.run_coroutine_threadsafe(
+        serve(service, socket_path), loop)
+    while not os.path.exists(socket_path) and not future.done():
+        time.sleep(0.01)
+    yield socket_path
+    loop.call_soon_threadsafe(future.cancel)
+    with pytest.raises(BaseException):
+        future.result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_handle_request(service):
+    """Test the answers to single requests"""
+    assert service.handle_request({}) == {
+        "output": "LICENSE README.md ast go.mod lexer main.go parser token"}
+    assert service.handle_request(
+        {"path": "token", "options": {"show_all": True}, "id": 3}) == {
+            "output": "go.mod token.go", "id": 3}
+    assert service.handle_request({"path": "missing"}) == {
+        "error": "not_found"}
+    assert service.handle_request({"options": {"color": True}}) == {
+        "error": "invalid_request"}
+    assert service.handle_request({"path": 3}) == {
+        "error": "invalid_request"}
+    assert service.handle_request({"options": {"limit": -2}}) == {
+        "error": "invalid_request"}
+    assert service.handle_request(
+        {"options": {"limit": 2, "offset": 1}}) == {"output": "README.md ast"}
+    assert service.handle_request(
+        {"path": "token", "recursive": True}) == {
+            "output": "token:\ngo.mod token.go"}
+    assert service.handle_request(
+        {"path": "main.go", "recursive": True}) == {"output": "main.go"}
+    assert service.handle_request({"path": "*/go.mod"}) == {
+        "output": "ast/go.mod lexer/go.mod parser/go.mod token/go.mod"}
+    assert service.handle_request({"path": "[am]*"}) == {
+        "output": "main.go\n\nast:\nast.go go.mod"}
+    assert service.handle_request({"path": "x*"}) == {"error": "not_found"}
+    assert service.handle_request({"find": "*_test.go"}) == {
+        "output": "lexer/lexer_test.go\nparser/parser_test.go"}
+    assert service.handle_request({"find": "missing"}) == {"output": ""}
+    assert service.handle_request({"find": 1}) == {"error": "invalid_request"}
+    assert service.handle_request({"paths": ["token", "x", "main.go"]}) == {
+        "output": "error: cannot access 'x': No such file or directory\n"
+                  "main.go\n\ntoken:\ngo.mod token.go"}
+    assert service.handle_request({"paths": ["x"]}) == {
+        "output": "error: cannot access 'x': No such file or directory"}
+    assert service.handle_request({"paths": "token"}) == {
+        "error": "invalid_request"}
+    assert service.handle_request(None) == {"error": "invalid_request"}
+
+
+def test_handle_request_does_not_change_directory(service):
+    """Test that the requests do not move the tree current_node"""
+    current_node = service.tree.current_node
+    service.handle_request({"path": "parser"})
+    assert service.tree.current_node is current_node
+
+
+def test_serve_pipelining(json_path, tmp_path):
+    """Test that the requests sent together are answered in order"""
+    socket_path = str(tmp_path / "pyls.sock")
+
+    async def scenario():
+        server = asyncio.create_task(
+            serve(FileSystemTree(json_path), socket_path))
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        paths = ["parser", "token", "missing", "lexer"] * 10
+        writer.write(b"".join(
+            json.dumps({"path": path, "id": index}).encode() + b"\n"
+            for index, path in enumerate(paths)) + b"not json\n")
+        responses = [json.loads(await reader.readline())
+                     for _ in range(len(paths) + 1)]
+        writer.close()
+        with pytest.raises(OSError):
+            await start_server(ListingService(None), socket_path)
+        server.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await server
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert [response.get("id") for response in responses] == \
+        list(range(40)) + [None]
+    assert responses[1]["output"] == "go.mod token.go"
+    assert responses[2]["error"] == "not_found"
+    assert responses[-1]["error"] == "invalid_request"
+    assert not os.path.exists(socket_path)
+
+
+def test_serve_slow_request(json_path, tmp_path):
+    """Test that a slow recursive request does not delay
+    the other connections"""
+    socket_path = str(tmp_path / "pyls.sock")
+    started = threading.Event()
+    release = threading.Event()
+
+    class SlowListingService(ListingService):
+        """A service answering the recursive requests
+        once release is set"""
+
+        def handle_request(self, request: dict) -> dict:
+            if request.get("recursive"):
+                started.set()
+                release.wait(5)
+            return super().handle_request(request)
+
+    async def send(request):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(json.dumps(request).encode() + b"\n")
+        response = json.loads(await reader.readline())
+        writer.close()
+        return response
+
+    async def scenario():
+        server = await start_server(
+            SlowListingService(FileSystemTree(json_path)), socket_path)
+        slow = asyncio.create_task(send({"path": "ast", "recursive": True}))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        fast = await send({"path": "token"})
+        slow_done = slow.done()
+        release.set()
+        responses = (fast, await slow, slow_done)
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    assert asyncio.run(scenario()) == (
+        {"output": "go.mod token.go"}, {"output": "ast:\nast.go go.mod"},
+        False)
+
+
+def test_is_small(service):
+    """Test the requests answered on the event loop"""
+    assert service.is_small({"path": "token", "id": 1})
+    assert service.is_small({"path": "missing"})
+    assert not service.is_small({"path": "token", "recursive": True})
+    assert not service.is_small({"path": "*/go.mod"})
+    assert not service.is_small({"paths": ["token"]})
+    assert not service.is_small({"find": "*.go"})
+    assert not service.is_small(None)
+    children = dict.fromkeys(map(str, range(INLINE_MAX_CHILDREN)))
+    service.tree.root.children["token"].children = children
+    assert not service.is_small({"path": "token"})
+
+
+def test_request_listing(socket_path):
+    """Test the synchronous client used by the pyls command"""
+    assert request_listing(socket_path, {"path": "token"}) == {
+        "output": "go.mod token.go"}
+
+
+def test_request_listing_many_paths(socket_path):
+    """Test a paths request longer than the default line limit of
+    asyncio"""
+    paths = [f"missing_{index}" for index in range(10_000)]
+    response = request_listing(socket_path, {"paths": paths + ["token"]})
+    lines = response["output"].split("\n")
+    assert len(lines) == 10_002
+    assert lines[-2:] == ["token:", "go.mod token.go"]
+
+
+def test_serve_request_over_limit(json_path, tmp_path, mocker):
+    """Test that a request longer than REQUEST_LIMIT is refused"""
+    mocker.patch("pyls.server.REQUEST_LIMIT", 1024)
+    socket_path = str(tmp_path / "pyls.sock")
+
+    async def scenario():
+        server = await start_server(FileSystemTree(json_path), socket_path)
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(json.dumps({"paths": ["token"] * 1000}).encode()
+                     + b"\n")
+        response = json.loads(await reader.readline())
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    assert asyncio.run(scenario()) == {"error": "invalid_request"}
+
+
+def test_request_listing_not_running(tmp_path):
+    """Test the client when no server is listening"""
+    assert request_listing(str(tmp_path / "pyls.sock"), {}) is None
+
+
+def test_reload_if_modified(service, json_path):
+    """Test that the tree is replaced when the json file changes"""
+    assert not service.reload_if_modified()
+    old_tree = service.tree
+    with open(json_path, "w", encoding="UTF-8") as json_file:
+        json.dump(ut.mock_valid_object, json_file)
+    stat = os.stat(json_path)
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert service.reload_if_modified()
+    assert service.tree is not old_tree
+    assert service.handle_request({}) == {
+        "output": "testdir testemptydir testfile"}
+
+
+@pytest.mark.parametrize("service", [load_resident_tree], indirect=True)
+def test_serve_json_rewritten_in_place(service, socket_path, json_path):
+    """Test that the daemon tree does not read the json file again
+    when it is rewritten in place, and is reloaded afterwards"""
+    assert request_listing(socket_path, {}) == {
+        "output": "LICENSE README.md ast go.mod lexer main.go parser token"}
+    with open(json_path, "r+", encoding="UTF-8") as json_file:
+        json_file.truncate()
+        json.dump(ut.mock_valid_object, json_file)
+    assert request_listing(socket_path, {"path": "parser"}) == {
+        "output": "go.mod parser.go parser_test.go"}
+    stat = os.stat(json_path)
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert service.reload_if_modified()
+    assert request_listing(socket_path, {}) == {
+        "output": "testdir testemptydir testfile"}
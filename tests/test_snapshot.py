@@ -0,0 +1,85 @@
+"""Test suite for the pyls.utils.snapshot module"""
+
+import pytest
+
+import tests.utils as ut
+from pyls.data.tree import FileSystemTree
+from pyls.utils.snapshot import (HEADER, HEADER_V1, RECORD, Snapshot,
+                                  write_snapshot)
+
+
+@pytest.fixture(name="snapshot")
+def fixture_snapshot(mocker, tmp_path):
+    """Fixture that compiles the tests.ut.mock_filesystem
+    structure and opens the snapshot
+
+    Parameters
+    ----------
+    mocker
+        The mocker object provided by pytest-mock
+    tmp_path
+        The temporary directory provided by pytest
+    """
+    mocker.patch("pyls.utils.io.load_json_from_file",
+                 return_value=ut.mock_filesystem)
+    snapshot_path = str(tmp_path / "structure.pyls")
+    write_snapshot(snapshot_path, FileSystemTree("mock").root)
+    snapshot = Snapshot(snapshot_path)
+    yield snapshot
+    snapshot.close()
+
+
+def test_snapshot_records(snapshot):
+    """Test that the children of each directory are contiguous
+    and sorted by name"""
+    assert snapshot.node_count == 20
+    root = snapshot.record(0)
+    assert snapshot.string(root[0]) == "interpreter"
+    names = [snapshot.string(snapshot.record(index)[0])
+             for index in range(root[5], root[5] + root[6])]
+    assert names == sorted(names)
+    assert names[0] == ".gitignore"
+    assert RECORD.size == 48
+
+
+def test_snapshot_find_child(snapshot):
+    """Test the binary search of the children"""
+    parser_index = snapshot.find_child(0, "parser")
+    assert snapshot.string(snapshot.record(parser_index)[0]) == "parser"
+    parser_go = snapshot.find_child(parser_index, "parser.go")
+    assert snapshot.record(parser_go)[2] == 1622
+    assert snapshot.record(parser_go)[4] == parser_index
+    assert snapshot.find_child(0, "missing") is None
+    assert snapshot.find_child(parser_go, "missing") is None
+
+
+def test_snapshot_invalid_file(tmp_path):
+    """Test opening a file that is not a snapshot"""
+    snapshot_path = tmp_path / "structure.pyls"
+    snapshot_path.write_bytes(b"{}" * 40)
+    with pytest.raises(ValueError):
+        Snapshot(str(snapshot_path))
+
+
+def test_snapshot_name_tables(snapshot):
+    """Test that the ids of the name index are the record indexes"""
+    tables = snapshot.name_tables()
+    assert len(tables.node_names) == snapshot.node_count
+    for index in range(snapshot.node_count):
+        record = snapshot.record(index)
+        assert tables.node_names[index] == record[0]
+        assert tables.parents[index] == record[4]
+
+
+def test_snapshot_version_1(snapshot, tmp_path):
+    """Test that a snapshot written without name index can be read"""
+    data = bytearray(snapshot.data)
+    header = HEADER.unpack_from(data)
+    data[:HEADER.size] = HEADER_V1.pack(
+        header[0], 1, *header[2:-1]) + data[HEADER_V1.size:HEADER.size]
+    snapshot_path = tmp_path / "version1.pyls"
+    snapshot_path.write_bytes(bytes(data))
+    old_snapshot = Snapshot(str(snapshot_path))
+    assert old_snapshot.name_tables() is None
+    assert old_snapshot.find_child(0, "parser") is not None
+    old_snapshot.close()
@@ -0,0 +1,68 @@
+"""Test suite for the pyls.utils.stats module"""
+
+import json
+
+import tests.utils as ut
+from pyls.data.cache import CacheInfo
+from pyls.data.listing import ListingOptions, render
+from pyls.data.tree import FileSystemTree
+from pyls.utils import stats
+
+
+def test_run_stats_nested_phases(mocker):
+    """Test that the time of a phase excludes the nested phases"""
+    mocker.patch("time.perf_counter", side_effect=[0.0, 1.0, 3.0, 4.0,
+                                                   6.0, 7.0])
+    run_stats = stats.RunStats()
+    with run_stats.phase("format"):
+        with run_stats.phase("sort"):
+            pass
+    with run_stats.phase("sort"):
+        pass
+    assert run_stats.phases == {"format": 2.0, "sort": 3.0}
+
+
+def test_inactive_stats():
+    """Test that nothing is recorded without an active collection"""
+    with stats.phase("sort"):
+        stats.count("rows_listed")
+        stats.add_cache("path_cache", CacheInfo(1, 1, 8, 1))
+    with stats.collect(trace_memory=False) as run_stats:
+        pass
+    assert run_stats.phases == {}
+    assert run_stats.counts == {}
+    assert run_stats.peak_memory is None
+
+
+def test_collect(mocker):
+    """Test the statistics of a tree build, a resolve and a listing"""
+    mocker.patch("pyls.utils.io.load_json_from_file",
+                 return_value=ut.mock_filesystem)
+    with stats.collect() as run_stats:
+        tree = FileSystemTree("mock")
+        render(tree.list_directory("parser", ListingOptions(show_all=True)))
+        tree.resolve("parser")
+        stats.add_cache("path_cache", tree.path_cache.cache_info())
+    assert list(run_stats.phases) == ["json_load", "tree_build", "resolve",
+                                      "sort", "format"]
+    assert sum(run_stats.phases.values()) <= run_stats.wall_time
+    assert run_stats.counts == {"nodes_loaded": 20, "paths_resolved": 2,
+                                "rows_listed": 3}
+    assert run_stats.peak_memory > 0
+    assert run_stats.caches == {
+        "path_cache": {"hits": 1, "misses": 1, "hit_rate": 0.5}}
+    assert json.loads(run_stats.to_json())["counts"] == run_stats.counts
+    report = run_stats.report().splitlines()
+    assert report[0].split() == ["phase", "seconds", "share"]
+    assert report[-1] == "path_cache   hits 1 misses 1 hit rate 50.0%"
+
+
+def test_collect_lazy_tree(tmp_path):
+    """Test that the lazy trees count the nodes loaded"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    with stats.collect(trace_memory=False) as run_stats:
+        tree = FileSystemTree(str(json_path), lazy=True)
+        tree.list_directory("parser")
+    # The root, its children and the children of parser
+    assert run_stats.counts["nodes_loaded"] == 1 + 9 + 3
@@ -0,0 +1,22 @@
+"""Test suite for the pyls.data.totals module"""
+
+from pyls.data.totals import DirectoryTotals
+
+
+def test_directory_totals_add():
+    """Test the totals of a directory with a new file and directory"""
+    totals = DirectoryTotals(4096, newest=10)
+    totals.add(DirectoryTotals(100, newest=20), is_directory=False)
+    totals.add(DirectoryTotals(5000, file_count=2, directory_count=1,
+                               newest=5), is_directory=True)
+    assert totals == DirectoryTotals(9196, file_count=3, directory_count=2,
+                                     newest=20)
+
+
+def test_directory_totals_remove():
+    """Test that removing a child keeps the newest modification"""
+    totals = DirectoryTotals(9196, file_count=3, directory_count=2,
+                             newest=20)
+    totals.remove(DirectoryTotals(5000, file_count=2, directory_count=1,
+                                  newest=5), is_directory=True)
+    assert totals == DirectoryTotals(4196, file_count=1, newest=20)
@@ -1,12 +1,21 @@
 """Test suite for the pyls.data.tree module"""
 
+import gc
+import json
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import pytest
 
 import tests.utils as ut
 from pyls.data.filesystem import FileSystemNodeType
-from pyls.data.tree import FileSystemTree
+from pyls.data.listing import ListingOptions, render
+from pyls.data.names import NameIndex
+from pyls.data.totals import DirectoryTotals
+from pyls.data.tree import FileSystemTree, InvalidFileSystemError, TreeNode
+from pyls.utils.io import JsonSpan
+from pyls.utils.snapshot import write_snapshot
 
 
 def mock_localtime(timestamp):
@@ -170,6 +179,118 @@ def test_long_listing_sort_by_time_reverse_only_dir(capfd, tree):
     assert out == ut.ll_sort_by_time_reverse_only_dir
 
 
+def test_ls_sort_by_size(capfd, tree):
+    """Test print_children sorting by size (-S)"""
+    tree.print_children(show_all=True, sort_by_size=True)
+    out, _ = capfd.readouterr()
+    assert out == "go.mod main.go README.md LICENSE ast lexer parser " \
+        "token .gitignore\n"
+
+
+def test_ls_sort_by_size_reverse(capfd, tree):
+    """Test print_children sorting by size (-S), in reverse order.
+    The entries with the same size keep their order"""
+    tree.print_children(show_all=True, sort_by_size=True,
+                        reverse_sorting=True)
+    out, _ = capfd.readouterr()
+    assert out == ".gitignore ast lexer parser token LICENSE README.md " \
+        "main.go go.mod\n"
+
+
+def test_ls_limit_offset(capfd, tree):
+    """Test print_children with a page of the sorted entries"""
+    tree.print_children(sort_by_time=True, reverse_sorting=True)
+    out, _ = capfd.readouterr()
+    expected = out.split()
+    for offset in (0, 2, 7, 20):
+        for limit in (None, 0, 3):
+            result = tree.list_directory(None, ListingOptions(
+                sort_by_time=True, reverse_sorting=True,
+                limit=limit, offset=offset))
+            end = None if limit is None else offset + limit
+            assert [row.name for row in result] == expected[offset:end]
+
+
+def test_listing_options_invalid_limit():
+    """Test that the negative limits and offsets are refused"""
+    with pytest.raises(ValueError):
+        ListingOptions(limit=-1)
+    with pytest.raises(ValueError):
+        ListingOptions(offset="1")
+
+
+def test_listing_options_invalid_filters():
+    """Test that the negative sizes and the not integer times are refused"""
+    with pytest.raises(ValueError):
+        ListingOptions(min_size=-1)
+    with pytest.raises(ValueError):
+        ListingOptions(newer_than="2023-11-14")
+
+
+def test_list_directory_min_size_newer_than(tree):
+    """Test the listing of the entries big or recent enough"""
+    result = tree.list_directory(None, ListingOptions(min_size=4096))
+    assert [row.name for row in result] == ["ast", "lexer", "parser",
+                                            "token"]
+    result = tree.list_directory(None, ListingOptions(
+        min_size=7000, total_size=True, show_all=True))
+    assert [row.name for row in result] == [".gitignore", "lexer", "parser"]
+    result = tree.list_directory(None, ListingOptions(
+        newer_than=1699955487, show_all=True))
+    assert [row.name for row in result] == ["ast", "parser"]
+    assert list(tree.list_directory(None, ListingOptions(
+        min_size=1 << 40))) == []
+
+
+def make_big_directory(count=3000):
+    """Build a directory with many children with repeated sizes and
+    times, some of them hidden and some of them directories"""
+    directory = TreeNode(name="big", size=4096, time_modified=0,
+                         permissions="drwxr-xr-x",
+                         node_type=FileSystemNodeType.DIRECTORY)
+    for number in range(count):
+        node_type = FileSystemNodeType.DIRECTORY if number % 5 == 0 \
+            else FileSystemNodeType.FILE
+        child = TreeNode(name=f"{'.' if number % 7 == 0 else ''}n{number}",
+                         size=(number * 7919) % 1000,
+                         time_modified=1700000000 + (number * 31) % 97,
+                         permissions="-rw-r--r--", node_type=node_type)
+        if node_type == FileSystemNodeType.DIRECTORY:
+            child.add_child("file", TreeNode(
+                name="file", size=number, time_modified=0,
+                permissions="-rw-r--r--",
+                node_type=FileSystemNodeType.FILE))
+        directory.add_child(child.name, child)
+    return directory
+
+
+@pytest.mark.parametrize("options", [
+    ListingOptions(),
+    ListingOptions(show_all=True, sort_by_size=True),
+    ListingOptions(sort_by_size=True, reverse_sorting=True,
+                   filter_by="file"),
+    ListingOptions(sort_by_time=True, reverse_sorting=True, show_all=True,
+                   limit=50, offset=20),
+    ListingOptions(reverse_sorting=True, filter_by="dir", min_size=300),
+    ListingOptions(sort_by_size=True, total_size=True, min_size=500,
+                   reverse_sorting=True, show_all=True),
+    ListingOptions(sort_by_time=True, newer_than=1700000050, limit=10),
+])
+def test_list_node_columns(mocker, options):
+    """Test that the listings of a big directory are the same
+    with and without the numpy column store"""
+    pytest.importorskip("numpy")
+    directory = make_big_directory()
+    result = FileSystemTree.list_node(directory, options)
+    assert directory.directory_index().columns() is not None
+    mocker.patch("pyls.data.columns.load_numpy", return_value=None)
+    fallback_directory = make_big_directory()
+    expected = FileSystemTree.list_node(fallback_directory, options)
+    assert fallback_directory.directory_index().columns() is None
+    assert [row.name for row in result] == [row.name for row in expected]
+    assert result.size_width == expected.size_width
+
+
 def test_change_directory_file(tree_nocd):
     """Test change_directory with a file path"""
     tree_nocd.change_directory("parser/parser.go")
@@ -239,6 +360,461 @@ def test_change_directory_invalidfile(tree_nocd):
     assert not result
 
 
+def test_change_directory_parent(tree_nocd):
+    """Test change_directory with .. components"""
+    assert tree_nocd.change_directory("parser/../lexer/./lexer.go")
+    assert tree_nocd.current_node is tree_nocd.root.children[
+        "lexer"].children["lexer.go"]
+    assert tree_nocd.change_directory("../..")
+    assert tree_nocd.current_node is tree_nocd.root
+    assert tree_nocd.change_directory("token/..")
+    assert tree_nocd.current_node is tree_nocd.root
+    assert not tree_nocd.change_directory("main.go/..")
+    assert not tree_nocd.change_directory("missing/..")
+
+
+def test_resolve_cache(tree_nocd):
+    """Test that the nodes resolved are cached by normalized path"""
+    node = tree_nocd.resolve("parser/parser.go")
+    assert tree_nocd.resolve("./parser//parser.go") is node
+    info = tree_nocd.path_cache.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert tree_nocd.resolve("parser/parser.go/") is None
+    # The directory of the node is cached too
+    assert tree_nocd.path_cache.peek("parser") is node.parent
+
+
+def test_resolve_cache_ancestor(tree_nocd, mocker):
+    """Test that a path is walked from its longest cached ancestor"""
+    parser = tree_nocd.resolve("parser")
+    get_child = mocker.spy(TreeNode, "get_child")
+    assert tree_nocd.resolve("parser/go.mod") is parser.children["go.mod"]
+    assert get_child.call_count == 1
+    assert tree_nocd.resolve("parser/../lexer") is \
+        tree_nocd.root.children["lexer"]
+
+
+def test_resolve_cache_invalidated(tree_nocd):
+    """Test that the cache follows the changes of the tree"""
+    assert tree_nocd.resolve("token/token.go") is not None
+    tree_nocd.remove_node("token")
+    assert tree_nocd.resolve("token/token.go") is None
+    assert tree_nocd.resolve("parser/parser.go") is not None
+    tree_nocd.root = FileSystemTree.build_tree_from_dict(ut.mock_filesystem)
+    assert tree_nocd.resolve("parser/parser.go") is \
+        tree_nocd.root.children["parser"].children["parser.go"]
+
+
+def test_resolve_many(tree_nocd, mocker):
+    """Test that many paths are resolved like resolve does,
+    walking the shared components once"""
+    paths = ["parser/parser.go", "./parser/go.mod", "parser/", "missing/x",
+             "main.go/", "lexer/../token/token.go", None, "parser/go.mod"]
+    get_child = mocker.spy(TreeNode, "get_child")
+    nodes = tree_nocd.resolve_many(paths)
+    # lexer, token, token.go, main.go, missing, parser, go.mod, parser.go
+    assert get_child.call_count == 8
+    assert nodes == [tree_nocd.resolve(path) for path in paths]
+    assert nodes[6] is tree_nocd.root
+    assert nodes[4] is None
+
+
+def test_list_operands(tree_nocd):
+    """Test the listing of many paths and patterns"""
+    missing, results = tree_nocd.list_operands(
+        ["token", "missing", "main.go", "a*", "nomatch*"], ListingOptions())
+    assert missing == ["missing", "nomatch*"]
+    assert [(result.path, [row.name for row in result])
+            for result in results] == [
+        (None, ["main.go"]), ("ast", ["ast.go", "go.mod"]),
+        ("token", ["go.mod", "token.go"])]
+
+
+def assert_parents(node):
+    """Check the path and the parent of all the nodes of a subtree"""
+    for name, child in (node.children or {}).items():
+        assert child.parent is node
+        assert child.path() == (name if node.parent is None
+                                else f"{node.path()}/{name}")
+        assert_parents(child)
+
+
+def test_parents_all_builders(tmp_path):
+    """Test the parent links of the trees built in all the ways"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    write_snapshot(str(tmp_path / "structure.pyls"),
+                   FileSystemTree(str(json_path)).root)
+    for tree in (FileSystemTree(str(json_path)),
+                 FileSystemTree(str(json_path), streaming=True),
+                 FileSystemTree(str(json_path), lazy=True),
+                 FileSystemTree(str(tmp_path / "structure.pyls"),
+                                snapshot=True)):
+        assert tree.root.parent is None
+        assert tree.root.path() == "."
+        assert tree.resolve("parser/parser.go").path() == "parser/parser.go"
+        assert_parents(tree.root)
+
+
+def test_parents_add_remove_node(tree_nocd):
+    """Test the parent links of the nodes added and removed"""
+    subtree = FileSystemTree.build_tree_from_dict(dict(
+        ut.mock_object, name="new", contents=[ut.mock_object]))
+    assert tree_nocd.add_node("parser", subtree)
+    assert tree_nocd.resolve("parser/new/interpreter").path() == \
+        "parser/new/interpreter"
+    assert [node.name for node in tree_nocd.resolve_ancestors(
+        "parser/new/../new/interpreter")] == [
+            "interpreter", "parser", "new", "interpreter"]
+    removed = tree_nocd.remove_node("parser/new")
+    assert removed.parent is None
+    assert removed.path() == "."
+
+
+def test_list_directory(tree_nocd):
+    """Test that list_directory returns the rows
+    without changing the current_node"""
+    result = tree_nocd.list_directory("parser")
+    assert result.found
+    assert result.node is tree_nocd.root.children["parser"]
+    assert [row.name for row in result] == ["go.mod", "parser.go",
+                                            "parser_test.go"]
+    assert tree_nocd.current_node is tree_nocd.root
+
+
+def test_list_directory_options(tree_nocd):
+    """Test list_directory with the long listing
+    format (-l) in reverse order"""
+    result = tree_nocd.list_directory(
+        None, ListingOptions(long_listing=True, reverse_sorting=True))
+    assert render(result) + "\n" == ut.long_listing_result_reversed
+
+
+def test_list_directory_file(tree_nocd):
+    """Test that list_directory on a file lists the file itself"""
+    result = tree_nocd.list_directory("./parser/parser.go")
+    assert [row.name for row in result] == ["parser.go"]
+
+
+def test_list_directory_invalid_path(tree_nocd):
+    """Test list_directory with a path that does not exist"""
+    result = tree_nocd.list_directory("parser/missing")
+    assert not result.found
+    assert not list(result)
+
+
+def test_directory_index_cached(tree_nocd):
+    """Test that the directory index is built once
+    and built again when a child is added"""
+    parser = tree_nocd.root.children["parser"]
+    index = parser.directory_index()
+    assert parser.directory_index() is index
+    assert index.max_size[FileSystemNodeType.FILE] == 1622
+    parser.add_child("big", TreeNode(
+        name="big", size=123456, time_modified=0,
+        permissions="-rw-r--r--", node_type=FileSystemNodeType.FILE))
+    assert parser.directory_index().max_size[
+        FileSystemNodeType.FILE] == 123456
+
+
+def test_list_recursive(tree_nocd):
+    """Test the recursive listing of the root, with the
+    subdirectories in the order of each listing"""
+    results = list(tree_nocd.list_recursive(None, ListingOptions(
+        reverse_sorting=True)))
+    assert [result.path for result in results] == [
+        ".", "./token", "./parser", "./lexer", "./ast"]
+    assert [row.name for row in results[2]] == [
+        "parser_test.go", "parser.go", "go.mod"]
+
+
+def test_list_recursive_hidden_directory():
+    """Test that the hidden directories are visited only with show_all"""
+    tree = FileSystemTree.from_root(FileSystemTree.build_tree_from_dict(
+        dict(ut.mock_object, contents=[
+            dict(ut.mock_object, name=".git", contents=[ut.mock_object]),
+            dict(ut.mock_object, name="src", contents=[])])))
+    assert [result.path for result in tree.list_recursive("./")] == [
+        "./", "./src"]
+    assert [result.path for result in tree.list_recursive(
+        "", ListingOptions(show_all=True))] == [
+            ".", "./.git", "./.git/interpreter", "./src"]
+
+
+def test_list_recursive_deep_tree():
+    """Test that a tree deeper than the recursion limit can be listed"""
+    root = FileSystemTree.build_tree_from_dict(ut.mock_object)
+    node = root
+    for depth in range(5000):
+        child = TreeNode(name=f"dir{depth}", size=4096, time_modified=0,
+                         permissions="drwxr-xr-x",
+                         node_type=FileSystemNodeType.DIRECTORY)
+        node.add_child(child.name, child)
+        node = child
+    results = FileSystemTree.from_root(root).list_recursive(None)
+    assert sum(1 for _ in results) == 5001
+
+
+def test_list_recursive_invalid_path(tree_nocd):
+    """Test the recursive listing of a path that does not exist"""
+    results = list(tree_nocd.list_recursive("missing"))
+    assert len(results) == 1
+    assert not results[0].found
+
+
+def test_glob(tree_nocd):
+    """Test the nodes matched by a pattern"""
+    matches = list(tree_nocd.glob("*/parser*.go"))
+    assert sorted(path for path, _ in matches) == [
+        "parser/parser.go", "parser/parser_test.go"]
+    assert all(node is tree_nocd.root.children["parser"].children[
+        path.split("/")[1]] for path, node in matches)
+
+
+def test_list_operand_pattern(tree_nocd):
+    """Test that the files matched are listed first by path,
+    then each directory matched with its path as header"""
+    headers, results = tree_nocd.list_operand("[lm]*", ListingOptions())
+    assert headers
+    assert [(result.path, [row.name for row in result], result.names)
+            for result in results] == [
+        (None, ["main.go"], ["main.go"]),
+        ("lexer", ["go.mod", "lexer.go", "lexer_test.go"], None)]
+
+
+def test_list_operand_pattern_options(tree_nocd):
+    """Test that the options sort the operands too"""
+    headers, results = tree_nocd.list_operand("*/go.mod", ListingOptions(
+        reverse_sorting=True))
+    assert headers
+    assert list(results)[0].names == [
+        "token/go.mod", "parser/go.mod", "lexer/go.mod", "ast/go.mod"]
+
+
+def test_list_operand_single_directory(tree_nocd):
+    """Test that a pattern matching a single directory
+    lists it without header"""
+    headers, results = tree_nocd.list_operand("p*", ListingOptions())
+    assert not headers
+    assert [row.name for row in next(results)] == [
+        "go.mod", "parser.go", "parser_test.go"]
+
+
+def test_list_operand_no_match(tree_nocd):
+    """Test a pattern without matches and a path"""
+    headers, results = tree_nocd.list_operand("missing*", ListingOptions())
+    assert not headers
+    assert not next(results).found
+    headers, results = tree_nocd.list_operand("ast", ListingOptions())
+    assert not headers
+    assert [row.name for row in next(results)] == ["ast.go", "go.mod"]
+
+
+def test_list_operand_recursive_pattern(tree_nocd):
+    """Test the recursive listing of the directories matched"""
+    headers, results = tree_nocd.list_operand("[at]*", ListingOptions(),
+                                              recursive=True)
+    assert headers
+    assert [result.path for result in results] == ["ast", "token"]
+
+
+def expected_totals(node):
+    """Compute the totals of a node visiting all its subtree"""
+    if node.children is None:
+        return DirectoryTotals(node.size, newest=node.time_modified)
+    totals = DirectoryTotals(node.size, newest=node.time_modified)
+    for child in node.children.values():
+        totals.add(expected_totals(child),
+                   child.node_type == FileSystemNodeType.DIRECTORY)
+    return totals
+
+
+def assert_totals(node):
+    """Check the totals of all the directories of a subtree"""
+    if node.node_type == FileSystemNodeType.DIRECTORY:
+        assert node.totals() == expected_totals(node)
+    for child in (node.children or {}).values():
+        assert_totals(child)
+
+
+def test_totals(tree_nocd):
+    """Test the totals computed while building the tree"""
+    assert tree_nocd.root._totals is not None
+    assert tree_nocd.root.totals() == DirectoryTotals(
+        size=41056, file_count=15, directory_count=4, newest=1700205662)
+    assert_totals(tree_nocd.root)
+
+
+def test_totals_all_builders(tmp_path):
+    """Test the totals of the trees built in the other ways"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    write_snapshot(str(tmp_path / "structure.pyls"),
+                   FileSystemTree(str(json_path)).root)
+    for tree in (FileSystemTree(str(json_path), streaming=True),
+                 FileSystemTree(str(json_path), lazy=True),
+                 FileSystemTree(str(tmp_path / "structure.pyls"),
+                                snapshot=True)):
+        assert_totals(tree.root)
+
+
+def test_totals_duplicate_names(tmp_path):
+    """Test that a child replaced by a later one with the same name is
+    not counted in the totals, whatever the builder"""
+    json_data = dict(ut.mock_filesystem, contents=[
+        dict(ut.mock_filesystem, name=f"copy{index % 3}")
+        for index in range(6)] + ut.mock_filesystem["contents"] * 2)
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(json_data), encoding="UTF-8")
+    expected = FileSystemTree(str(json_path), streaming=True).root
+    assert_totals(expected)
+    for tree in (FileSystemTree(str(json_path)),
+                 FileSystemTree(str(json_path), lazy=True),
+                 FileSystemTree(str(json_path), workers=2)):
+        assert_totals(tree.root)
+        assert_same_totals(expected, tree.root)
+
+
+def test_add_node_updates_totals(tree_nocd):
+    """Test that adding a subtree updates the totals of its ancestors"""
+    subtree = FileSystemTree.build_tree_from_dict(dict(
+        ut.mock_object, name="new", contents=[
+            dict(ut.mock_object, name="x", time_modified=1800000000,
+                 contents=[{"name": "y", "size": 10, "time_modified": 0,
+                            "permissions": "-rw-r--r--"}])]))
+    assert tree_nocd.add_node("parser", subtree)
+    assert tree_nocd.resolve("parser/new/x/y") is not None
+    assert tree_nocd.root.totals().newest == 1800000000
+    assert_totals(tree_nocd.root)
+    assert not tree_nocd.add_node("main.go", subtree)
+    assert not tree_nocd.add_node("missing", subtree)
+
+
+def test_add_node_replaces_child(tree_nocd):
+    """Test that adding a node with an existing name replaces it"""
+    tree_nocd.add_node(None, TreeNode(
+        name="lexer", size=1, time_modified=0, permissions="-rw-r--r--",
+        node_type=FileSystemNodeType.FILE))
+    assert tree_nocd.root.children["lexer"].size == 1
+    assert_totals(tree_nocd.root)
+
+
+def test_remove_node_updates_totals(tree_nocd):
+    """Test that removing the newest node updates
+    the newest modification of its ancestors"""
+    removed = tree_nocd.remove_node("parser/parser_test.go")
+    assert removed.name == "parser_test.go"
+    assert tree_nocd.resolve("parser/parser_test.go") is None
+    assert_totals(tree_nocd.root)
+    for path in ("parser/parser.go", "parser/go.mod"):
+        tree_nocd.remove_node(path)
+    assert tree_nocd.root.children["parser"].children is None
+    assert_totals(tree_nocd.root)
+    assert tree_nocd.remove_node("") is None
+    assert tree_nocd.remove_node("missing") is None
+
+
+def test_remove_node_snapshot(tmp_path):
+    """Test that the directories of a snapshot emptied by remove_node
+    do not read their children from the snapshot again"""
+    snapshot_path = str(tmp_path / "structure.pyls")
+    write_snapshot(snapshot_path,
+                   FileSystemTree.build_tree_from_dict(ut.mock_filesystem))
+    tree = FileSystemTree(snapshot_path, snapshot=True)
+    tree.root.totals()
+    for path in ("token/go.mod", "token/token.go"):
+        assert tree.remove_node(path) is not None
+    token = tree.root.children["token"]
+    assert token.children is None
+    assert token.get_child("go.mod") is None
+    assert tree.resolve("token/token.go") is None
+    # Like the emptied directories of the other trees, not go.mod token.go
+    assert render(tree.list_directory("token")) == "token"
+    assert_totals(tree.root)
+
+
+def test_add_remove_node_lazy_subtree(tmp_path):
+    """Test that the subtrees added and removed are not read from
+    the json file when no ancestor has its totals"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    tree = FileSystemTree(str(json_path), lazy=True)
+    other_tree = FileSystemTree(str(json_path), lazy=True)
+    removed = tree.remove_node("parser")
+    assert removed.contents is not None
+    lexer = other_tree.root.children["lexer"]
+    assert tree.add_node("token", lexer)
+    assert lexer.contents is not None
+    assert tree.resolve("token/lexer/lexer.go") is not None
+    assert_totals(tree.root)
+
+
+def test_find(tree_nocd):
+    """Test the paths found by name"""
+    assert tree_nocd.find("*.go") == [
+        "ast/ast.go", "lexer/lexer.go", "lexer/lexer_test.go", "main.go",
+        "parser/parser.go", "parser/parser_test.go", "token/token.go"]
+    assert tree_nocd.name_index() is tree_nocd.name_index()
+
+
+def test_find_after_changes(tree_nocd):
+    """Test that the name index follows the added and removed nodes"""
+    assert tree_nocd.find("token.go") == ["token/token.go"]
+    tree_nocd.add_node("ast", FileSystemTree.build_tree_from_dict({
+        "name": "token.go", "size": 10, "time_modified": 0,
+        "permissions": "-rw-r--r--"}))
+    assert tree_nocd.find("token.go") == ["ast/token.go", "token/token.go"]
+    tree_nocd.remove_node("token")
+    assert tree_nocd.find("token.go") == ["ast/token.go"]
+
+
+def test_find_snapshot(mocker, tmp_path):
+    """Test that the name index of a snapshot is read and not built"""
+    mocker.patch("pyls.utils.io.load_json_from_file",
+                 return_value=ut.mock_filesystem)
+    tree = FileSystemTree("mock")
+    snapshot_path = str(tmp_path / "structure.pyls")
+    write_snapshot(snapshot_path, tree.root)
+    snapshot_tree = FileSystemTree(snapshot_path, snapshot=True)
+    from_tree = mocker.spy(NameIndex, "from_tree")
+    for pattern in ("go.mod", "*er*", "*"):
+        assert snapshot_tree.find(pattern) == tree.find(pattern)
+    assert from_tree.call_count == 1
+
+
+def test_list_directory_total_size(tree_nocd):
+    """Test the listing sorted by total size"""
+    result = tree_nocd.list_directory(None, ListingOptions(
+        sort_by_size=True, total_size=True, reverse_sorting=True))
+    assert [row.name for row in result][:3] == ["lexer", "parser", "ast"]
+    assert result.size_width == 4
+
+
+def test_list_directory_threads(tree_nocd):
+    """Test that many threads can list the same tree"""
+    paths = ["", "ast", "lexer", "parser", "token", "parser/parser.go"] * 50
+    expected = [render(tree_nocd.list_directory(path)) for path in paths]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda path: render(tree_nocd.list_directory(path)), paths))
+    assert results == expected
+    assert tree_nocd.current_node is tree_nocd.root
+
+
+def test_list_directory_threads_lazy(tmp_path):
+    """Test that many threads can build the children
+    of the same lazy tree"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    expected = render(FileSystemTree(str(json_path)).list_directory(
+        "parser"))
+    lazy_tree = FileSystemTree(str(json_path), lazy=True)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda _: render(lazy_tree.list_directory("parser")), range(64)))
+    assert results == [expected] * 64
+
+
 def test_build_tree_from_json_invalid_data(capfd, mocker):
     """Test build_tree_from_json with a children with invalid data"""
     mocker.patch("pyls.utils.io.load_json_from_file",
@@ -271,3 +847,266 @@ def test_build_tree_from_json(mocker):
     assert testnesteddir.data.node_type == FileSystemNodeType.DIRECTORY
     testnestedfile = testnesteddir.children["testnestedfile"]
     assert testnestedfile.data.node_type == FileSystemNodeType.FILE
+
+
+def assert_same_tree(expected, actual):
+    """Assert that two trees have the same nodes with the same data"""
+    stack = [(expected, actual)]
+    while stack:
+        expected_node, actual_node = stack.pop()
+        for field in ("name", "size", "time_modified", "permissions",
+                      "node_type"):
+            assert getattr(expected_node, field) == getattr(actual_node, field)
+        if expected_node.children is None:
+            assert actual_node.children is None
+            continue
+        assert list(expected_node.children) == list(actual_node.children)
+        stack.extend(zip(expected_node.children.values(),
+                         actual_node.children.values()))
+
+
+def test_build_tree_from_stream(mocker, tmp_path):
+    """Test that the streaming build produces the same tree
+    of build_tree_from_json"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem), encoding="UTF-8")
+    mocker.patch("pyls.utils.io.load_json_from_file",
+                 return_value=ut.mock_filesystem)
+    assert_same_tree(FileSystemTree("mock").root,
+                     FileSystemTree(str(json_path), streaming=True).root)
+
+
+def test_build_tree_from_stream_invalid_data(capfd, tmp_path):
+    """Test the streaming build with a children with invalid data"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_invalid_object), encoding="UTF-8")
+    tree = FileSystemTree(str(json_path), streaming=True)
+    _, err = capfd.readouterr()
+    assert len(tree.root.children) == 1
+    assert err == "There is some invalid data in your json file. Ignoring it.\n"
+
+
+def test_build_tree_from_stream_invalid_root(capfd, tmp_path):
+    """Test the streaming build with a root without the required fields"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text('{"name": "root", "contents": []}', encoding="UTF-8")
+    tree = FileSystemTree(str(json_path), streaming=True)
+    _, err = capfd.readouterr()
+    assert tree.root is None
+    assert err == "The provided json filesystem is invalid\n"
+
+
+def test_build_tree_from_stream_not_existing_file(capfd, tmp_path):
+    """Test the streaming build with a not existing file"""
+    tree = FileSystemTree(str(tmp_path / "structure.json"), streaming=True)
+    _, err = capfd.readouterr()
+    assert tree.root is None
+    assert err == "There is no structure.json file\n"
+
+
+def test_build_lazy_tree(mocker, tmp_path):
+    """Test that the lazy tree has the same nodes of build_tree_from_json
+    and that only the visited directories are built"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_filesystem, indent=2),
+                         encoding="UTF-8")
+    lazy_tree = FileSystemTree(str(json_path), lazy=True)
+    assert lazy_tree.root.contents is not None
+    assert lazy_tree.change_directory("parser/parser.go")
+    assert lazy_tree.root.contents is None
+    assert lazy_tree.root.children["parser"].contents is None
+    assert lazy_tree.root.children["token"].contents is not None
+    mocker.patch("pyls.utils.io.load_json_from_file",
+                 return_value=ut.mock_filesystem)
+    assert_same_tree(FileSystemTree("mock").root, lazy_tree.root)
+
+
+def test_build_lazy_tree_invalid_data(capfd, tmp_path):
+    """Test the lazy build with a children with invalid data"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(ut.mock_invalid_object), encoding="UTF-8")
+    tree = FileSystemTree(str(json_path), lazy=True)
+    _, err = capfd.readouterr()
+    assert err == ""
+    assert len(tree.root.children) == 1
+    _, err = capfd.readouterr()
+    assert err == "There is some invalid data in your json file. Ignoring it.\n"
+
+
+def test_build_lazy_tree_invalid_nested_object(tmp_path):
+    """Test the lazy build with a malformed object in a subdirectory,
+    found only when the subdirectory is read"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(
+        '{"name": "root", "size": 4096, "time_modified": 1, '
+        '"permissions": "drwxr-xr-x", "contents": [{"name": "dir", '
+        '"size": 4096, "time_modified": 1, "permissions": "drwxr-xr-x", '
+        '"contents": [{"name" "x"}]}]}', encoding="UTF-8")
+    tree = FileSystemTree(str(json_path), lazy=True)
+    assert list(tree.root.children) == ["dir"]
+    with pytest.raises(InvalidFileSystemError,
+                       match="The provided json filesystem is invalid"):
+        tree.list_directory("dir")
+
+
+def test_build_lazy_tree_invalid_file(capfd, tmp_path):
+    """Test the lazy build with an invalid and a not existing file"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text('{"name": "root", "contents": [', encoding="UTF-8")
+    assert FileSystemTree(str(json_path), lazy=True).root is None
+    assert FileSystemTree(str(tmp_path / "missing.json"), lazy=True).root is None
+    _, err = capfd.readouterr()
+    assert err == ("The provided json filesystem is invalid\n"
+                   "There is no missing.json file\n")
+
+
+def assert_same_totals(expected, actual):
+    """Assert that the directories of two trees have the same totals"""
+    stack = [(expected, actual)]
+    while stack:
+        expected_node, actual_node = stack.pop()
+        if expected_node.node_type == FileSystemNodeType.DIRECTORY:
+            assert expected_node.totals() == actual_node.totals()
+            stack.extend(zip((expected_node.children or {}).values(),
+                             (actual_node.children or {}).values()))
+
+
+def test_build_tree_parallel(tmp_path):
+    """Test that the parallel build produces the same tree
+    of build_tree_from_json, with the same totals"""
+    json_data = dict(ut.mock_filesystem, contents=[
+        dict(ut.mock_filesystem, name=f"copy{index}", contents=[
+            ut.mock_filesystem] + ut.mock_filesystem["contents"][index:])
+        for index in range(10)] + ut.mock_filesystem["contents"])
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(json_data), encoding="UTF-8")
+    expected = FileSystemTree(str(json_path)).root
+    actual = FileSystemTree(str(json_path), workers=2).root
+    assert_same_tree(expected, actual)
+    assert_same_totals(expected, actual)
+    assert_parents(actual)
+
+
+def test_build_tree_parallel_invalid_data(capfd, tmp_path):
+    """Test the parallel build with children with invalid data"""
+    json_data = dict(ut.mock_invalid_object)
+    json_data["contents"] = json_data["contents"] * 3
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(json_data), encoding="UTF-8")
+    tree = FileSystemTree(str(json_path), workers=2)
+    _, err = capfd.readouterr()
+    assert len(tree.root.children) == 1
+    assert err == ("There is some invalid data in your json file. "
+                   "Ignoring it.\n") * 3
+
+
+@pytest.mark.parametrize("document", [
+    '{"name": "root", "contents": [{}, {}]}',
+    '{"name": "root", "size": 1, "time_modified": 1, "permissions": "d",'
+    ' "contents": [{"name": "a"}, [1, {"b" 2}]]}',
+    '{"name": "root", "size": 1, "time_modified": 1, "permissions": "d",'
+    ' "contents": [{"name": "a"}, {"name": "b", "size": 1,'
+    ' "time_modified": 1, "permissions": "d", "contents": 5}]}',
+    '{"name": "root", "contents": [1, 2}'])
+def test_build_tree_parallel_invalid_file(capfd, tmp_path, document):
+    """Test the parallel build with an invalid json filesystem"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(document, encoding="UTF-8")
+    tree = FileSystemTree(str(json_path), workers=2)
+    _, err = capfd.readouterr()
+    assert tree.root is None
+    assert err.endswith("The provided json filesystem is invalid\n")
+
+
+def test_build_tree_parallel_sequential(mocker, tmp_path):
+    """Test that a root with less than two children
+    is built by build_tree_from_json"""
+    json_path = tmp_path / "structure.json"
+    json_path.write_text(json.dumps(dict(ut.mock_object, contents=[
+        ut.mock_filesystem])), encoding="UTF-8")
+    build_tree_from_json = mocker.spy(FileSystemTree, "build_tree_from_json")
+    tree = FileSystemTree(str(json_path), workers=4)
+    build_tree_from_json.assert_called_once()
+    assert tree.root.get_child("interpreter").get_child("main.go")
+
+
+def test_split_spans():
+    """Test that the ranges cover the spans with about the same bytes"""
+    spans = [JsonSpan(start, start + length) for start, length in
+             [(1, 10), (13, 1), (16, 1), (19, 10), (31, 10), (43, 1)]]
+    assert FileSystemTree.split_spans(spans, 4) == [
+        (1, 14), (16, 29), (31, 44)]
+    assert FileSystemTree.split_spans(spans, 1) == [(1, 44)]
+
+
+def test_build_tree_from_snapshot(mocker, tmp_path):
+    """Test that the snapshot tree has the same nodes, in the same
+    order, of build_tree_from_json"""
+    mocker.patch("pyls.utils.io.load_json_from_file",
+                 return_value=ut.mock_filesystem)
+    tree = FileSystemTree("mock")
+    snapshot_path = str(tmp_path / "structure.pyls")
+    write_snapshot(snapshot_path, tree.root)
+    snapshot_tree = FileSystemTree(snapshot_path, snapshot=True)
+    assert snapshot_tree.change_directory("parser/parser.go")
+    assert snapshot_tree.root._children is None
+    assert not snapshot_tree.change_directory("parser/parser.go/test")
+    assert_same_tree(tree.root, snapshot_tree.root)
+
+
+def test_build_tree_from_snapshot_invalid_file(capfd, tmp_path):
+    """Test the snapshot build with an invalid and a not existing file"""
+    snapshot_path = tmp_path / "structure.pyls"
+    snapshot_path.write_text("{}", encoding="UTF-8")
+    assert FileSystemTree(str(snapshot_path), snapshot=True).root is None
+    assert FileSystemTree(str(tmp_path / "missing.pyls"),
+                          snapshot=True).root is None
+    _, err = capfd.readouterr()
+    assert err == ("The provided snapshot is invalid\n"
+                   "There is no missing.pyls file\n")
+
+
+def test_build_tree_from_dict_restores_gc():
+    """Test that build_tree_from_dict enables again the
+    garbage collector, and only if it was enabled"""
+    FileSystemTree.build_tree_from_dict(ut.mock_filesystem)
+    assert gc.isenabled()
+    gc.disable()
+    try:
+        FileSystemTree.build_tree_from_dict(ut.mock_filesystem)
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+def test_tree_bytes_per_node(record_property):
+    """Test the memory used by each node of a tree built from json,
+    strings excluded since they are shared with the json data.
+    The value is reported as the bytes_per_node property"""
+    contents = [{"name": f"file{index}", "size": index,
+                 "time_modified": 1699957865, "permissions": "-rw-r--r--"}
+                for index in range(10000)]
+    json_data = dict(ut.mock_object, contents=[
+        dict(ut.mock_object, name=f"dir{index}", contents=contents[:10])
+        for index in range(1000)] + contents)
+    tracemalloc.start()
+    try:
+        root = FileSystemTree.build_tree_from_dict(json_data)
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    bytes_per_node = allocated / 21001
+    record_property("bytes_per_node", bytes_per_node)
+    assert len(root.children) == 11000
+    assert not hasattr(root, "__dict__")
+    assert bytes_per_node < 150
+
+
+def test_build_tree_from_dict_interning():
+    """Test that repeated names and permissions are shared between nodes"""
+    root = FileSystemTree.build_tree_from_dict(json.loads(
+        json.dumps(ut.mock_filesystem)))
+    ast_go_mod = root.children["ast"].children["go.mod"]
+    lexer_go_mod = root.children["lexer"].children["go.mod"]
+    assert ast_go_mod.name is lexer_go_mod.name
+    assert ast_go_mod.permissions is root.children["LICENSE"].permissions